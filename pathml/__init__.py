@@ -3,7 +3,24 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import importlib
+
 from .core import *
-from . import datasets as ds
-from . import ml
-from . import preprocessing as pp
+
+# subpackages are imported on first access, so that importing pathml does not require loading their dependencies
+# (e.g. torch for pathml.ml)
+_lazy_subpackages = {
+    "datasets": "datasets",
+    "ds": "datasets",
+    "ml": "ml",
+    "preprocessing": "preprocessing",
+    "pp": "preprocessing",
+}
+
+
+def __getattr__(name):
+    if name in _lazy_subpackages:
+        module = importlib.import_module(f".{_lazy_subpackages[name]}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -4,7 +4,13 @@ License: GNU GPL 2.0
 """
 
 from .masks import Masks
-from .slide_backends import OpenSlideBackend, BioFormatsBackend, DICOMBackend
+from .slide_backends import (
+    OpenSlideBackend,
+    BioFormatsBackend,
+    DICOMBackend,
+    TiffFileBackend,
+    ArrayBackend,
+)
 from .slide_data import (
     SlideData,
     HESlide,
@@ -14,6 +20,10 @@ from .slide_data import (
     IHCSlide,
 )
 from .slide_dataset import SlideDataset
+from .slide_cache import SlideCache, enable_slide_cache, disable_slide_cache
+from .raw_tiles import RawTileFile, write_raw_tiles
+from .run_stats import RunStats
+from .synthetic import synthetic_slide
 from .tile import Tile
 from .tiles import Tiles
 from .slide_types import SlideType, types
@@ -8,13 +8,13 @@ import tempfile
 from collections import OrderedDict
 import numpy as np
 import itertools
-import anndata
 import os
+from pathlib import Path
 
 import pathml.core.masks
 import pathml.core.tile
 import pathml.core
-from pathml.core.utils import readcounts
+from pathml.core.utils import readcounts, writecounts
 
 
 class h5pathManager:
@@ -30,6 +30,8 @@ class h5pathManager:
         self.h5reference = path
         # create temporary file for slidedata.counts
         self.countspath = tempfile.TemporaryDirectory()
+        import anndata
+
         self.counts = anndata.AnnData()
         if h5path:
             assert (
@@ -84,6 +86,92 @@ class h5pathManager:
         rep = f"h5pathManager object, backing a SlideData object named '{self.h5['fields'].attrs['name']}'"
         return rep
 
+    def persist(self, path):
+        """
+        Store h5 in a file on disk rather than in a temporary file, so that changes are written to the file as they
+        are made, e.g. to checkpoint a long-running pipeline.
+        If the file already exists, its contents replace the contents of h5, e.g. to resume a run. Otherwise, the
+        current contents of h5 are copied to the new file. Either way, h5 stays backed by the file afterwards, so
+        later changes are written to it.
+
+        Args:
+            path (Union[str, bytes, os.PathLike]): path to h5path file
+
+        Raises:
+            ValueError: if the file holds a different slide, or if h5 holds tiles or masks which are not in the file,
+                and would be lost
+        """
+        path = Path(path)
+        if isinstance(self.h5reference, Path) and path.resolve() == self.h5reference:
+            # already backed by this file, e.g. when a checkpointed run is repeated
+            return
+        if path.exists():
+            f = h5py.File(path, "r+")
+            check_valid_h5path_format(f)
+            name = self.h5["fields"].attrs["name"]
+            if f["fields"].attrs["name"] != name:
+                f.close()
+                raise ValueError(
+                    f"cannot use {path} for slide '{name}': file contains slide '{f['fields'].attrs['name']}'"
+                )
+            for group in ["tiles", "masks"]:
+                missing = set(self.h5[group].keys()) - set(f[group].keys())
+                if missing:
+                    f.close()
+                    raise ValueError(
+                        f"cannot use {path} for slide '{name}': slide has {len(missing)} {group} which are not in "
+                        f"the file, and would be lost. Write the slide elsewhere first, or remove them"
+                    )
+            if f["counts"].keys():
+                self.counts = readcounts(f["counts"])
+                self.counts.filename = str(self.countspath.name) + "/tmpfile.h5ad"
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = h5py.File(path, "w")
+            for ds in self.h5.keys():
+                self.h5.copy(ds, f)
+        self.h5.close()
+        self.h5 = f
+        self.h5reference = path.resolve()
+
+    def save_counts(self):
+        """
+        Write counts to h5, replacing any counts written before.
+        Counts are otherwise only held in a temporary file, and written to h5path files by
+        :meth:`~pathml.core.slide_data.SlideData.write`.
+        """
+        for ds in list(self.h5["counts"].keys()):
+            del self.h5["counts"][ds]
+        if self.counts:
+            writecounts(self.h5["counts"], self.counts)
+
+    def add_tiles(self, tiles):
+        """
+        Add a batch of tiles to h5.
+        Equivalent to calling ``add_tile()`` for each tile, but the image array is grown once to fit the whole
+        batch, rather than once per tile.
+
+        Args:
+            tiles(list[pathml.core.tile.Tile]): Tile objects
+        """
+        tiles = list(tiles)
+        if tiles and not self.h5["array"].shape:
+            # the first tile initializes the array
+            self.add_tile(tiles.pop(0))
+        if tiles:
+            ndim = len(tiles[0].coords)
+            required = np.max(
+                [np.add(tile.coords, tile.image.shape[:ndim]) for tile in tiles],
+                axis=0,
+            )
+            for dim, (current, needed) in enumerate(
+                zip(self.h5["array"].shape, required)
+            ):
+                if needed > current:
+                    self.h5["array"].resize(needed, axis=dim)
+        for tile in tiles:
+            self.add_tile(tile)
+
     def add_tile(self, tile):
         """
         Add tile to h5.
@@ -132,7 +220,9 @@ class h5pathManager:
                 for coord, tile_shape in zip(coords, tile.image.shape[0:coordslength])
             ]
             for dim, (current, required) in enumerate(zip(currentshape, requiredshape)):
-                self.h5["array"].resize(required, axis=dim)
+                # tiles may be added in any order, so only ever grow the array
+                if required > current:
+                    self.h5["array"].resize(required, axis=dim)
 
             # add tile to self.h5["array"]
             slicer = [
@@ -192,7 +282,8 @@ class h5pathManager:
                     for dim, (current, required) in enumerate(
                         zip(currentshape, requiredshape)
                     ):
-                        self.h5["masks"][mask].resize(required, axis=dim)
+                        if required > current:
+                            self.h5["masks"][mask].resize(required, axis=dim)
 
                     # add mask to mask array
                     slicer = [
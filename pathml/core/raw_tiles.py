@@ -0,0 +1,154 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import io
+import os
+from itertools import islice
+from pathlib import Path
+
+import h5py
+import numpy as np
+from PIL import Image
+
+import pathml.core.tile
+
+
+def write_raw_tiles(backend, path, level=0, coords=None, name=None, chunk_size=256):
+    """
+    Export stored compressed tiles of a slide to an HDF5 file, copying the compressed bytes without decoding or
+    re-encoding them. Tiles can then be read and decoded with :class:`~pathml.core.raw_tiles.RawTileFile`.
+
+    The file contains a ``tiles`` dataset holding one standalone JPEG per tile, and a ``coords`` dataset of shape
+    (n_tiles, 2) holding the (i, j) coordinates of each tile. Tiles which are not stored in the slide are skipped.
+
+    Args:
+        backend (pathml.core.slide_backends.SlideBackend): backend of slide to read tiles from
+        path (Union[str, bytes, os.PathLike]): path to file to be written
+        level (int, optional): level from which to read tiles. Defaults to 0 (highest resolution).
+        coords (np.ndarray, optional): (i, j) coordinates of the tiles to export. Must be aligned to the grid of
+            stored tiles. If ``None``, all tiles are exported. Defaults to ``None``.
+        name (str, optional): name of slide, stored as an attribute of the file. Defaults to ``None``.
+        chunk_size (int): number of tiles to write at a time. Defaults to 256.
+
+    Returns:
+        int: number of tiles written
+    """
+    tile_shape = backend.get_raw_tile_shape(level=level)
+    if tile_shape is None:
+        raise NotImplementedError(
+            f"cannot read compressed tiles directly from {backend}: only JPEG-compressed tiled images are supported"
+        )
+    raw_tiles = backend.generate_raw_tiles(level=level, coords=coords)
+    path = Path(path)
+    Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
+    with h5py.File(path, "w") as f:
+        f.attrs["format"] = "jpeg"
+        f.attrs["level"] = level
+        f.attrs["tile_shape"] = tile_shape
+        f.attrs["image_shape"] = backend.get_image_shape(level=level)
+        if name is not None:
+            f.attrs["name"] = name
+        tiles = f.create_dataset(
+            "tiles",
+            shape=(0,),
+            maxshape=(None,),
+            chunks=(chunk_size,),
+            dtype=h5py.vlen_dtype(np.uint8),
+        )
+        tile_coords = f.create_dataset(
+            "coords",
+            shape=(0, 2),
+            maxshape=(None, 2),
+            chunks=(chunk_size, 2),
+            dtype=np.int64,
+        )
+        n = 0
+        while True:
+            batch = list(islice(raw_tiles, chunk_size))
+            if not batch:
+                break
+            tiles.resize((n + len(batch),))
+            tile_coords.resize((n + len(batch), 2))
+            for ix, (_, data) in enumerate(batch):
+                tiles[n + ix] = np.frombuffer(data, dtype=np.uint8)
+            tile_coords[n : n + len(batch)] = [c for c, _ in batch]
+            n += len(batch)
+    return n
+
+
+class RawTileFile:
+    """
+    Read tiles exported with :func:`~pathml.core.raw_tiles.write_raw_tiles`, decoding each tile only when it is
+    accessed.
+
+    Can be pickled (e.g. for use in a ``torch.utils.data.DataLoader`` with multiple workers); the file is reopened on
+    first access after unpickling.
+
+    Args:
+        path (Union[str, bytes, os.PathLike]): path to file written by ``write_raw_tiles()``
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._h5 = None
+        with h5py.File(self.path, "r") as f:
+            assert (
+                f.attrs.get("format") == "jpeg"
+            ), f"{self.path} is not a file of compressed tiles written by write_raw_tiles()"
+            self.coords = f["coords"][:]
+            self.level = int(f.attrs["level"])
+            self.tile_shape = tuple(int(x) for x in f.attrs["tile_shape"])
+            self.image_shape = tuple(int(x) for x in f.attrs["image_shape"])
+            self.name = f.attrs.get("name")
+
+    def __repr__(self):
+        return f"RawTileFile('{self.path}')"
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_h5"] = None
+        return state
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, ix):
+        data = self.read_raw(ix)
+        image = np.asarray(Image.open(io.BytesIO(data)))
+        return pathml.core.tile.Tile(
+            image=image, coords=tuple(int(x) for x in self.coords[ix])
+        )
+
+    def __iter__(self):
+        for ix in range(len(self)):
+            yield self[ix]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_raw(self, ix):
+        """
+        Read one tile without decoding it.
+
+        Args:
+            ix (int): index of tile
+
+        Returns:
+            bytes: JPEG-encoded tile
+        """
+        if self._h5 is None:
+            self._h5 = h5py.File(self.path, "r")
+        return self._h5["tiles"][ix].tobytes()
+
+    def close(self):
+        """
+        Close the file, if it is open.
+        """
+        if self._h5 is not None:
+            self._h5.close()
+            self._h5 = None
@@ -0,0 +1,110 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+
+class RunStats:
+    """
+    Statistics of a pipeline run, returned by :meth:`~pathml.core.SlideData.run` and
+    :meth:`~pathml.core.SlideDataset.run`.
+
+    Processed tiles are written to h5 on a background thread, fed by a bounded queue. If ``queue_wait_seconds`` is a
+    large part of ``seconds``, writing tiles is the bottleneck of the run; if ``max_queue_depth`` stays low, the
+    workers are.
+
+    Attributes:
+        n_tiles (int): Number of tiles written.
+        n_batches (int): Number of batches of tiles written.
+        seconds (float): Wall time of the run, in seconds.
+        write_seconds (float): Total time spent writing tiles, in seconds.
+        max_write_seconds (float): Longest time taken to write one batch of tiles, in seconds.
+        queue_wait_seconds (float): Total time spent waiting for space in the queue of tiles to be written, in
+            seconds.
+        max_queue_depth (int): Maximum number of batches waiting to be written.
+        profile (pathml.preprocessing.pipeline.PipelineProfile): Time and memory used by each transform on each tile,
+            gathered from all workers. ``None`` unless the run was profiled.
+    """
+
+    def __init__(self):
+        self.n_tiles = 0
+        self.n_batches = 0
+        self.seconds = 0.0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.profile = None
+        self._total_queue_depth = 0
+        self._n_queued = 0
+
+    @property
+    def mean_write_seconds(self):
+        """
+        Mean time taken to write one batch of tiles, in seconds.
+        """
+        return self.write_seconds / self.n_batches if self.n_batches else 0.0
+
+    @property
+    def mean_queue_depth(self):
+        """
+        Mean number of batches waiting to be written, sampled as each batch is queued.
+        """
+        return self._total_queue_depth / self._n_queued if self._n_queued else 0.0
+
+    def record_queued(self, depth, wait_seconds):
+        """
+        Record that a batch was queued to be written.
+
+        Args:
+            depth (int): number of batches in the queue after queueing the batch
+            wait_seconds (float): time spent waiting for space in the queue
+        """
+        self._n_queued += 1
+        self._total_queue_depth += depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.queue_wait_seconds += wait_seconds
+
+    def record_write(self, n_tiles, seconds):
+        """
+        Record that a batch of tiles was written.
+
+        Args:
+            n_tiles (int): number of tiles in the batch
+            seconds (float): time taken to write the batch
+        """
+        self.n_tiles += n_tiles
+        self.n_batches += 1
+        self.write_seconds += seconds
+        self.max_write_seconds = max(self.max_write_seconds, seconds)
+
+    def asdict(self):
+        """
+        Returns:
+            dict: statistics of the run
+        """
+        return {
+            "n_tiles": self.n_tiles,
+            "n_batches": self.n_batches,
+            "seconds": self.seconds,
+            "write_seconds": self.write_seconds,
+            "mean_write_seconds": self.mean_write_seconds,
+            "max_write_seconds": self.max_write_seconds,
+            "queue_wait_seconds": self.queue_wait_seconds,
+            "mean_queue_depth": self.mean_queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    def __repr__(self):
+        out = [f"RunStats: {self.n_tiles} tiles in {self.seconds:.2f}s"]
+        out.append(
+            f"writes: {self.n_batches} batches in {self.write_seconds:.2f}s "
+            f"(mean {1000 * self.mean_write_seconds:.1f}ms, max {1000 * self.max_write_seconds:.1f}ms)"
+        )
+        out.append(
+            f"write queue: mean depth {self.mean_queue_depth:.1f}, max depth {self.max_queue_depth}, "
+            f"waited {self.queue_wait_seconds:.2f}s"
+        )
+        if self.profile is not None:
+            out.append(repr(self.profile).replace("\n", "\n\t"))
+        return "\n\t".join(out)
@@ -0,0 +1,117 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import pickle
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+# offsets of buffers in shared memory are aligned to cache lines
+_ALIGNMENT = 64
+
+
+def _open_shared_memory(name=None, size=0):
+    """
+    Create a new block of shared memory of the given size if ``name`` is ``None``, otherwise attach to an existing
+    block. The block is not tracked by the resource tracker, because it is created and unlinked by different
+    processes; :meth:`SharedTiles.release` unlinks it explicitly.
+    """
+    create = name is None
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, create=create, size=size, track=False)
+    shm = SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink_shared_memory(shm):
+    if sys.version_info < (3, 13):
+        # unlink() unregisters the block from the resource tracker, so register it first to keep the tracker consistent
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class SharedTiles:
+    """
+    A batch of tiles whose pixel data is held in a block of shared memory, for moving tiles between processes on the
+    same machine without pickling their arrays.
+
+    Tiles are pickled with protocol 5, so that contiguous arrays (images, masks, and arrays held by ``counts``) are
+    passed as out-of-band buffers. The buffers are copied once into a new block of shared memory, and only the rest of
+    the pickle, which is small, is sent to the other process along with the name of the block. :meth:`load` then
+    reconstructs the tiles with arrays which are views of the shared memory, without copying.
+
+    The block must be released with :meth:`release` once the tiles are no longer needed, by exactly one process.
+
+    Args:
+        tiles (list[pathml.core.tile.Tile]): tiles to share
+    """
+
+    def __init__(self, tiles):
+        tiles = list(tiles)
+        buffers = []
+        self._data = pickle.dumps(tiles, protocol=5, buffer_callback=buffers.append)
+        buffers = [buffer.raw() for buffer in buffers]
+        self._spans = []
+        offset = 0
+        for buffer in buffers:
+            self._spans.append((offset, buffer.nbytes))
+            offset += -(-buffer.nbytes // _ALIGNMENT) * _ALIGNMENT
+        shm = _open_shared_memory(size=max(offset, 1))
+        for (start, nbytes), buffer in zip(self._spans, buffers):
+            shm.buf[start : start + nbytes] = buffer
+        self.name = shm.name
+        self.nbytes = offset
+        self.n_tiles = len(tiles)
+        shm.close()
+        self._shm = None
+
+    def __repr__(self):
+        return f"SharedTiles(name='{self.name}', nbytes={self.nbytes})"
+
+    def __len__(self):
+        return self.n_tiles
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        return state
+
+    def load(self):
+        """
+        Reconstruct the tiles. Their arrays are views of the shared memory, which stays attached until
+        :meth:`close` or :meth:`release` is called.
+
+        Returns:
+            list[pathml.core.tile.Tile]: tiles
+        """
+        if self._shm is None:
+            self._shm = _open_shared_memory(name=self.name)
+        buffers = [self._shm.buf[start : start + n] for start, n in self._spans]
+        return pickle.loads(self._data, buffers=buffers)
+
+    def close(self):
+        """
+        Detach from the shared memory in this process. Loaded tiles which are still referenced keep the memory
+        mapped until they are garbage collected.
+        """
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                # tiles which are still referenced keep the memory mapped until they are garbage collected.
+                # Drop the mapping from the SharedMemory, so that it does not try to close it again when deleted
+                self._shm._mmap = None
+            self._shm = None
+
+    def release(self):
+        """
+        Detach from the shared memory and free it. Loaded tiles which are still referenced keep the memory mapped
+        until they are garbage collected.
+        """
+        shm = self._shm or _open_shared_memory(name=self.name)
+        self._shm = shm
+        self.close()
+        _unlink_shared_memory(shm)
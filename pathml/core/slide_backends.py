@@ -3,37 +3,250 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import asyncio
+import functools
+import mmap
+import os
+import struct
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from itertools import islice
+from pathlib import Path
 from typing import Tuple
 
 import numpy as np
 import openslide
 import pathml.core
 import pathml.core.tile
+from pathml.core.slide_cache import get_slide_cache
+import tifffile
 from pathml.utils import pil_to_rgb
 from PIL import Image
-from pydicom.dataset import Dataset
-from pydicom.encaps import get_frame_offsets
-from pydicom.filebase import DicomFile
-from pydicom.filereader import data_element_offset_to_value, dcmread
-from pydicom.tag import SequenceDelimiterTag, TupleTag
-from pydicom.uid import UID
-from scipy.ndimage import zoom
-
-try:
-    import bioformats
-    import javabridge
-    from bioformats.metadatatools import createOMEXMLMetadata
-except ImportError:
-    raise Exception("""Installation of PathML not complete. Please install openjdk8, bioformats, and javabridge:
+
+
+def _import_bioformats():
+    """
+    Import bioformats and javabridge, which are only needed for ``BioFormatsBackend``.
+    Imported on first use, so that the JVM bindings are not required to import pathml.
+
+    Returns:
+        Tuple: the ``bioformats`` and ``javabridge`` modules
+    """
+    try:
+        import bioformats
+        import bioformats.metadatatools
+        import javabridge
+    except ImportError:
+        raise Exception(
+            """Installation of PathML not complete. Please install openjdk8, bioformats, and javabridge:
             conda install openjdk==8.0.152
             pip install javabridge==1.0.19 python-bioformats==4.0.0
-            
-            For detailed installation instructions, please see https://github.com/Dana-Farber-AIOS/pathml/""")
+
+            For detailed installation instructions, please see https://github.com/Dana-Farber-AIOS/pathml/"""
+        )
+    return bioformats, javabridge
+
+
+def _check_tile_shape_stride(shape, stride):
+    """
+    Validate tile shape and stride, converting both to tuples of (H, W).
+
+    Args:
+        shape (int or tuple(int)): Size of each tile
+        stride (int or tuple(int)): stride between tiles. If ``None``, uses ``stride = shape``.
+
+    Returns:
+        Tuple[Tuple[int, int], Tuple[int, int]]: shape and stride
+    """
+    assert isinstance(shape, int) or (
+        isinstance(shape, tuple) and len(shape) == 2
+    ), f"input shape {shape} invalid. Must be a tuple of (H, W), or a single integer for square tiles"
+    if isinstance(shape, int):
+        shape = (shape, shape)
+    assert (
+        stride is None
+        or isinstance(stride, int)
+        or (isinstance(stride, tuple) and len(stride) == 2)
+    ), f"input stride {stride} invalid. Must be a tuple of (stride_H, stride_W), or a single int"
+    if stride is None:
+        stride = shape
+    elif isinstance(stride, int):
+        stride = (stride, stride)
+    return shape, stride
+
+
+def _coords_to_tuples(coords):
+    """
+    Convert an array of tile coordinates, e.g. as returned by ``generate_tile_coords()``, to a list of tuples of
+    python ints, as used for ``Tile.coords``.
+
+    Args:
+        coords (np.ndarray): array of shape (n_tiles, 2)
+
+    Returns:
+        List[Tuple[int, int]]: list of (i, j) coordinates
+    """
+    return [
+        tuple(c) for c in np.asarray(coords, dtype=np.int64).reshape(-1, 2).tolist()
+    ]
+
+
+def _cache_thumbnail(get_thumbnail):
+    """
+    Decorator for ``get_thumbnail()`` methods of backends, which stores thumbnails in the slide cache, if it is
+    enabled, and returns cached thumbnails instead of reading them from the slide again.
+    """
+
+    @functools.wraps(get_thumbnail)
+    def wrapper(self, *args, **kwargs):
+        cache = get_slide_cache()
+        if cache is None:
+            return get_thumbnail(self, *args, **kwargs)
+        filename = self._init_kwargs["filename"]
+        name = f"{type(self).__name__}.get_thumbnail{args}{sorted(kwargs.items())}"
+        thumbnail = cache.get_array(filename, name)
+        if thumbnail is None:
+            thumbnail = get_thumbnail(self, *args, **kwargs)
+            cache.put_array(filename, name, thumbnail)
+        return thumbnail
+
+    return wrapper
+
+
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def _get_async_executor():
+    """
+    Get the thread pool shared by all backends for the async API, creating it on first use.
+    """
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            _async_executor = ThreadPoolExecutor(
+                max_workers=min(32, (os.cpu_count() or 1) + 4),
+                thread_name_prefix="pathml-slide-io",
+            )
+        return _async_executor
+
+
+class _AsyncReadState:
+    """
+    Per-event loop state for the async API of a backend: a semaphore limiting concurrent reads, and the reads
+    currently in flight, so that concurrent requests for the same region can share a single read.
+    """
+
+    def __init__(self, concurrency):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = {}
+
+
+def _raw_tile_index(location, tile_shape, image_shape):
+    """
+    Get the (row, column) of the stored tile at a location, checking that the location is on the tile grid.
+
+    Args:
+        location (Tuple[int, int]): (i, j) location of top-left corner of tile
+        tile_shape (Tuple[int, int]): (H, W) shape of stored tiles
+        image_shape (Tuple[int, int]): (H, W) shape of image
+
+    Returns:
+        Tuple[int, int]: row and column of tile in the grid of stored tiles
+    """
+    i, j = location
+    if i % tile_shape[0] or j % tile_shape[1]:
+        raise ValueError(
+            f"location {tuple(location)} is not aligned to the grid of stored tiles of shape {tuple(tile_shape)}"
+        )
+    if not (0 <= i < image_shape[0] and 0 <= j < image_shape[1]):
+        raise ValueError(
+            f"location {tuple(location)} is outside of image with shape {tuple(image_shape)}"
+        )
+    return i // tile_shape[0], j // tile_shape[1]
+
+
+# Adobe APP14 marker segment with transform flag 0, which tells JPEG decoders that components are stored as RGB,
+# not YCbCr
+_JPEG_APP14_RGB = b"\xff\xee\x00\x0eAdobe\x00\x64\x00\x00\x00\x00\x00"
+
+
+def _standalone_jpeg(data, jpegtables=None, rgb=False):
+    """
+    Make a JPEG-compressed TIFF tile decodable on its own, by merging in the quantization and Huffman tables shared
+    by all tiles of the page, and marking tiles compressed without colorspace conversion (e.g. in Aperio SVS files)
+    as RGB.
+
+    Args:
+        data (bytes): compressed tile, as stored in the file
+        jpegtables (bytes, optional): value of the JPEGTables tag of the page
+        rgb (bool): whether components are stored as RGB rather than YCbCr
+
+    Returns:
+        bytes: standalone JPEG
+    """
+    # tables and tiles are each complete JPEG streams starting with SOI, and tables end with EOI
+    body = data[2:]
+    if jpegtables:
+        body = jpegtables[2:-2] + body
+    if rgb:
+        body = _JPEG_APP14_RGB + body
+    return data[:2] + body
 
 
 class SlideBackend:
-    """base class for backends that interface with slides on disk"""
+    """
+    base class for backends that interface with slides on disk
+
+    Backends are picklable: only the arguments used to create the backend (stored by subclasses in
+    ``self._init_kwargs``) are pickled, not open file handles or readers. An unpickled backend reopens the slide
+    lazily, on first use. This allows backends to be sent cheaply to worker processes, which then read tiles
+    themselves.
+
+    Backends also provide an asyncio API (``aextract_region()`` and ``agenerate_tiles()``), which runs blocking reads
+    in a thread pool so that they do not stall the event loop. At most ``async_concurrency`` reads from each slide
+    run at the same time, and concurrent requests for the same region share a single read. Reads run on
+    ``async_executor`` if it is set, otherwise on a thread pool shared by all backends.
+    """
+
+    async_concurrency = 4
+    async_executor = None
+
+    def __getstate__(self):
+        return {"_init_kwargs": self._init_kwargs}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._unopened = True
+        self._reopen_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # only called when normal attribute lookup fails, i.e. for an unpickled backend which has not been reopened
+        state = self.__dict__
+        if name.startswith("__") or not state.get("_unopened"):
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        with state["_reopen_lock"]:
+            if state.get("_unopened"):
+                self.__init__(**state["_init_kwargs"])
+                state["_unopened"] = False
+        return getattr(self, name)
+
+    def close(self):
+        """
+        Release any open file handles, readers and threads held by the backend. The backend stays usable: as for an
+        unpickled backend, the slide is reopened lazily on next use.
+        """
+
+    def _mark_closed(self):
+        # return to the state of an unpickled backend, which reopens the slide on first use
+        state = SlideBackend.__getstate__(self)
+        self.__dict__.clear()
+        self.__setstate__(state)
 
     def extract_region(self, location, size, level, **kwargs):
         raise NotImplementedError
@@ -47,6 +260,254 @@ class SlideBackend:
     def generate_tiles(self, shape, stride, pad, **kwargs):
         raise NotImplementedError
 
+    def generate_tile_coords(self, shape=3000, stride=None, pad=False, level=0):
+        """
+        Get the coordinates of the tiles which ``generate_tiles()`` yields, without reading any pixels.
+        See ``generate_tiles()`` for how padding works.
+
+        Args:
+            shape (int or tuple(int)): Size of each tile. May be a tuple of (height, width) or a single integer,
+                in which case square tiles of that size are used.
+            stride (int): stride between chunks. If ``None``, uses ``stride = size`` for non-overlapping chunks.
+                Defaults to ``None``.
+            pad (bool): Whether to include incomplete tiles on the edges. Defaults to ``False``.
+            level (int, optional): For slides with multiple levels, which level the coordinates refer to.
+                Defaults to 0 (highest resolution).
+
+        Returns:
+            np.ndarray: array of shape (n_tiles, 2) with the (i, j) coordinates of the top-left corner of each tile,
+            in row-major order
+        """
+        shape, stride = _check_tile_shape_stride(shape, stride)
+        i, j = self.get_image_shape(level=level)
+        stride_i, stride_j = stride
+
+        if pad:
+            n_chunk_i = i // stride_i + 1
+            n_chunk_j = j // stride_j + 1
+
+        else:
+            n_chunk_i = (i - shape[0]) // stride_i + 1
+            n_chunk_j = (j - shape[1]) // stride_j + 1
+
+        coords_i, coords_j = np.meshgrid(
+            np.arange(max(n_chunk_i, 0), dtype=np.int64) * stride_i,
+            np.arange(max(n_chunk_j, 0), dtype=np.int64) * stride_j,
+            indexing="ij",
+        )
+        return np.stack([coords_i.ravel(), coords_j.ravel()], axis=1)
+
+    def get_raw_tile_shape(self, level=0):
+        """
+        Get the shape of the compressed tiles in which the image is stored, if they can be read directly with
+        ``read_raw_tile()``.
+
+        Args:
+            level (int): Which level to get tile shape from. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            Tuple[int, int]: (H, W) shape of stored tiles, or ``None`` if compressed tiles cannot be read directly
+        """
+        return None
+
+    def read_raw_tile(self, location, level=0):
+        """
+        Read one stored compressed tile as a standalone JPEG, without decoding it.
+
+        Args:
+            location (Tuple[int, int]): (i, j) location of top-left corner of tile. Must be aligned to the grid of
+                stored tiles, i.e. a multiple of ``get_raw_tile_shape()``.
+            level (int): level from which to read tile. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            bytes: JPEG-encoded tile, or ``None`` if the tile is not stored in the file
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} cannot read compressed tiles directly"
+        )
+
+    def generate_raw_tiles(self, level=0, coords=None):
+        """
+        Generator over stored compressed tiles, without decoding them.
+        Tiles at the right and bottom edges of the image are stored at full size, so they may contain padding
+        beyond the edge of the image.
+
+        Args:
+            level (int, optional): For slides with multiple levels, which level to read tiles from.
+                Defaults to 0 (highest resolution).
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``SlideData.plan_tiles()`` with ``shape=get_raw_tile_shape()``. Must be aligned to the grid of stored
+                tiles. If ``None``, all tiles are read. Defaults to ``None``.
+
+        Yields:
+            Tuple[Tuple[int, int], bytes]: (i, j) coordinates and JPEG-encoded data of each tile. Tiles which are
+            not stored in the file are skipped.
+        """
+        tile_shape = self.get_raw_tile_shape(level=level)
+        if tile_shape is None:
+            raise NotImplementedError(
+                f"cannot read compressed tiles directly from {self}: only JPEG-compressed tiled images are supported"
+            )
+        if coords is None:
+            coords = self.generate_tile_coords(tile_shape, pad=True, level=level)
+        for tile_coords in _coords_to_tuples(coords):
+            data = self.read_raw_tile(location=tile_coords, level=level)
+            if data is not None:
+                yield tile_coords, data
+
+    async def aextract_region(self, location, size, level=0, **kwargs):
+        """
+        Asynchronous version of ``extract_region()``.
+        The read runs in a thread pool, so that the event loop is not blocked. If a read of the same region with the
+        same arguments is already in flight, its result is shared instead of reading the region again, so the
+        returned array should not be modified in place.
+
+        Args:
+            location (Tuple[int, int]): Location of top-left corner of region
+            size (Tuple[int, int]): Size of region
+            level (int): level from which to extract region
+            **kwargs: Other arguments passed through to ``extract_region()``
+
+        Returns:
+            np.ndarray: image at the specified region
+        """
+        return await self._acall(
+            self.extract_region, location=location, size=size, level=level, **kwargs
+        )
+
+    async def agenerate_tiles(
+        self, shape=3000, stride=None, pad=False, level=0, coords=None, **kwargs
+    ):
+        """
+        Asynchronous generator over tiles, yielding the same tiles as ``generate_tiles()``.
+        Up to ``async_concurrency`` tiles are read ahead in a thread pool while earlier tiles are being consumed.
+
+        Args:
+            shape (int or tuple(int)): Size of each tile. May be a tuple of (height, width) or a single integer,
+                in which case square tiles of that size are generated.
+            stride (int): stride between chunks. If ``None``, uses ``stride = size`` for non-overlapping chunks.
+                Defaults to ``None``.
+            pad (bool): How to handle tiles on the edges. If ``True``, these edge tiles will be zero-padded
+                and yielded with the other chunks. If ``False``, incomplete edge chunks will be ignored.
+                Defaults to ``False``.
+            level (int, optional): For slides with multiple levels, which level to extract tiles from.
+                Defaults to 0 (highest resolution).
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``generate_tile_coords()``. If given, ``stride`` and ``pad`` are ignored. Defaults to ``None``.
+            **kwargs: Other arguments passed through to ``extract_region()``
+
+        Yields:
+            pathml.core.tile.Tile: Extracted Tile object
+        """
+        shape, stride = _check_tile_shape_stride(shape, stride)
+        if coords is None:
+            coords = self.generate_tile_coords(shape, stride, pad, level=level)
+        tile_coords = iter(_coords_to_tuples(coords))
+
+        def schedule(location):
+            return location, asyncio.ensure_future(
+                self._acall(
+                    self._read_tile,
+                    location=location,
+                    size=shape,
+                    level=level,
+                    **kwargs,
+                )
+            )
+
+        pending = deque(
+            schedule(c) for c in islice(tile_coords, self.async_concurrency)
+        )
+        try:
+            while pending:
+                location, task = pending.popleft()
+                tile_im = await task
+                next_location = next(tile_coords, None)
+                if next_location is not None:
+                    pending.append(schedule(next_location))
+                yield pathml.core.tile.Tile(image=tile_im, coords=location)
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _acall(self, func, **kwargs):
+        """
+        Run a blocking read in the executor, limiting concurrent reads from this slide and sharing the result of
+        identical reads already in flight.
+
+        Args:
+            func: blocking method of the backend to call
+            **kwargs: arguments for ``func``
+
+        Returns:
+            result of ``func``
+        """
+        loop = asyncio.get_running_loop()
+        states = self.__dict__.setdefault("_async_states", weakref.WeakKeyDictionary())
+        state = states.get(loop)
+        if state is None:
+            state = states.setdefault(loop, _AsyncReadState(self.async_concurrency))
+        key = (func.__name__, repr(sorted(kwargs.items())))
+        future = state.in_flight.get(key)
+        if future is None:
+
+            async def read():
+                try:
+                    async with state.semaphore:
+                        return await loop.run_in_executor(
+                            self.async_executor or _get_async_executor(),
+                            functools.partial(self._run_in_thread, func, **kwargs),
+                        )
+                finally:
+                    del state.in_flight[key]
+
+            future = state.in_flight[key] = asyncio.ensure_future(read())
+        # shield the shared read, so that one caller being cancelled does not cancel it for the others
+        return await asyncio.shield(future)
+
+    def _run_in_thread(self, func, **kwargs):
+        """
+        Call ``func`` on a thread of the executor used by the async API.
+        Subclasses can override this to set up any per-thread state required by the underlying reader.
+        """
+        return func(**kwargs)
+
+    def _read_tile(self, location, size, level=0, **kwargs):
+        """
+        Read the image for a single tile, as yielded by ``generate_tiles()``.
+        Subclasses should override this if ``extract_region()`` does not support regions extending beyond the
+        edge of the image.
+
+        Args:
+            location (Tuple[int, int]): Location of top-left corner of tile
+            size (Tuple[int, int]): Size of tile
+            level (int): level from which to extract tile
+
+        Returns:
+            np.ndarray: image for tile
+        """
+        return self.extract_region(location=location, size=size, level=level, **kwargs)
+
+    def _check_level(self, level):
+        """
+        Validate an input level against ``self.level_count``, converting ``None`` to 0.
+
+        Args:
+            level (int): level to check
+
+        Returns:
+            int: valid level
+        """
+        if level is None:
+            return 0
+        if not isinstance(level, int):
+            raise ValueError(f"level {level} invalid. Must be an int.")
+        if not 0 <= level < self.level_count:
+            raise ValueError(
+                f"input level {level} invalid for slide with {self.level_count} levels total"
+            )
+        return level
+
 
 class OpenSlideBackend(SlideBackend):
     """
@@ -59,6 +520,7 @@ class OpenSlideBackend(SlideBackend):
     """
 
     def __init__(self, filename):
+        self._init_kwargs = {"filename": filename}
         self.filename = filename
         self.slide = openslide.open_slide(filename=filename)
 
@@ -116,6 +578,68 @@ class OpenSlideBackend(SlideBackend):
         j, i = self.slide.level_dimensions[level]
         return i, j
 
+    def _get_tiff_backend(self, level):
+        """
+        Get a TiffFileBackend for the same file, which can read stored tiles directly, if the file is a TIFF
+        (e.g. Aperio SVS) with the same levels as seen by OpenSlide.
+
+        Args:
+            level (int): level to be read
+
+        Returns:
+            TiffFileBackend: backend for the same file, or ``None``
+        """
+        if "_tiff_backend" not in self.__dict__:
+            try:
+                self._tiff_backend = TiffFileBackend(self.filename)
+            except Exception:
+                self._tiff_backend = None
+        tiff_backend = self._tiff_backend
+        if (
+            tiff_backend is None
+            or level >= tiff_backend.level_count
+            or tiff_backend.get_image_shape(level=level)
+            != self.get_image_shape(level=level)
+        ):
+            return None
+        return tiff_backend
+
+    def get_raw_tile_shape(self, level=0):
+        """
+        Get the shape of the compressed tiles in which the image is stored, if they can be read directly with
+        ``read_raw_tile()``. This is only possible for TIFF-based formats (e.g. Aperio SVS) storing JPEG-compressed
+        tiles.
+
+        Args:
+            level (int): Which level to get tile shape from. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            Tuple[int, int]: (H, W) shape of stored tiles, or ``None`` if compressed tiles cannot be read directly
+        """
+        tiff_backend = self._get_tiff_backend(level)
+        if tiff_backend is None:
+            return None
+        return tiff_backend.get_raw_tile_shape(level=level)
+
+    def read_raw_tile(self, location, level=0):
+        """
+        Read one stored compressed tile as a standalone JPEG, without decoding it.
+
+        Args:
+            location (Tuple[int, int]): (i, j) location of top-left corner of tile. Must be aligned to the grid of
+                stored tiles, i.e. a multiple of ``get_raw_tile_shape()``.
+            level (int): level from which to read tile. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            bytes: JPEG-encoded tile, or ``None`` if the tile is not stored in the file
+        """
+        if self.get_raw_tile_shape(level=level) is None:
+            raise NotImplementedError(
+                f"cannot read compressed tiles directly from {self}: only JPEG-compressed tiled TIFF files are supported"
+            )
+        return self._tiff_backend.read_raw_tile(location=location, level=level)
+
+    @_cache_thumbnail
     def get_thumbnail(self, size):
         """
         Get a thumbnail of the slide.
@@ -130,7 +654,7 @@ class OpenSlideBackend(SlideBackend):
         thumbnail = pil_to_rgb(thumbnail)
         return thumbnail
 
-    def generate_tiles(self, shape=3000, stride=None, pad=False, level=0):
+    def generate_tiles(self, shape=3000, stride=None, pad=False, level=0, coords=None):
         """
         Generator over tiles.
 
@@ -153,20 +677,14 @@ class OpenSlideBackend(SlideBackend):
                 Defaults to ``False``.
             level (int, optional): For slides with multiple levels, which level to extract tiles from.
                 Defaults to 0 (highest resolution).
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``generate_tile_coords()`` or ``SlideData.plan_tiles()``. If given, ``stride`` and ``pad`` are
+                ignored. Defaults to ``None``.
 
         Yields:
             pathml.core.tile.Tile: Extracted Tile object
         """
-        assert isinstance(shape, int) or (
-            isinstance(shape, tuple) and len(shape) == 2
-        ), f"input shape {shape} invalid. Must be a tuple of (H, W), or a single integer for square tiles"
-        if isinstance(shape, int):
-            shape = (shape, shape)
-        assert (
-            stride is None
-            or isinstance(stride, int)
-            or (isinstance(stride, tuple) and len(stride) == 2)
-        ), f"input stride {stride} invalid. Must be a tuple of (stride_H, stride_W), or a single int"
+        shape, stride = _check_tile_shape_stride(shape, stride)
         if level is None:
             level = 0
         assert isinstance(level, int), f"level {level} invalid. Must be an int."
@@ -174,29 +692,13 @@ class OpenSlideBackend(SlideBackend):
             level < self.slide.level_count
         ), f"input level {level} invalid for slide with {self.slide.level_count} levels total"
 
-        if stride is None:
-            stride = shape
-        elif isinstance(stride, int):
-            stride = (stride, stride)
-
-        i, j = self.get_image_shape(level=level)
-
-        stride_i, stride_j = stride
-
-        if pad:
-            n_chunk_i = i // stride_i + 1
-            n_chunk_j = j // stride_j + 1
-
-        else:
-            n_chunk_i = (i - shape[0]) // stride_i + 1
-            n_chunk_j = (j - shape[1]) // stride_j + 1
+        if coords is None:
+            coords = self.generate_tile_coords(shape, stride, pad, level=level)
 
-        for ix_i in range(n_chunk_i):
-            for ix_j in range(n_chunk_j):
-                coords = (int(ix_i * stride_i), int(ix_j * stride_j))
-                # get image for tile
-                tile_im = self.extract_region(location=coords, size=shape, level=level)
-                yield pathml.core.tile.Tile(image=tile_im, coords=coords)
+        for tile_coords in _coords_to_tuples(coords):
+            # get image for tile
+            tile_im = self.extract_region(location=tile_coords, size=shape, level=level)
+            yield pathml.core.tile.Tile(image=tile_im, coords=tile_coords)
 
 
 def _init_logger():
@@ -207,6 +709,7 @@ def _init_logger():
 
     Credits to: https://github.com/pskeshu/microscoper/blob/master/microscoper/io.py#L141-L162
     """
+    _, javabridge = _import_bioformats()
     rootLoggerName = javabridge.get_static_field(
         "org/slf4j/Logger", "ROOT_LOGGER_NAME", "Ljava/lang/String;"
     )
@@ -224,11 +727,42 @@ def _init_logger():
     )
 
 
+def _normalize_dim_selector(selector, n, name):
+    """
+    Convert a z/c/t selector into a list of indices along that dimension.
+
+    Args:
+        selector (Union[None, int, Iterable[int]]): which indices to select. If ``None``, all indices are selected.
+        n (int): size of the dimension
+        name (str): name of dimension, used in error messages
+
+    Returns:
+        list: list of integer indices
+    """
+    if selector is None:
+        return list(range(n))
+    if isinstance(selector, (int, np.integer)):
+        selector = [selector]
+    selector = [int(ix) for ix in selector]
+    if not selector:
+        raise ValueError(
+            f"input {name}={selector} invalid. Must select at least one index"
+        )
+    for ix in selector:
+        if not 0 <= ix < n:
+            raise ValueError(
+                f"input {name} index {ix} invalid for image with {n} {name} indices"
+            )
+    return selector
+
+
 class BioFormatsBackend(SlideBackend):
     """
     Use BioFormats to interface with image files.
 
-    Does not support multi-level images.
+    Supports multi-level images, such as pyramidal OME-TIFF and qptiff files. Bio-Formats exposes each sub-resolution
+    as a separate series; consecutive series with the same channels and progressively smaller (X, Y) dimensions are
+    treated as levels of the pyramid. Level 0 is highest resolution.
     Depends on `python-bioformats <https://github.com/CellProfiler/python-bioformats>`_ which wraps ome bioformats
     java library, parses pixel and metadata of proprietary formats, and
     converts all formats to OME-TIFF. Please cite: https://pubmed.ncbi.nlm.nih.gov/20513764/
@@ -238,14 +772,37 @@ class BioFormatsBackend(SlideBackend):
     """
 
     def __init__(self, filename):
+        self._init_kwargs = {"filename": filename}
         self.filename = filename
+        self.imagecache = None
+        # parsing the headers requires starting the JVM and reading the full OME-XML, so use cached values if possible
+        cache = get_slide_cache()
+        header = cache.get_metadata(filename, "BioFormatsBackend") if cache else None
+        if header is None:
+            header = self._read_header()
+            if cache:
+                cache.put_metadata(filename, "BioFormatsBackend", header)
+        self.shape = tuple(header["shape"])
+        self._level_series = header["level_series"]
+        self._level_shapes = [tuple(shape) for shape in header["level_shapes"]]
+        self.level_count = len(self._level_series)
+        self.metadata = header["metadata"]
+
+    def _read_header(self):
+        """
+        Read the shape, pyramid levels and OME-XML metadata of the image.
+
+        Returns:
+            dict: JSON-serializable dict of header information
+        """
+        bioformats, javabridge = _import_bioformats()
         # init java virtual machine
         javabridge.start_vm(class_path=bioformats.JARS, max_heap_size="50G")
         _init_logger()
         # java maximum array size of 2GB constrains image size
         ImageReader = bioformats.formatreader.make_image_reader_class()
         reader = ImageReader()
-        omeMeta = createOMEXMLMetadata()
+        omeMeta = bioformats.metadatatools.createOMEXMLMetadata()
         reader.setMetadataStore(omeMeta)
         reader.setId(str(self.filename))
         sizex, sizey, sizez, sizec, sizet = (
@@ -255,33 +812,71 @@ class BioFormatsBackend(SlideBackend):
             reader.getSizeC(),
             reader.getSizeT(),
         )
-        self.shape = (sizex, sizey, sizez, sizec, sizet)
-        self.imagecache = None
-        self.metadata = bioformats.get_omexml_metadata(self.filename)
+        # identify pyramid levels, stored as consecutive series of decreasing resolution
+        level_series = [0]
+        level_shapes = [(sizex, sizey)]
+        for series in range(1, reader.getSeriesCount()):
+            reader.setSeries(series)
+            level_shape = (reader.getSizeX(), reader.getSizeY())
+            prev_x, prev_y = level_shapes[-1]
+            is_level = (
+                reader.getSizeC() == sizec
+                and level_shape[0] < prev_x
+                and level_shape[1] < prev_y
+                # reject associated images (e.g. label or macro) which don't preserve the aspect ratio
+                and abs((sizex / level_shape[0]) / (sizey / level_shape[1]) - 1) < 0.05
+            )
+            if not is_level:
+                break
+            level_series.append(series)
+            level_shapes.append(level_shape)
+        reader.setSeries(0)
+        return {
+            "shape": [sizex, sizey, sizez, sizec, sizet],
+            "level_series": level_series,
+            "level_shapes": level_shapes,
+            "metadata": bioformats.get_omexml_metadata(self.filename),
+        }
 
     def __repr__(self):
         return f"BioFormatsBackend('{self.filename}')"
 
-    def get_image_shape(self):
+    def get_image_shape(self, level=0):
         """
-        Get the shape of the image.
+        Get the shape of the image at specified level.
+
+        Args:
+            level (int): Which level to get shape from. Level 0 is highest resolution. Defaults to 0.
 
         Returns:
-            Tuple[int, int]: Shape of image (H, W)
+            Tuple[int, int]: Shape of image at target level (H, W)
         """
-        return self.shape[:2]
+        level = self._check_level(level)
+        return self._level_shapes[level]
 
-    def extract_region(self, location, size, level=None):
+    def extract_region(self, location, size, level=None, z=None, c=None, t=None):
         """
         Extract a region of the image. All bioformats images have 5 dimensions representing
         (x, y, z, channel, time). If a tuple with len < 5 is passed, missing dimensions will be
         retrieved in full.
 
+        Location and size are relative to the target level.
+        Only the planes selected by ``z``, ``c``, and ``t`` are read from disk. Selected dimensions are kept in the
+        output, so the returned array is always 5-dimensional.
+
         Args:
             location (Tuple[int, int]): (X,Y) location of corner of extracted region closest to the origin.
             size (Tuple[int, int, ...]): (X,Y) size of each region. If an integer is passed, will convert to a
             tuple of (H, W) and extract a square region. If a tuple with len < 5 is passed, missing
                 dimensions will be retrieved in full.
+            level (int, optional): level from which to extract region. Level 0 is highest resolution.
+                Defaults to ``None`` (level 0).
+            z (Union[int, List[int]], optional): z-plane(s) to read. If ``None``, all z-planes are read.
+                Defaults to ``None``.
+            c (Union[int, List[int]], optional): channel(s) to read. If ``None``, all channels are read.
+                Defaults to ``None``.
+            t (Union[int, List[int]], optional): timepoint(s) to read. If ``None``, all timepoints are read.
+                Defaults to ``None``.
 
         Returns:
             np.ndarray: image at the specified region
@@ -289,11 +884,12 @@ class BioFormatsBackend(SlideBackend):
         Example:
             Extract 2000x2000 x,y region from upper left corner of 7 channel, 2d fluorescent image.
             data.slide.extract_region(location = (0,0), size = 2000)
+
+            Extract only the in-focus z-plane and the first two channels.
+            data.slide.extract_region(location = (0,0), size = 2000, z = 3, c = [0, 1])
         """
-        if level not in [None, 0]:
-            raise ValueError(
-                "BioFormatsBackend does not support levels, please pass a level in [None, 0]"
-            )
+        level = self._check_level(level)
+        series = self._level_series[level]
         # if a single int is passed for size, convert to a tuple to get a square region
         if type(size) is int:
             size = (size, size)
@@ -313,28 +909,36 @@ class BioFormatsBackend(SlideBackend):
             raise ValueError(
                 f"input size {size} invalid. Must be a tuple of integer coordinates of len<2"
             )
+        z = _normalize_dim_selector(z, self.shape[2], "z")
+        c = _normalize_dim_selector(c, self.shape[3], "c")
+        t = _normalize_dim_selector(t, self.shape[4], "t")
+        all_channels = c == list(range(self.shape[3]))
+        bioformats, javabridge = _import_bioformats()
         javabridge.start_vm(class_path=bioformats.JARS, max_heap_size="100G")
         reader = bioformats.ImageReader(str(self.filename), perform_init=True)
         # expand size
         size = list(size)
-        arrayshape = list(size)
-        for i in range(len(self.shape)):
-            if i > len(size) - 1:
-                arrayshape.append(self.shape[i])
-        arrayshape = tuple(arrayshape)
+        arrayshape = list(size) + [len(z), len(c), len(t)]
         array = np.empty(arrayshape)
+        # read a single pixel to determine whether channels are stored as separate series
         sample = reader.read(
-            z=0, t=0, rescale=False, XYWH=(location[0], location[1], size[0], size[1])
+            z=0,
+            t=0,
+            series=series,
+            rescale=False,
+            XYWH=(location[0], location[1], 1, 1),
         )
         # if series is set to read only one channel, explicitly read c
         if len(sample.shape) == 2:
-            for z in range(self.shape[2]):
-                for c in range(self.shape[3]):
-                    for t in range(self.shape[4]):
+            # either the image has a single channel, whose levels are separate series, or each channel is stored as
+            # a separate series. Series of the same size are not levels, so in the latter case there is only level 0
+            for z_out, z_ix in enumerate(z):
+                for c_out, c_ix in enumerate(c):
+                    for t_out, t_ix in enumerate(t):
                         slicearray = reader.read(
-                            z=z,
-                            t=t,
-                            series=c,
+                            z=z_ix,
+                            t=t_ix,
+                            series=series + c_ix,
                             rescale=False,
                             XYWH=(location[0], location[1], size[0], size[1]),
                         )
@@ -342,14 +946,15 @@ class BioFormatsBackend(SlideBackend):
                         # some file formats read x, y out of order, transpose
                         if slicearray.shape[:2] != array.shape[:2]:
                             slicearray = np.transpose(slicearray)
-                        array[:, :, z, c, t] = slicearray
+                        array[:, :, z_out, c_out, t_out] = slicearray
         # if series is set to read all channels, read all c simultaneously
-        elif len(sample.shape) == 3:
-            for z in range(self.shape[2]):
-                for t in range(self.shape[4]):
+        elif len(sample.shape) == 3 and all_channels:
+            for z_out, z_ix in enumerate(z):
+                for t_out, t_ix in enumerate(t):
                     slicearray = reader.read(
-                        z=z,
-                        t=t,
+                        z=z_ix,
+                        t=t_ix,
+                        series=series,
                         rescale=False,
                         XYWH=(location[0], location[1], size[0], size[1]),
                     )
@@ -358,16 +963,37 @@ class BioFormatsBackend(SlideBackend):
                     if slicearray.shape[:2] != array.shape[:2]:
                         slicearray = np.transpose(slicearray)
                         slicearray = np.moveaxis(slicearray, 0, -1)
-                    array[:, :, z, :, t] = slicearray
+                    array[:, :, z_out, :, t_out] = slicearray
+        # if only a subset of channels is requested, read each selected channel individually
+        elif len(sample.shape) == 3:
+            for z_out, z_ix in enumerate(z):
+                for c_out, c_ix in enumerate(c):
+                    for t_out, t_ix in enumerate(t):
+                        slicearray = reader.read(
+                            z=z_ix,
+                            c=c_ix,
+                            t=t_ix,
+                            series=series,
+                            rescale=False,
+                            XYWH=(location[0], location[1], size[0], size[1]),
+                        )
+                        slicearray = np.asarray(slicearray)
+                        # some file formats read x, y out of order, transpose
+                        if slicearray.shape[:2] != array.shape[:2]:
+                            slicearray = np.transpose(slicearray)
+                        array[:, :, z_out, c_out, t_out] = slicearray
         else:
             raise Exception("image format not supported")
         array = array.astype(np.uint8)
         return array
 
+    @_cache_thumbnail
     def get_thumbnail(self, size=None):
         """
         Get a thumbnail of the image. Since there is no default thumbnail for multiparametric, volumetric
         images, this function supports downsampling of all image dimensions.
+        For multi-level images, the thumbnail is read from the smallest level that is at least as large as the
+        requested size (or the smallest level, if none are large enough), instead of from the full resolution image.
 
         Args:
             size (Tuple[int, int]): thumbnail size
@@ -384,20 +1010,43 @@ class BioFormatsBackend(SlideBackend):
         if size is not None:
             if len(size) != len(self.shape):
                 size = size + self.shape[len(size) :]
-        if self.shape[0] * self.shape[1] * self.shape[2] * self.shape[3] > 2147483647:
+        # pick the smallest level which is still at least as large as the requested thumbnail
+        level = self.level_count - 1
+        if size is not None:
+            for candidate in reversed(range(self.level_count)):
+                level_x, level_y = self._level_shapes[candidate]
+                if level_x >= size[0] and level_y >= size[1]:
+                    level = candidate
+                    break
+        level_shape = self._level_shapes[level] + self.shape[2:]
+        if np.prod(level_shape[:4], dtype=np.int64) > 2147483647:
             raise Exception(
-                f"Java arrays allocate maximum 32 bits (~2GB). Image size is {self.imsize}"
+                f"Java arrays allocate maximum 32 bits (~2GB). Image size at level {level} is {level_shape}"
             )
-        array = self.extract_region(location=(0, 0), size=self.shape[:2])
+        image_array = self.extract_region(
+            location=(0, 0), size=level_shape[:2], level=level
+        )
         if size is not None:
-            ratio = tuple([x / y for x, y in zip(size, self.shape)])
+            ratio = tuple([x / y for x, y in zip(size, image_array.shape)])
             assert (
                 ratio[3] == 1
             ), f"cannot interpolate between fluor channels, resampling doesn't apply, fix size[3]"
-            image_array = zoom(array, ratio)
+            from scipy.ndimage import zoom
+
+            image_array = zoom(image_array, ratio)
         return image_array
 
-    def generate_tiles(self, shape=3000, stride=None, pad=False, level=0):
+    def generate_tiles(
+        self,
+        shape=3000,
+        stride=None,
+        pad=False,
+        level=0,
+        z=None,
+        c=None,
+        t=None,
+        coords=None,
+    ):
         """
         Generator over tiles.
 
@@ -418,60 +1067,121 @@ class BioFormatsBackend(SlideBackend):
             pad (bool): How to handle tiles on the edges. If ``True``, these edge tiles will be zero-padded
                 and yielded with the other chunks. If ``False``, incomplete edge chunks will be ignored.
                 Defaults to ``False``.
+            level (int, optional): For slides with multiple levels, which level to extract tiles from.
+                Defaults to 0 (highest resolution).
+            z (Union[int, List[int]], optional): z-plane(s) to read for each tile. If ``None``, all z-planes are read.
+                Defaults to ``None``.
+            c (Union[int, List[int]], optional): channel(s) to read for each tile. If ``None``, all channels are read.
+                Defaults to ``None``.
+            t (Union[int, List[int]], optional): timepoint(s) to read for each tile. If ``None``, all timepoints
+                are read. Defaults to ``None``.
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``generate_tile_coords()`` or ``SlideData.plan_tiles()``. If given, ``stride`` and ``pad`` are
+                ignored. Defaults to ``None``.
 
         Yields:
             pathml.core.tile.Tile: Extracted Tile object
         """
-        assert level == 0 or level is None, f"bioformats does not support levels"
-        assert isinstance(shape, int) or (
-            isinstance(shape, tuple) and len(shape) == 2
-        ), f"input shape {shape} invalid. Must be a tuple of (H, W), or a single integer for square tiles"
-        if isinstance(shape, int):
-            shape = (shape, shape)
-        assert (
-            stride is None
-            or isinstance(stride, int)
-            or (isinstance(stride, tuple) and len(stride) == 2)
-        ), f"input stride {stride} invalid. Must be a tuple of (stride_H, stride_W), or a single int"
+        level = self._check_level(level)
+        shape, stride = _check_tile_shape_stride(shape, stride)
 
-        if stride is None:
-            stride = shape
-        elif isinstance(stride, int):
-            stride = (stride, stride)
+        if coords is None:
+            coords = self.generate_tile_coords(shape, stride, pad, level=level)
 
-        i, j = self.get_image_shape()
+        for tile_coords in _coords_to_tuples(coords):
+            tile_im = self._read_tile(
+                location=tile_coords, size=shape, level=level, z=z, c=c, t=t
+            )
+            yield pathml.core.tile.Tile(image=tile_im, coords=tile_coords)
 
-        stride_i, stride_j = stride
+    def _run_in_thread(self, func, **kwargs):
+        # threads must be attached to the JVM before calling into bioformats
+        _, javabridge = _import_bioformats()
+        javabridge.attach()
+        try:
+            return func(**kwargs)
+        finally:
+            javabridge.detach()
 
-        if pad:
-            n_chunk_i = i // stride_i + 1
-            n_chunk_j = j // stride_j + 1
+    def _read_tile(self, location, size, level=0, **kwargs):
+        """
+        Read the image for a single tile, zero-padding any part of the tile outside of the image.
 
-        else:
-            n_chunk_i = (i - shape[0]) // stride_i + 1
-            n_chunk_j = (j - shape[1]) // stride_j + 1
+        Args:
+            location (Tuple[int, int]): Location of top-left corner of tile
+            size (Tuple[int, int]): Size of tile
+            level (int): level from which to extract tile
+            **kwargs: Other arguments passed through to ``extract_region()``
+
+        Returns:
+            np.ndarray: image for tile
+        """
+        i, j = self.get_image_shape(level=level)
+        if location[0] + size[0] < i and location[1] + size[1] < j:
+            return self.extract_region(
+                location=location, size=size, level=level, **kwargs
+            )
+        unpaddedshape = (
+            i - location[0] if location[0] + size[0] > i else size[0],
+            j - location[1] if location[1] + size[1] > j else size[1],
+        )
+        tile_im = self.extract_region(
+            location=location, size=unpaddedshape, level=level, **kwargs
+        )
+        zeroarrayshape = list(tile_im.shape)
+        zeroarrayshape[0], zeroarrayshape[1] = size[0], size[1]
+        padded_im = np.zeros(zeroarrayshape)
+        padded_im[: tile_im.shape[0], : tile_im.shape[1], ...] = tile_im
+        return padded_im
 
-        for ix_i in range(n_chunk_i):
-            for ix_j in range(n_chunk_j):
-                coords = (int(ix_i * stride_i), int(ix_j * stride_j))
-                if coords[0] + shape[0] < i and coords[1] + shape[1] < j:
-                    # get image for tile
-                    tile_im = self.extract_region(location=coords, size=shape)
-                    yield pathml.core.tile.Tile(image=tile_im, coords=coords)
-                else:
-                    unpaddedshape = (
-                        i - coords[0] if coords[0] + shape[0] > i else shape[0],
-                        j - coords[1] if coords[1] + shape[1] > j else shape[1],
-                    )
-                    tile_im = self.extract_region(location=coords, size=unpaddedshape)
-                    zeroarrayshape = list(tile_im.shape)
-                    zeroarrayshape[0], zeroarrayshape[1] = (
-                        list(shape)[0],
-                        list(shape)[1],
-                    )
-                    padded_im = np.zeros(zeroarrayshape)
-                    padded_im[: tile_im.shape[0], : tile_im.shape[1], ...] = tile_im
-                    yield pathml.core.tile.Tile(image=padded_im, coords=coords)
+
+# tag of the Sequence Delimitation Item, which ends encapsulated pixel data (pydicom.tag.SequenceDelimiterTag)
+_SEQUENCE_DELIMITER_TAG = 0xFFFEE0DD
+
+# JPEG Baseline (Process 1) transfer syntax, in which each frame is stored as a standalone JPEG
+_JPEG_BASELINE_TRANSFER_SYNTAX = "1.2.840.10008.1.2.4.50"
+
+
+class _LRUCache:
+    """
+    Thread-safe least-recently-used cache holding a bounded number of items.
+
+    Args:
+        maxsize (int): maximum number of items to hold. If ``maxsize <= 0``, nothing is cached.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """Get item, marking it as most recently used. Returns ``None`` if key is not in cache."""
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        """Add item, evicting the least recently used items if cache is full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
 
 
 class DICOMBackend(SlideBackend):
@@ -479,14 +1189,50 @@ class DICOMBackend(SlideBackend):
     Interface with DICOM files on disk.
     Provides efficient access to individual Frame items contained in the
     Pixel Data element without loading the entire element into memory.
-    Assumes that frames are non-overlapping. DICOM does not support multi-level images.
+    Assumes that frames are non-overlapping.
+
+    A DICOM whole-slide image is a series of instances, with one instance per resolution level. If a directory
+    or a list of instance files is passed, instances are indexed by their total pixel matrix size and exposed as
+    levels, with level 0 being the highest resolution. Label and overview images are ignored.
+
+    Decoded frames are kept in a bounded least-recently-used cache, and frames are decoded in parallel on a pool of
+    threads when generating tiles. Each read is done with ``os.pread`` (or a file handle per thread, on platforms
+    without ``os.pread``), so that threads never share a file position.
 
     Args:
-        filename (str): Path to the DICOM Part10 file on disk
+        filename (Union[str, List[str]]): Path to the DICOM Part10 file on disk. May also be a path to a directory
+            containing the instances of a DICOM whole-slide image series, or a list of paths to those instances.
+        frame_cache_size (int): Maximum number of decoded frames to keep in memory. If 0, frames are not cached.
+            Defaults to 64.
+        decode_threads (int): Number of threads used to decode frames in parallel. If 1, frames are decoded
+            serially on the calling thread. Defaults to 4.
     """
 
-    def __init__(self, filename):
-        self.filename = str(filename)
+    def __init__(self, filename, frame_cache_size=64, decode_threads=4):
+        assert (
+            isinstance(frame_cache_size, int) and frame_cache_size >= 0
+        ), f"frame_cache_size {frame_cache_size} invalid. Must be a non-negative int."
+        assert (
+            isinstance(decode_threads, int) and decode_threads >= 1
+        ), f"decode_threads {decode_threads} invalid. Must be a positive int."
+        self._init_kwargs = {
+            "filename": filename,
+            "frame_cache_size": frame_cache_size,
+            "decode_threads": decode_threads,
+        }
+        from pydicom.filebase import DicomFile
+        from pydicom.filereader import data_element_offset_to_value, dcmread
+        from pydicom.tag import TupleTag
+        from pydicom.uid import UID
+
+        instances = self._index_instances(filename)
+        self.filename = instances[0]
+        self.frame_cache_size = frame_cache_size
+        self.decode_threads = decode_threads
+        self._frame_cache = _LRUCache(maxsize=frame_cache_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._local = threading.local()
         # read metadata fields of interest from DICOM, without reading the entire PixelArray
         tags = [
             "NumberOfFrames",
@@ -495,7 +1241,7 @@ class DICOMBackend(SlideBackend):
             "TotalPixelMatrixRows",
             "TotalPixelMatrixColumns",
         ]
-        metadata = dcmread(filename, specific_tags=tags)
+        metadata = dcmread(self.filename, specific_tags=tags)
 
         # can use frame shape, total shape to map between frame index and coords
         self.frame_shape = (metadata.Rows, metadata.Columns)
@@ -517,15 +1263,128 @@ class DICOMBackend(SlideBackend):
         self.fp.seek(self.pixel_data_offset, 0)
         # note that reading this tag is necessary to advance the file to correct position
         _ = TupleTag(self.fp.read_tag())
-        # get basic offset table, to enable reading individual frames without loading entire image
-        self.bot = self.get_bot(self.fp)
-        self.first_frame = self.fp.tell()
+        # separate file descriptor for positional reads, which are safe to use across threads
+        self._fd = os.open(self.filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        self._native = not self.transfer_syntax_uid.is_compressed
+        if self._native:
+            # uncompressed pixel data is stored contiguously, so frames can be viewed directly from a memory map
+            self.bot = None
+            self.first_frame = self.pixel_data_offset + data_element_offset_to_value(
+                self.fp.is_implicit_VR, "OB"
+            )
+            self._native_dtype = self._get_native_dtype(self.metadata)
+            self._native_frame_nbytes = (
+                self.frame_shape[0]
+                * self.frame_shape[1]
+                * self.metadata.SamplesPerPixel
+                * self._native_dtype.itemsize
+            )
+            self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        else:
+            # get basic offset table, to enable reading individual frames without loading entire image
+            self.bot = self.get_bot(self.fp)
+            self.first_frame = self.fp.tell()
+
+        # lower resolution instances of the same series are additional levels
+        self._levels = [self] + [
+            DICOMBackend(
+                instance,
+                frame_cache_size=frame_cache_size,
+                decode_threads=decode_threads,
+            )
+            for instance in instances[1:]
+        ]
+        self.level_count = len(self._levels)
 
     def __repr__(self):
         out = f"DICOMBackend('{self.filename}')\n"
         out += f"image shape: {self.shape}; frame shape: {self.frame_shape}; frame grid: {(self.n_rows, self.n_cols)}"
+        if self.level_count > 1:
+            out += f"; levels: {self.level_count}"
         return out
 
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Close the files of all levels, and stop the threads decoding frames. The backend stays usable: the files are
+        reopened lazily on next use.
+        """
+        # look up attributes directly, so that closing a backend which is not open does not reopen it
+        state = self.__dict__
+        if "_fd" not in state:
+            return
+        # the first level is this backend
+        for level in state.get("_levels", [])[1:]:
+            level.close()
+        if state.get("_executor") is not None:
+            state["_executor"].shutdown(wait=False)
+        if state.get("fp") is not None:
+            state["fp"].close()
+        if state.get("_mmap") is not None:
+            try:
+                state["_mmap"].close()
+            except BufferError:
+                # frames which are still referenced keep the memory mapped until they are garbage collected
+                pass
+        os.close(state["_fd"])
+        self._mark_closed()
+
+    @staticmethod
+    def _index_instances(filename):
+        """
+        Find the instances making up a DICOM whole-slide image.
+
+        Args:
+            filename (Union[str, List[str]]): path to single DICOM file, path to directory of DICOM files, or list
+                of paths to DICOM files
+
+        Returns:
+            list: paths to instances, one per resolution level, sorted from highest to lowest resolution
+        """
+        from pydicom.errors import InvalidDicomError
+        from pydicom.filereader import dcmread
+
+        if isinstance(filename, (list, tuple)):
+            paths = [str(f) for f in filename]
+        elif os.path.isdir(filename):
+            paths = sorted(str(p) for p in Path(filename).iterdir() if p.is_file())
+        else:
+            return [str(filename)]
+
+        instances = {}
+        for path in paths:
+            try:
+                metadata = dcmread(
+                    path,
+                    specific_tags=[
+                        "ImageType",
+                        "TotalPixelMatrixRows",
+                        "TotalPixelMatrixColumns",
+                    ],
+                )
+            except InvalidDicomError:
+                # skip any files in directory which are not DICOM
+                continue
+            if "TotalPixelMatrixRows" not in metadata:
+                continue
+            image_type = metadata.get("ImageType", [])
+            if len(image_type) > 2 and image_type[2] in {"LABEL", "OVERVIEW"}:
+                continue
+            shape = (metadata.TotalPixelMatrixRows, metadata.TotalPixelMatrixColumns)
+            # only one instance per resolution level is supported
+            instances.setdefault(shape, path)
+
+        if not instances:
+            raise ValueError(
+                f"no DICOM whole-slide image instances found in {filename}"
+            )
+        return [
+            instances[shape]
+            for shape in sorted(instances, key=lambda s: s[0] * s[1], reverse=True)
+        ]
+
     @staticmethod
     def get_bot(fp):
         """
@@ -538,6 +1397,9 @@ class DICOMBackend(SlideBackend):
         Returns:
             list: Offset of each Frame of the Pixel Data element following the Basic Offset Table
         """
+        from pydicom.encaps import get_frame_offsets
+        from pydicom.filereader import data_element_offset_to_value
+
         # Skip Pixel Data element header
         pixel_data_offset = data_element_offset_to_value(fp.is_implicit_VR, "OB")
         fp.seek(pixel_data_offset - 4, 1)
@@ -546,17 +1408,87 @@ class DICOMBackend(SlideBackend):
         fp.seek(first_frame_offset, 0)
         return basic_offset_table
 
-    def get_image_shape(self):
+    def get_image_shape(self, level=0):
+        """
+        Get the shape of the image at specified level.
+
+        Args:
+            level (int): Which level to get shape from. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            Tuple[int, int]: Shape of image at target level (H, W)
+        """
+        level = self._check_level(level)
+        return self._levels[level].shape
+
+    def get_raw_tile_shape(self, level=0):
         """
-        Get the shape of the image.
+        Get the shape of the compressed frames in which the image is stored, if they can be read directly with
+        ``read_raw_tile()``. This is only possible for images with the JPEG Baseline transfer syntax.
+
+        Args:
+            level (int): Which level to get frame shape from. Level 0 is highest resolution. Defaults to 0.
 
         Returns:
-            Tuple[int, int]: Shape of image (H, W)
+            Tuple[int, int]: (H, W) shape of frames, or ``None`` if compressed frames cannot be read directly
         """
-        return self.shape
+        level = self._check_level(level)
+        if level != 0:
+            return self._levels[level].get_raw_tile_shape()
+        if self.transfer_syntax_uid != _JPEG_BASELINE_TRANSFER_SYNTAX:
+            return None
+        return self.frame_shape
+
+    def read_raw_tile(self, location, level=0):
+        """
+        Read one compressed frame, without decoding it.
+
+        Args:
+            location (Tuple[int, int]): (i, j) location of top-left corner of frame
+            level (int): level from which to read frame. Level 0 is highest resolution. Defaults to 0.
 
+        Returns:
+            bytes: JPEG-encoded frame
+        """
+        level = self._check_level(level)
+        if level != 0:
+            return self._levels[level].read_raw_tile(location=location)
+        if self.get_raw_tile_shape() is None:
+            raise NotImplementedError(
+                f"cannot read compressed frames directly from {self} with transfer syntax "
+                f"{self.transfer_syntax_uid}: only JPEG Baseline is supported"
+            )
+        row, col = _raw_tile_index(location, self.frame_shape, self.shape)
+        return self._read_frame_bytes(row * self.n_cols + col)
+
+    @_cache_thumbnail
     def get_thumbnail(self, size, **kwargs):
-        raise NotImplementedError("DICOMBackend does not support thumbnail")
+        """
+        Get a thumbnail of the slide.
+        The thumbnail is read from the smallest level that is at least as large as the requested size
+        (or the smallest level, if none are large enough), and resized to fit within ``size``
+        while preserving aspect ratio.
+
+        Args:
+            size (Tuple[int, int]): the maximum (H, W) size of the thumbnail
+
+        Returns:
+            np.ndarray: RGB thumbnail image
+        """
+        level = self.level_count - 1
+        for candidate in reversed(range(self.level_count)):
+            level_h, level_w = self.get_image_shape(level=candidate)
+            if level_h >= size[0] and level_w >= size[1]:
+                level = candidate
+                break
+        level_shape = self.get_image_shape(level=level)
+        image = self.extract_region(location=(0, 0), size=level_shape, level=level)
+        ratio = min(size[0] / level_shape[0], size[1] / level_shape[1])
+        if ratio < 1:
+            from scipy.ndimage import zoom
+
+            image = zoom(image, (ratio, ratio) + (1,) * (image.ndim - 2), order=1)
+        return image
 
     def _index_to_coords(self, index):
         """
@@ -611,57 +1543,155 @@ class DICOMBackend(SlideBackend):
 
     def extract_region(self, location, size=None, level=None):
         """
-        Extract a single frame from the DICOM image.
+        Extract a region of the DICOM image.
+        The region does not need to be aligned with frame boundaries: only the frames which overlap the region are
+        decoded (reusing cached frames where possible), and then stitched together and cropped.
+        Areas of the region outside of the image are zero-padded.
 
         Args:
-            location (Union[int, Tuple[int, int]]): coordinate location of top-left corner of frame, or integer index
-                of frame.
-            size (Union[int, Tuple[int, int]]): Size of each tile. May be a tuple of (height, width) or a
-                single integer, in which case square tiles of that size are generated.
-                Must be the same as the frame size.
+            location (Union[int, Tuple[int, int]]): coordinate location of top-left corner of region, or integer
+                index of frame. If an integer index is passed, the entire frame is returned and ``size`` is ignored.
+                Coordinates are relative to the target level.
+            size (Union[int, Tuple[int, int]]): Size of region. May be a tuple of (height, width) or a
+                single integer, in which case a square region of that size is extracted.
+                If ``None``, uses the frame size. Defaults to ``None``.
+            level (int): level from which to extract region. Level 0 is highest resolution.
+                Defaults to ``None`` (level 0).
 
         Returns:
             np.ndarray: image at the specified region
         """
-        assert level == 0 or level is None, f"dicom does not support levels"
+        level = self._check_level(level)
+        if level != 0:
+            return self._levels[level].extract_region(location=location, size=size)
         # check inputs first
         # check location
-        if isinstance(location, tuple):
-            frame_ix = self._coords_to_index(location)
-        elif isinstance(location, int):
-            frame_ix = location
-        else:
+        if isinstance(location, (int, np.integer)):
+            if not 0 <= location < self.n_frames:
+                raise ValueError(
+                    f"location {location} invalid. Exceeds total number of frames ({self.n_frames})"
+                )
+            # frames are shared with the frame cache or the memory-mapped file, so callers get their own copy
+            return self._read_frame(location).copy()
+        if not (
+            isinstance(location, tuple)
+            and len(location) == 2
+            and all([isinstance(x, (int, np.integer)) for x in location])
+        ):
             raise ValueError(
                 f"Invalid location: {location}. Must be an int frame index or tuple of (i, j) coordinates"
             )
-        if frame_ix > self.n_frames:
+        # check size
+        if size is None:
+            size = self.frame_shape
+        elif isinstance(size, int):
+            size = (size, size)
+        if not (
+            isinstance(size, tuple)
+            and len(size) == 2
+            and all([isinstance(x, int) and x > 0 for x in size])
+        ):
             raise ValueError(
-                f"location {location} invalid. Exceeds total number of frames ({self.n_frames})"
+                f"Input size {size} not valid. Must be an integer or a tuple of two integers."
             )
-        # check size
-        if size:
-            if type(size) is int:
-                size = (size, size)
-            if size != self.frame_shape:
-                raise ValueError(
-                    f"Input size {size} must equal frame shape in DICOM image {self.frame_shape}"
-                )
 
-        return self._read_frame(frame_ix)
+        i0, j0 = int(location[0]), int(location[1])
+        h, w = size
+        frame_i, frame_j = self.frame_shape
 
-    def _read_frame(self, frame_ix):
+        # fast path if region is exactly one frame
+        if (
+            size == self.frame_shape
+            and i0 % frame_i == 0
+            and j0 % frame_j == 0
+            and 0 <= i0 < self.n_rows * frame_i
+            and 0 <= j0 < self.n_cols * frame_j
+        ):
+            frame = self._read_frame(self._coords_to_index((i0, j0)))
+            return self._crop_to_image(frame, (i0, j0))
+
+        # find all frames which overlap the region
+        rows = range(max(i0 // frame_i, 0), min(-(-(i0 + h) // frame_i), self.n_rows))
+        cols = range(max(j0 // frame_j, 0), min(-(-(j0 + w) // frame_j), self.n_cols))
+        frame_indices = [
+            row * self.n_cols + col
+            for row in rows
+            for col in cols
+            if row * self.n_cols + col < self.n_frames
+        ]
+
+        region = None
+        for frame_ix, frame in zip(frame_indices, self._read_frames(frame_indices)):
+            if region is None:
+                region = np.zeros((h, w) + frame.shape[2:], dtype=frame.dtype)
+            top, left = self._index_to_coords(frame_ix)
+            # intersection of frame and region, excluding anything outside of the image
+            r0, r1 = max(top, i0), min(top + frame_i, i0 + h, self.shape[0])
+            c0, c1 = max(left, j0), min(left + frame_j, j0 + w, self.shape[1])
+            if r0 < r1 and c0 < c1:
+                region[r0 - i0 : r1 - i0, c0 - j0 : c1 - j0] = frame[
+                    r0 - top : r1 - top, c0 - left : c1 - left
+                ]
+        if region is None:
+            # region does not overlap the image at all
+            region = np.zeros((h, w, self.metadata.SamplesPerPixel), dtype=np.uint8)
+        return region
+
+    def _crop_to_image(self, frame, location):
+        """
+        Zero out any pixels of a frame which fall outside of the image, i.e. the padding of frames on the
+        bottom and right edges of the image.
+
+        Args:
+            frame (np.ndarray): frame pixel data
+            location (Tuple[int, int]): coordinates of top-left corner of frame
+
+        Returns:
+            np.ndarray: writable copy of frame, with pixels outside of image set to zero. Frames themselves are
+            read-only, since they are shared with the frame cache or the memory-mapped file.
+        """
+        valid_i = self.shape[0] - location[0]
+        valid_j = self.shape[1] - location[1]
+        if valid_i >= frame.shape[0] and valid_j >= frame.shape[1]:
+            return frame.copy()
+        cropped = np.zeros_like(frame)
+        cropped[:valid_i, :valid_j] = frame[:valid_i, :valid_j]
+        return cropped
+
+    def _pread(self, n, offset):
+        """
+        Read bytes from the file at the given offset, without using a shared file position.
+
+        Args:
+            n (int): number of bytes to read
+            offset (int): offset from start of file
+
+        Returns:
+            bytes: data read from file
         """
-        Reads and decodes the pixel data of one frame.
+        if hasattr(os, "pread"):
+            return os.pread(self._fd, n, offset)
+        # on platforms without pread, use a separate file handle for each thread
+        fp = getattr(self._local, "fp", None)
+        if fp is None:
+            fp = open(self.filename, "rb")
+            self._local.fp = fp
+        fp.seek(offset, 0)
+        return fp.read(n)
+
+    def _read_frame_bytes(self, frame_ix):
+        """
+        Reads the encoded pixel data of one frame.
         Based on implementation from highDICOM: https://github.com/MGHComputationalPathology/highdicom
 
         Args:
             frame_ix (int): zero-based index of the frame
 
         Returns:
-            np.ndarray: pixel data of that frame
+            bytes: encoded pixel data of that frame
         """
-        frame_offset = self.bot[int(frame_ix)]
-        self.fp.seek(self.first_frame + frame_offset, 0)
+        frame_offset = self.bot[frame_ix]
+        position = self.first_frame + frame_offset
         try:
             stop_at = self.bot[frame_ix + 1] - frame_offset
         except IndexError:
@@ -670,14 +1700,86 @@ class DICOMBackend(SlideBackend):
         # A frame may comprised of multiple chunks
         chunks = []
         while True:
-            tag = TupleTag(self.fp.read_tag())
-            if n == stop_at or int(tag) == SequenceDelimiterTag:
+            # item headers in encapsulated pixel data are always little endian: (group, element, length)
+            header = self._pread(8, position + n)
+            if len(header) < 8:
+                break
+            group, element, length = struct.unpack("<HHL", header)
+            if n == stop_at or ((group << 16) | element) == _SEQUENCE_DELIMITER_TAG:
                 break
-            length = self.fp.read_UL()
-            chunks.append(self.fp.read(length))
+            chunks.append(self._pread(length, position + n + 8))
             n += 8 + length
 
-        frame_bytes = b"".join(chunks)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _get_native_dtype(metadata):
+        """
+        Get the numpy dtype of uncompressed pixel data.
+
+        Args:
+            metadata (pydicom.dataset.Dataset): DICOM metadata
+
+        Returns:
+            np.dtype: dtype of pixels
+        """
+        bits_allocated = metadata.BitsAllocated
+        if bits_allocated not in {8, 16, 32}:
+            raise NotImplementedError(
+                f"uncompressed pixel data with BitsAllocated={bits_allocated} not supported"
+            )
+        byteorder = (
+            "<" if metadata.file_meta.TransferSyntaxUID.is_little_endian else ">"
+        )
+        kind = "i" if metadata.get("PixelRepresentation", 0) == 1 else "u"
+        return np.dtype(f"{byteorder}{kind}{bits_allocated // 8}")
+
+    def _read_native_frame(self, frame_ix):
+        """
+        Get the pixel data of one frame of an uncompressed image, as a view into the memory-mapped file.
+        No pixel data is copied.
+
+        Args:
+            frame_ix (int): zero-based index of the frame
+
+        Returns:
+            np.ndarray: read-only view of pixel data of that frame
+        """
+        rows, columns = self.frame_shape
+        samples_per_pixel = self.metadata.SamplesPerPixel
+        frame = np.frombuffer(
+            self._mmap,
+            dtype=self._native_dtype,
+            count=rows * columns * samples_per_pixel,
+            offset=self.first_frame + frame_ix * self._native_frame_nbytes,
+        )
+        if samples_per_pixel == 1:
+            return frame.reshape(rows, columns)
+        if self.metadata.get("PlanarConfiguration", 0) == 1:
+            # samples are stored as separate planes
+            return np.moveaxis(frame.reshape(samples_per_pixel, rows, columns), 0, -1)
+        return frame.reshape(rows, columns, samples_per_pixel)
+
+    def _read_frame(self, frame_ix):
+        """
+        Reads and decodes the pixel data of one frame, using cached frame if available.
+        For uncompressed transfer syntaxes, frames are not decoded or cached, and a view into the memory-mapped
+        file is returned instead.
+
+        Args:
+            frame_ix (int): zero-based index of the frame
+
+        Returns:
+            np.ndarray: pixel data of that frame. Array is read-only, since it may be shared through the cache.
+        """
+        frame_ix = int(frame_ix)
+        if self._native:
+            return self._read_native_frame(frame_ix)
+        cached = self._frame_cache.get(frame_ix)
+        if cached is not None:
+            return cached
+
+        frame_bytes = self._read_frame_bytes(frame_ix)
 
         decoded_frame_array = self._decode_frame(
             value=frame_bytes,
@@ -686,9 +1788,43 @@ class DICOMBackend(SlideBackend):
             samples_per_pixel=self.metadata.SamplesPerPixel,
             transfer_syntax_uid=self.metadata.file_meta.TransferSyntaxUID,
         )
-
+        decoded_frame_array.flags.writeable = False
+        self._frame_cache.put(frame_ix, decoded_frame_array)
         return decoded_frame_array
 
+    def _read_frames(self, frame_indices):
+        """
+        Generator over decoded frames.
+        If ``decode_threads > 1``, frames are decoded ahead of time on a thread pool, with a bounded number of
+        frames in flight. Frames are always yielded in the same order as ``frame_indices``.
+
+        Args:
+            frame_indices (Iterable[int]): zero-based indices of frames
+
+        Yields:
+            np.ndarray: pixel data of each frame
+        """
+        if self.decode_threads == 1:
+            for frame_ix in frame_indices:
+                yield self._read_frame(frame_ix)
+            return
+
+        # frames may be read from several threads at once, which must share a single pool
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.decode_threads)
+            executor = self._executor
+        frame_indices = iter(frame_indices)
+        in_flight = deque(
+            executor.submit(self._read_frame, frame_ix)
+            for frame_ix in islice(frame_indices, 2 * self.decode_threads)
+        )
+        while in_flight:
+            frame = in_flight.popleft().result()
+            for frame_ix in islice(frame_indices, 1):
+                in_flight.append(executor.submit(self._read_frame, frame_ix))
+            yield frame
+
     @staticmethod
     def _decode_frame(
         value,
@@ -715,6 +1851,8 @@ class DICOMBackend(SlideBackend):
         Returns:
             np.ndarray: decoded pixel data
         """
+        from pydicom.dataset import Dataset
+
         filemetadata = Dataset()
         filemetadata.TransferSyntaxUID = transfer_syntax_uid
         dataset = Dataset()
@@ -726,34 +1864,659 @@ class DICOMBackend(SlideBackend):
         image = Image.open(BytesIO(value))
         return np.asarray(image)
 
-    def generate_tiles(self, shape, stride, pad, level=0, **kwargs):
+    def generate_tiles(
+        self, shape=None, stride=None, pad=False, level=0, coords=None, **kwargs
+    ):
         """
         Generator over tiles.
-        For DICOMBackend, each tile corresponds to a frame.
+        Tiles do not need to be aligned with the frames of the DICOM image. When tiles coincide exactly with frames
+        (i.e. tiles have the frame shape and are aligned to the frame grid), frames are decoded ahead of time in
+        parallel.
+
+        Padding works as follows:
+        If ``pad is False``, then the first tile will start flush with the edge of the image, and the tile locations
+        will increment according to specified stride, stopping with the last tile that is fully contained in the image.
+        If ``pad is True``, then the first tile will start flush with the edge of the image, and the tile locations
+        will increment according to specified stride, stopping with the last tile which starts in the image. Regions
+        outside the image will be padded with 0.
 
         Args:
             shape (int or tuple(int)): Size of each tile. May be a tuple of (height, width) or a single integer,
-                in which case square tiles of that size are generated. Must match frame size.
-            stride (int): Ignored for DICOMBackend. Frames are yielded individually.
+                in which case square tiles of that size are generated. If ``None``, uses the frame size.
+                Defaults to ``None``.
+            stride (int): stride between chunks. If ``None``, uses ``stride = size`` for non-overlapping chunks.
+                Defaults to ``None``.
             pad (bool): How to handle tiles on the edges. If ``True``, these edge tiles will be zero-padded
                 and yielded with the other chunks. If ``False``, incomplete edge chunks will be ignored.
                 Defaults to ``False``.
+            level (int, optional): For slides with multiple levels, which level to extract tiles from.
+                Defaults to 0 (highest resolution).
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``generate_tile_coords()`` or ``SlideData.plan_tiles()``. If given, ``stride`` and ``pad`` are
+                ignored. Defaults to ``None``.
 
         Yields:
             pathml.core.tile.Tile: Extracted Tile object
         """
-        assert level == 0 or level is None, f"dicom does not support levels"
-        for i in range(self.n_frames):
-
-            if not pad:
-                # skip frame if it's in the last column
-                if i % self.n_cols == (self.n_cols - 1):
-                    continue
-                # skip frame if it's in the last row
-                if i >= (self.n_frames - self.n_cols):
-                    continue
-
-            frame_im = self.extract_region(location=i)
-            coords = self._index_to_coords(i)
-            frame_tile = pathml.core.tile.Tile(image=frame_im, coords=coords)
-            yield frame_tile
+        level = self._check_level(level)
+        if level != 0:
+            yield from self._levels[level].generate_tiles(
+                shape=shape, stride=stride, pad=pad, coords=coords
+            )
+            return
+        if shape is None:
+            shape = self.frame_shape
+        shape, stride = _check_tile_shape_stride(shape, stride)
+
+        if coords is None:
+            coords = self.generate_tile_coords(shape, stride, pad)
+        tile_coords = _coords_to_tuples(coords)
+
+        frame_aligned = shape == self.frame_shape
+        if frame_aligned:
+            # tiles which are exactly one frame can be decoded ahead of time
+            frame_coords = [
+                coords
+                for coords in tile_coords
+                if coords[0] % self.frame_shape[0] == 0
+                and coords[1] % self.frame_shape[1] == 0
+                and 0 <= coords[0] < self.n_rows * self.frame_shape[0]
+                and 0 <= coords[1] < self.n_cols * self.frame_shape[1]
+            ]
+            frames = self._read_frames(
+                self._coords_to_index(coords) for coords in frame_coords
+            )
+            frame_coords = set(frame_coords)
+
+        for coords in tile_coords:
+            if frame_aligned and coords in frame_coords:
+                tile_im = self._crop_to_image(next(frames), coords)
+            else:
+                tile_im = self.extract_region(location=coords, size=shape)
+            yield pathml.core.tile.Tile(image=tile_im, coords=coords)
+
+
+class TiffFileBackend(SlideBackend):
+    """
+    Use tifffile to interface with TIFF files, including OME-TIFF and qptiff, without starting a Java virtual machine.
+
+    Only the TIFF tiles or strips which intersect a requested region are read from disk and decoded.
+    Supports multi-level (pyramidal) images; level 0 is highest resolution.
+    As with :class:`~pathml.core.slide_backends.BioFormatsBackend`, regions are returned as 5-dimensional arrays of
+    shape (H, W, Z, C, T), with RGB samples stored along the channel axis. Pixel values keep the dtype of the file.
+
+    Depends on `tifffile <https://github.com/cgohlke/tifffile>`_. Compressed files (e.g. JPEG) additionally require
+    `imagecodecs <https://github.com/cgohlke/imagecodecs>`_.
+
+    Args:
+        filename (str): path to image file on disk
+    """
+
+    def __init__(self, filename):
+        self._init_kwargs = {"filename": filename}
+        self.filename = str(filename)
+        self._tif = tifffile.TiffFile(self.filename)
+        # tiles may be read from several threads, which share the file handle
+        self._tif.filehandle.lock = True
+        series = self._tif.series[0]
+        axes = series.axes
+        # generic page sequences and unknown axes are treated as channels
+        if "C" not in axes:
+            axes = axes.replace("I", "C").replace("Q", "C")
+        if "Y" not in axes or "X" not in axes:
+            raise ValueError(
+                f"cannot read {self.filename} with TiffFileBackend: series has axes {series.axes}"
+            )
+        if any(ax not in "ZCTYXS" for ax in axes):
+            raise ValueError(
+                f"cannot read {self.filename} with TiffFileBackend: unsupported axes {series.axes}"
+            )
+        self._axes = axes
+        self._levels = series.levels
+        self.level_count = len(self._levels)
+        dims = dict(zip(axes, series.shape))
+        self._n_samples = dims.get("S", 1)
+        self._plane_axes = [ax for ax in axes if ax in "ZCT"]
+        self._plane_shape = tuple(dims[ax] for ax in self._plane_axes)
+        self.shape = (
+            dims["Y"],
+            dims["X"],
+            dims.get("Z", 1),
+            dims.get("C", 1) * self._n_samples,
+            dims.get("T", 1),
+        )
+        self.dtype = series.dtype
+
+    def __repr__(self):
+        return f"TiffFileBackend('{self.filename}')"
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Close the TIFF file. The backend stays usable: the file is reopened lazily on next use.
+        """
+        # look up the handle directly, so that closing a backend which is not open does not reopen it
+        tif = self.__dict__.get("_tif")
+        if tif is None:
+            return
+        tif.close()
+        self._mark_closed()
+
+    @staticmethod
+    def can_read(filename):
+        """
+        Check whether a file can be read by TiffFileBackend.
+
+        Args:
+            filename (str): path to image file on disk
+
+        Returns:
+            bool: True if the file is a TIFF which TiffFileBackend can read
+        """
+        try:
+            backend = TiffFileBackend(filename)
+        except Exception:
+            return False
+        backend.close()
+        return True
+
+    def get_image_shape(self, level=0):
+        """
+        Get the shape of the image at specified level.
+
+        Args:
+            level (int): Which level to get shape from. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            Tuple[int, int]: Shape of image at target level (H, W)
+        """
+        level = self._check_level(level)
+        dims = dict(zip(self._axes, self._levels[level].shape))
+        return dims["Y"], dims["X"]
+
+    def get_raw_tile_shape(self, level=0):
+        """
+        Get the shape of the compressed tiles in which the image is stored, if they can be read directly with
+        ``read_raw_tile()``. This is only possible for single-plane images stored as JPEG-compressed tiles with
+        interleaved samples (e.g. Aperio SVS).
+
+        Args:
+            level (int): Which level to get tile shape from. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            Tuple[int, int]: (H, W) shape of stored tiles, or ``None`` if compressed tiles cannot be read directly
+        """
+        level = self._check_level(level)
+        keyframe = self._levels[level].keyframe
+        if (
+            self._plane_axes
+            or not keyframe.is_tiled
+            or keyframe.compression != tifffile.COMPRESSION.JPEG
+            or keyframe.planarconfig == tifffile.PLANARCONFIG.SEPARATE
+        ):
+            return None
+        return keyframe.tilelength, keyframe.tilewidth
+
+    def read_raw_tile(self, location, level=0):
+        """
+        Read one stored compressed tile as a standalone JPEG, without decoding it.
+
+        Args:
+            location (Tuple[int, int]): (i, j) location of top-left corner of tile. Must be aligned to the grid of
+                stored tiles, i.e. a multiple of ``get_raw_tile_shape()``.
+            level (int): level from which to read tile. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            bytes: JPEG-encoded tile, or ``None`` if the tile is not stored in the file
+        """
+        tile_shape = self.get_raw_tile_shape(level=level)
+        if tile_shape is None:
+            raise NotImplementedError(
+                f"cannot read compressed tiles directly from {self}: only JPEG-compressed tiled images are supported"
+            )
+        image_shape = self.get_image_shape(level=level)
+        row, col = _raw_tile_index(location, tile_shape, image_shape)
+        page = self._levels[level].pages[0]
+        index = row * -(-image_shape[1] // tile_shape[1]) + col
+        bytecount = page.databytecounts[index]
+        if bytecount == 0:
+            return None
+        fh = page.parent.filehandle
+        with fh.lock:
+            fh.seek(page.dataoffsets[index])
+            data = fh.read(bytecount)
+        keyframe = page.keyframe
+        return _standalone_jpeg(
+            data,
+            jpegtables=keyframe.jpegtables,
+            rgb=keyframe.photometric == tifffile.PHOTOMETRIC.RGB,
+        )
+
+    def _read_page_region(self, page, location, size):
+        """
+        Read a region of a single TIFF page, decoding only the tiles or strips which intersect the region.
+        Areas of the region outside of the page are zero-padded.
+
+        Args:
+            page (Union[tifffile.TiffPage, tifffile.TiffFrame]): page to read from
+            location (Tuple[int, int]): (i, j) location of top-left corner of region
+            size (Tuple[int, int]): (H, W) size of region
+
+        Returns:
+            np.ndarray: region of shape (H, W, samples)
+        """
+        keyframe = page.keyframe
+        i0, j0 = location
+        h, w = size
+        page_h, page_w = keyframe.imagelength, keyframe.imagewidth
+        if keyframe.is_tiled:
+            seg_h, seg_w = keyframe.tilelength, keyframe.tilewidth
+        else:
+            seg_h, seg_w = keyframe.rowsperstrip or page_h, page_w
+        n_seg_i = -(-page_h // seg_h)
+        n_seg_j = -(-page_w // seg_w)
+        # with separate planar configuration, each sample is stored in its own set of segments
+        separate = keyframe.planarconfig == 2
+        n_samples = keyframe.samplesperpixel
+        out = np.zeros((h, w, n_samples), dtype=keyframe.dtype)
+
+        rows = range(max(i0 // seg_h, 0), min(-(-(i0 + h) // seg_h), n_seg_i))
+        cols = range(max(j0 // seg_w, 0), min(-(-(j0 + w) // seg_w), n_seg_j))
+        fh = page.parent.filehandle
+        for sample in range(n_samples if separate else 1):
+            for row in rows:
+                for col in cols:
+                    index = row * n_seg_j + col
+                    if separate:
+                        index += sample * n_seg_i * n_seg_j
+                    bytecount = page.databytecounts[index]
+                    if bytecount == 0:
+                        # missing segments are treated as empty
+                        continue
+                    with fh.lock:
+                        fh.seek(page.dataoffsets[index])
+                        data = fh.read(bytecount)
+                    segment, _, _ = keyframe.decode(
+                        data, index, jpegtables=keyframe.jpegtables
+                    )
+                    segment = segment.reshape(segment.shape[-3:])
+                    # intersection of segment with requested region, in image coordinates
+                    top, left = row * seg_h, col * seg_w
+                    r0, r1 = max(top, i0), min(top + segment.shape[0], i0 + h, page_h)
+                    c0, c1 = max(left, j0), min(left + segment.shape[1], j0 + w, page_w)
+                    if r0 >= r1 or c0 >= c1:
+                        continue
+                    block = segment[r0 - top : r1 - top, c0 - left : c1 - left]
+                    if separate:
+                        out[r0 - i0 : r1 - i0, c0 - j0 : c1 - j0, sample] = block[
+                            ..., 0
+                        ]
+                    else:
+                        out[r0 - i0 : r1 - i0, c0 - j0 : c1 - j0, :] = block
+        return out
+
+    def extract_region(self, location, size, level=None, z=None, c=None, t=None):
+        """
+        Extract a region of the image. Regions extending beyond the image are zero-padded.
+
+        Args:
+            location (Tuple[int, int]): (i, j) location of top-left corner of region, relative to the target level
+            size (Union[int, Tuple[int, int]]): Size of region. May be a tuple of (height, width) or a
+                single integer, in which case a square region of that size is extracted.
+            level (int, optional): level from which to extract region. Level 0 is highest resolution.
+                Defaults to ``None`` (level 0).
+            z (Union[int, List[int]], optional): z-plane(s) to read. If ``None``, all z-planes are read.
+                Defaults to ``None``.
+            c (Union[int, List[int]], optional): channel(s) to read. If ``None``, all channels are read.
+                Defaults to ``None``.
+            t (Union[int, List[int]], optional): timepoint(s) to read. If ``None``, all timepoints are read.
+                Defaults to ``None``.
+
+        Returns:
+            np.ndarray: image at the specified region, of shape (H, W, Z, C, T)
+        """
+        level = self._check_level(level)
+        if isinstance(size, int):
+            size = (size, size)
+        if not (
+            isinstance(size, tuple)
+            and len(size) == 2
+            and all([isinstance(x, int) for x in size])
+        ):
+            raise ValueError(
+                f"Input size {size} not valid. Must be an integer or a tuple of two integers."
+            )
+        if not (
+            isinstance(location, tuple)
+            and len(location) == 2
+            and all([isinstance(x, (int, np.integer)) for x in location])
+        ):
+            raise ValueError(
+                f"input location {location} invalid. Must be a tuple of two integer coordinates"
+            )
+        z = _normalize_dim_selector(z, self.shape[2], "z")
+        c = _normalize_dim_selector(c, self.shape[3], "c")
+        t = _normalize_dim_selector(t, self.shape[4], "t")
+
+        pages = self._levels[level].pages
+        array = np.zeros((size[0], size[1], len(z), len(c), len(t)), dtype=self.dtype)
+        for z_out, z_ix in enumerate(z):
+            for t_out, t_ix in enumerate(t):
+                # group requested channels by page, so that each page is only decoded once
+                channels_by_page = {}
+                for c_out, c_ix in enumerate(c):
+                    plane_ix = {"Z": z_ix, "C": c_ix // self._n_samples, "T": t_ix}
+                    page_ix = (
+                        int(
+                            np.ravel_multi_index(
+                                [plane_ix[ax] for ax in self._plane_axes],
+                                self._plane_shape,
+                            )
+                        )
+                        if self._plane_axes
+                        else 0
+                    )
+                    channels_by_page.setdefault(page_ix, []).append(
+                        (c_out, c_ix % self._n_samples)
+                    )
+                for page_ix, channels in channels_by_page.items():
+                    plane = self._read_page_region(
+                        pages[page_ix], location=location, size=size
+                    )
+                    for c_out, sample in channels:
+                        array[:, :, z_out, c_out, t_out] = plane[:, :, sample]
+        return array
+
+    @_cache_thumbnail
+    def get_thumbnail(self, size):
+        """
+        Get a thumbnail of the image, for z=0 and t=0.
+        The thumbnail is read from the smallest level that is at least as large as the requested size
+        (or the smallest level, if none are large enough), and resized to fit within ``size``
+        while preserving aspect ratio.
+
+        Args:
+            size (Tuple[int, int]): the maximum (H, W) size of the thumbnail
+
+        Returns:
+            np.ndarray: thumbnail image of shape (H, W, C)
+        """
+        level = self.level_count - 1
+        for candidate in reversed(range(self.level_count)):
+            level_h, level_w = self.get_image_shape(level=candidate)
+            if level_h >= size[0] and level_w >= size[1]:
+                level = candidate
+                break
+        level_shape = self.get_image_shape(level=level)
+        image = self.extract_region(
+            location=(0, 0), size=tuple(level_shape), level=level, z=0, t=0
+        )[:, :, 0, :, 0]
+        ratio = min(size[0] / level_shape[0], size[1] / level_shape[1])
+        if ratio < 1:
+            from scipy.ndimage import zoom
+
+            image = zoom(image, (ratio, ratio, 1), order=1)
+        return image
+
+    def generate_tiles(
+        self,
+        shape=3000,
+        stride=None,
+        pad=False,
+        level=0,
+        z=None,
+        c=None,
+        t=None,
+        coords=None,
+    ):
+        """
+        Generator over tiles.
+
+        Padding works as follows:
+        If ``pad is False``, then the first tile will start flush with the edge of the image, and the tile locations
+        will increment according to specified stride, stopping with the last tile that is fully contained in the image.
+        If ``pad is True``, then the first tile will start flush with the edge of the image, and the tile locations
+        will increment according to specified stride, stopping with the last tile which starts in the image. Regions
+        outside the image will be padded with 0.
+        For example, for a 5x5 image with a tile size of 3 and a stride of 2, tile generation with ``pad=False`` will
+        create 4 tiles total, compared to 6 tiles if ``pad=True``.
+
+        Args:
+            shape (int or tuple(int)): Size of each tile. May be a tuple of (height, width) or a single integer,
+                in which case square tiles of that size are generated.
+            stride (int): stride between chunks. If ``None``, uses ``stride = size`` for non-overlapping chunks.
+                Defaults to ``None``.
+            pad (bool): How to handle tiles on the edges. If ``True``, these edge tiles will be zero-padded
+                and yielded with the other chunks. If ``False``, incomplete edge chunks will be ignored.
+                Defaults to ``False``.
+            level (int, optional): For slides with multiple levels, which level to extract tiles from.
+                Defaults to 0 (highest resolution).
+            z (Union[int, List[int]], optional): z-plane(s) to read for each tile. If ``None``, all z-planes are read.
+                Defaults to ``None``.
+            c (Union[int, List[int]], optional): channel(s) to read for each tile. If ``None``, all channels are read.
+                Defaults to ``None``.
+            t (Union[int, List[int]], optional): timepoint(s) to read for each tile. If ``None``, all timepoints
+                are read. Defaults to ``None``.
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``generate_tile_coords()`` or ``SlideData.plan_tiles()``. If given, ``stride`` and ``pad`` are
+                ignored. Defaults to ``None``.
+
+        Yields:
+            pathml.core.tile.Tile: Extracted Tile object
+        """
+        shape, stride = _check_tile_shape_stride(shape, stride)
+        level = self._check_level(level)
+
+        if coords is None:
+            coords = self.generate_tile_coords(shape, stride, pad, level=level)
+
+        for tile_coords in _coords_to_tuples(coords):
+            # get image for tile
+            tile_im = self.extract_region(
+                location=tile_coords, size=shape, level=level, z=z, c=c, t=t
+            )
+            yield pathml.core.tile.Tile(image=tile_im, coords=tile_coords)
+
+
+class _MemmapRef:
+    """
+    Reference to a memory-mapped numpy array, which is pickled as the location of the array on disk instead of its
+    contents.
+
+    Args:
+        array (np.memmap): memory-mapped array, mapping a contiguous region of a file
+    """
+
+    def __init__(self, array):
+        self.filename = array.filename
+        self.dtype = array.dtype
+        self.shape = array.shape
+        self.offset = array.offset
+
+    def open(self):
+        return np.memmap(
+            self.filename,
+            dtype=self.dtype,
+            mode="r",
+            offset=self.offset,
+            shape=self.shape,
+        )
+
+
+class ArrayBackend(SlideBackend):
+    """
+    Interface with an image held in an array (e.g. a numpy array, memory-mapped array, or zarr array) instead of a
+    slide file. Useful for testing and benchmarking without slide files
+    (see :func:`~pathml.core.synthetic.synthetic_slide`).
+
+    The first two dimensions of the array are the spatial (H, W) dimensions; any further dimensions are returned
+    as they are, e.g. (H, W, 3) for RGB images or (H, W, Z, C, T) for multiparametric images. Regions are read by
+    slicing the array, so only the requested region is read from memory-mapped or chunked arrays. Regions extending
+    beyond the image are zero-padded.
+
+    When pickled (e.g. to send to dask workers), memory-mapped numpy arrays are pickled as a reference to their file
+    on disk, and other arrays are pickled along with their contents.
+
+    Args:
+        image (array-like or list): image array, or list of image arrays for each level of a pyramid, from highest
+            to lowest resolution
+    """
+
+    def __init__(self, image):
+        self._init_kwargs = {"image": image}
+        levels = list(image) if isinstance(image, (list, tuple)) else [image]
+        levels = [
+            level.open() if isinstance(level, _MemmapRef) else level for level in levels
+        ]
+        assert levels, "image must contain at least one level"
+        for level in levels:
+            assert (
+                len(level.shape) >= 2
+            ), f"image arrays must have at least 2 dimensions, but got array of shape {level.shape}"
+            assert (
+                level.shape[2:] == levels[0].shape[2:]
+            ), f"all levels of image must have the same non-spatial dimensions, but got shapes {[l.shape for l in levels]}"
+        self._levels = levels
+        self.level_count = len(levels)
+        self.shape = tuple(levels[0].shape)
+        self.dtype = np.dtype(levels[0].dtype)
+
+    def __repr__(self):
+        return f"ArrayBackend(shape={self.shape}, dtype={self.dtype}, level_count={self.level_count})"
+
+    def __getstate__(self):
+        image = self._init_kwargs["image"]
+        levels = list(image) if isinstance(image, (list, tuple)) else [image]
+        levels = [
+            (
+                _MemmapRef(level)
+                if isinstance(level, np.memmap)
+                and isinstance(level.base, mmap.mmap)
+                and level.flags.c_contiguous
+                else level
+            )
+            for level in levels
+        ]
+        if not isinstance(image, (list, tuple)):
+            levels = levels[0]
+        return {"_init_kwargs": {"image": levels}}
+
+    def get_image_shape(self, level=0):
+        """
+        Get the shape of the image at specified level.
+
+        Args:
+            level (int): Which level to get shape from. Level 0 is highest resolution. Defaults to 0.
+
+        Returns:
+            Tuple[int, int]: Shape of image at target level (H, W)
+        """
+        level = self._check_level(level)
+        return tuple(self._levels[level].shape[:2])
+
+    def extract_region(self, location, size, level=None):
+        """
+        Extract a region of the image. Regions extending beyond the image are zero-padded.
+
+        Args:
+            location (Tuple[int, int]): (i, j) location of top-left corner of region, relative to the target level
+            size (Union[int, Tuple[int, int]]): Size of region. May be a tuple of (height, width) or a
+                single integer, in which case a square region of that size is extracted.
+            level (int, optional): level from which to extract region. Level 0 is highest resolution.
+                Defaults to ``None`` (level 0).
+
+        Returns:
+            np.ndarray: image at the specified region, of shape (H, W, ...)
+        """
+        level = self._check_level(level)
+        if isinstance(size, int):
+            size = (size, size)
+        if not (
+            isinstance(size, tuple)
+            and len(size) == 2
+            and all([isinstance(x, (int, np.integer)) for x in size])
+        ):
+            raise ValueError(
+                f"Input size {size} not valid. Must be an integer or a tuple of two integers."
+            )
+        if not (
+            isinstance(location, tuple)
+            and len(location) == 2
+            and all([isinstance(x, (int, np.integer)) for x in location])
+        ):
+            raise ValueError(
+                f"input location {location} invalid. Must be a tuple of two integer coordinates"
+            )
+        array = self._levels[level]
+        i, j = location
+        h, w = size
+        region = np.zeros((h, w) + self.shape[2:], dtype=self.dtype)
+        i0, j0 = max(i, 0), max(j, 0)
+        i1, j1 = min(i + h, array.shape[0]), min(j + w, array.shape[1])
+        if i0 < i1 and j0 < j1:
+            region[i0 - i : i1 - i, j0 - j : j1 - j] = array[i0:i1, j0:j1]
+        return region
+
+    def get_thumbnail(self, size):
+        """
+        Get a thumbnail of the image, by subsampling the smallest level that is at least as large as the requested
+        size (or the smallest level, if none are large enough).
+
+        Args:
+            size (Tuple[int, int]): the maximum (H, W) size of the thumbnail
+
+        Returns:
+            np.ndarray: thumbnail image
+        """
+        level = self.level_count - 1
+        for candidate in reversed(range(self.level_count)):
+            level_h, level_w = self.get_image_shape(level=candidate)
+            if level_h >= size[0] and level_w >= size[1]:
+                level = candidate
+                break
+        level_h, level_w = self.get_image_shape(level=level)
+        step = max(-(-level_h // size[0]), -(-level_w // size[1]), 1)
+        return np.asarray(self._levels[level][::step, ::step])
+
+    def generate_tiles(self, shape=3000, stride=None, pad=False, level=0, coords=None):
+        """
+        Generator over tiles.
+
+        Padding works as follows:
+        If ``pad is False``, then the first tile will start flush with the edge of the image, and the tile locations
+        will increment according to specified stride, stopping with the last tile that is fully contained in the image.
+        If ``pad is True``, then the first tile will start flush with the edge of the image, and the tile locations
+        will increment according to specified stride, stopping with the last tile which starts in the image. Regions
+        outside the image will be padded with 0.
+        For example, for a 5x5 image with a tile size of 3 and a stride of 2, tile generation with ``pad=False`` will
+        create 4 tiles total, compared to 6 tiles if ``pad=True``.
+
+        Args:
+            shape (int or tuple(int)): Size of each tile. May be a tuple of (height, width) or a single integer,
+                in which case square tiles of that size are generated.
+            stride (int): stride between chunks. If ``None``, uses ``stride = size`` for non-overlapping chunks.
+                Defaults to ``None``.
+            pad (bool): How to handle tiles on the edges. If ``True``, these edge tiles will be zero-padded
+                and yielded with the other chunks. If ``False``, incomplete edge chunks will be ignored.
+                Defaults to ``False``.
+            level (int, optional): For slides with multiple levels, which level to extract tiles from.
+                Defaults to 0 (highest resolution).
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to read, e.g. as returned by
+                ``generate_tile_coords()`` or ``SlideData.plan_tiles()``. If given, ``stride`` and ``pad`` are
+                ignored. Defaults to ``None``.
+
+        Yields:
+            pathml.core.tile.Tile: Extracted Tile object
+        """
+        shape, stride = _check_tile_shape_stride(shape, stride)
+        level = self._check_level(level)
+
+        if coords is None:
+            coords = self.generate_tile_coords(shape, stride, pad, level=level)
+
+        for tile_coords in _coords_to_tuples(coords):
+            # get image for tile
+            tile_im = self.extract_region(location=tile_coords, size=shape, level=level)
+            yield pathml.core.tile.Tile(image=tile_im, coords=tile_coords)
@@ -0,0 +1,185 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+_slide_cache = None
+_slide_cache_from_env = False
+
+
+class SlideCache:
+    """
+    Local on-disk cache of thumbnails and metadata of slides, so that they do not have to be recomputed from the
+    slide each time it is opened.
+
+    Thumbnails are cached by all backends. Headers are only cached by
+    :class:`~pathml.core.slide_backends.BioFormatsBackend`, whose headers are expensive to read: its shape, pyramid
+    levels and OME-XML metadata, which holds the physical pixel sizes. The other backends read their shape and
+    levels cheaply from the open slide, so they do not use cached metadata.
+
+    Entries are keyed by a fingerprint of the slide file, made up of its absolute path, size, and modification
+    time, so that entries for a slide are not used after the file has been changed.
+
+    Args:
+        cache_dir (str): path to directory in which to store cached data. Created if it does not exist.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self):
+        return f"SlideCache('{self.cache_dir}')"
+
+    @staticmethod
+    def fingerprint(filename):
+        """
+        Compute the fingerprint of a slide.
+
+        Args:
+            filename (str or list): path to slide on disk, or list of paths for slides stored in multiple files
+
+        Returns:
+            str: hex digest identifying the path, size and modification time of the slide
+        """
+        if isinstance(filename, (list, tuple)):
+            paths = filename
+        else:
+            paths = [filename]
+        h = hashlib.sha1()
+        for path in paths:
+            stat = os.stat(path)
+            h.update(
+                f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+            )
+        return h.hexdigest()
+
+    def _entry_path(self, filename, name, suffix):
+        key = hashlib.sha1(name.encode()).hexdigest()[:16]
+        return self.cache_dir / self.fingerprint(filename) / f"{key}{suffix}"
+
+    @staticmethod
+    def _write_atomic(path, write):
+        # write to a temporary file first, so that readers never see a partially written entry
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get_metadata(self, filename, name):
+        """
+        Get cached metadata for a slide.
+
+        Args:
+            filename (str or list): path to slide on disk
+            name (str): name of the metadata entry
+
+        Returns:
+            dict: cached metadata, or ``None`` if not in the cache
+        """
+        path = self._entry_path(filename, name, ".json")
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put_metadata(self, filename, name, metadata):
+        """
+        Store metadata for a slide in the cache.
+
+        Args:
+            filename (str or list): path to slide on disk
+            name (str): name of the metadata entry
+            metadata (dict): JSON-serializable metadata
+        """
+        data = json.dumps(metadata).encode()
+        self._write_atomic(
+            self._entry_path(filename, name, ".json"), lambda f: f.write(data)
+        )
+
+    def get_array(self, filename, name):
+        """
+        Get a cached array (e.g. a thumbnail) for a slide.
+
+        Args:
+            filename (str or list): path to slide on disk
+            name (str): name of the array entry
+
+        Returns:
+            np.ndarray: cached array, or ``None`` if not in the cache
+        """
+        path = self._entry_path(filename, name, ".npy")
+        try:
+            return np.load(path, allow_pickle=False)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put_array(self, filename, name, array):
+        """
+        Store an array (e.g. a thumbnail) for a slide in the cache.
+
+        Args:
+            filename (str or list): path to slide on disk
+            name (str): name of the array entry
+            array (np.ndarray): array to store
+        """
+        self._write_atomic(
+            self._entry_path(filename, name, ".npy"),
+            lambda f: np.save(f, np.asarray(array), allow_pickle=False),
+        )
+
+
+def enable_slide_cache(cache_dir):
+    """
+    Enable caching of slide thumbnails, and of the headers of slides read with BioFormats, in a local directory.
+    The cache can also be enabled by setting the ``PATHML_SLIDE_CACHE`` environment variable to the path of the cache
+    directory, e.g. for dask workers.
+
+    Args:
+        cache_dir (str): path to directory in which to store cached data
+
+    Returns:
+        SlideCache: the cache
+    """
+    global _slide_cache
+    _slide_cache = SlideCache(cache_dir)
+    return _slide_cache
+
+
+def disable_slide_cache():
+    """
+    Disable caching of slide thumbnails and headers. Existing cached data is left on disk.
+    """
+    global _slide_cache, _slide_cache_from_env
+    _slide_cache = None
+    _slide_cache_from_env = True
+
+
+def get_slide_cache():
+    """
+    Get the slide cache, if enabled.
+
+    Returns:
+        SlideCache: the cache, or ``None`` if caching is not enabled
+    """
+    global _slide_cache, _slide_cache_from_env
+    if _slide_cache is None and not _slide_cache_from_env:
+        _slide_cache_from_env = True
+        cache_dir = os.environ.get("PATHML_SLIDE_CACHE")
+        if cache_dir:
+            _slide_cache = SlideCache(cache_dir)
+    return _slide_cache
@@ -3,19 +3,30 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import hashlib
+import json
 import os
+import pickle
+import queue
 import reprlib
+import threading
+import time
+import tracemalloc
+from collections import deque
+from functools import partial
+from itertools import islice
 from pathlib import Path
+from warnings import warn
 
-import anndata
-import dask.distributed
 import h5py
-import matplotlib.pyplot as plt
 import numpy as np
 import pathml.core
-import pathml.preprocessing.pipeline
+from pathml.core.run_stats import RunStats
+from pathml.core.shared_tiles import SharedTiles
 from pathml.core.slide_types import SlideType
-from torch.utils.data import Dataset
+
+# anndata, dask, matplotlib, torch and pathml.preprocessing are imported by the methods which need them, so that
+# importing pathml.core is fast
 
 
 def get_file_ext(path):
@@ -44,19 +55,985 @@ def get_file_ext(path):
     return ext
 
 
+def _read_and_apply_pipeline(
+    backend,
+    pipeline,
+    coords,
+    shape,
+    level,
+    masks=None,
+    labels=None,
+    slide_type=None,
+    profile=None,
+):
+    """
+    Read a tile from a slide backend and apply a pipeline to it.
+    Used to read tiles on workers, so that only tile coordinates need to be sent from the driver.
+
+    Args:
+        backend (pathml.core.slide_backends.SlideBackend): backend for the slide
+        pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline
+        coords (Tuple[int, int]): coordinates of top-left corner of tile
+        shape (Tuple[int, int]): shape of tile
+        level (int): level from which to read tile
+        masks (dict, optional): masks for the tile
+        labels (dict, optional): labels for the tile
+        slide_type (pathml.core.SlideType, optional): slide type of the tile
+        profile (pathml.preprocessing.pipeline.PipelineProfile, optional): profile in which to record the time and
+            memory used by each transform
+
+    Returns:
+        pathml.core.tile.Tile: processed tile
+    """
+    image = backend._read_tile(location=coords, size=shape, level=level)
+    tile = pathml.core.Tile(
+        image=image,
+        coords=coords,
+        masks=masks if masks else None,
+        labels=labels,
+        slide_type=slide_type,
+    )
+    return pipeline.apply(tile, profile=profile)
+
+
+def _profile_options(profile):
+    """
+    Options with which workers create the profile of each batch, from the profile of the run, which may be ``None``.
+    Workers record into a new profile rather than that of the run, whose measurements are gathered by the driver.
+    """
+    if profile is None:
+        return None
+    return {"memory": profile.memory}
+
+
+def _new_profile(profile):
+    """
+    Create a profile for a batch of tiles with the options from :func:`_profile_options`, or return ``None`` if not
+    profiling.
+    """
+    if profile is None:
+        return None
+    import pathml.preprocessing.pipeline
+
+    return pathml.preprocessing.pipeline.PipelineProfile(**profile)
+
+
+def _apply_pipeline_batch(pipeline, tiles, profile=None):
+    """
+    Apply a pipeline to a batch of tiles, in a single task.
+
+    Args:
+        pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline
+        tiles (list): tiles to process
+        profile (dict, optional): options of the profile in which to record the time and memory used by each
+            transform, from :func:`_profile_options`. ``None`` if not profiling.
+
+    Returns:
+        Tuple[list, float, PipelineProfile]: processed tiles, the time taken to process them in seconds, and the
+        profile of the batch, or ``None`` if not profiling
+    """
+    start = time.perf_counter()
+    profile = _new_profile(profile)
+    tiles = [pipeline.apply(tile, profile=profile) for tile in tiles]
+    return tiles, time.perf_counter() - start, profile
+
+
+def _read_and_apply_pipeline_batch(
+    backend,
+    pipeline,
+    coords,
+    shape,
+    level,
+    masks,
+    labels=None,
+    slide_type=None,
+    profile=None,
+):
+    """
+    Read a batch of tiles from a slide backend and apply a pipeline to them, in a single task.
+
+    Args:
+        backend (pathml.core.slide_backends.SlideBackend): backend for the slide
+        pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline
+        coords (list): coordinates of top-left corner of each tile
+        shape (Tuple[int, int]): shape of tiles
+        level (int): level from which to read tiles
+        masks (list): masks for each tile
+        labels (dict, optional): labels for the tiles
+        slide_type (pathml.core.SlideType, optional): slide type of the tiles
+        profile (dict, optional): options of the profile in which to record the time and memory used by each
+            transform, from :func:`_profile_options`. ``None`` if not profiling.
+
+    Returns:
+        Tuple[list, float, PipelineProfile]: processed tiles, the time taken to read and process them in seconds,
+        and the profile of the batch, or ``None`` if not profiling
+    """
+    start = time.perf_counter()
+    profile = _new_profile(profile)
+    tiles = [
+        _read_and_apply_pipeline(
+            backend,
+            pipeline,
+            tile_coords,
+            shape,
+            level,
+            masks=tile_masks,
+            labels=labels,
+            slide_type=slide_type,
+            profile=profile,
+        )
+        for tile_coords, tile_masks in zip(coords, masks)
+    ]
+    return tiles, time.perf_counter() - start, profile
+
+
+def _share_result(func, *args, **kwargs):
+    """
+    Call a function which returns (tiles, seconds, profile), and return the tiles in shared memory instead.
+    """
+    tiles, seconds, profile = func(*args, **kwargs)
+    return SharedTiles(tiles), seconds, profile
+
+
+def _apply_pipeline_shared_batch(pipeline, shared_tiles, profile=None):
+    """
+    Apply a pipeline to a batch of tiles received in shared memory, and return the processed tiles in shared memory.
+
+    Args:
+        pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline
+        shared_tiles (pathml.core.shared_tiles.SharedTiles): tiles to process
+        profile (dict, optional): options of the profile in which to record the time and memory used by each
+            transform, from :func:`_profile_options`. ``None`` if not profiling.
+
+    Returns:
+        Tuple[pathml.core.shared_tiles.SharedTiles, float, PipelineProfile]: processed tiles, the time taken to
+        process them in seconds, and the profile of the batch, or ``None`` if not profiling
+    """
+    tiles, seconds, profile = _apply_pipeline_batch(
+        pipeline, shared_tiles.load(), profile=profile
+    )
+    result = SharedTiles(tiles)
+    del tiles
+    # the driver frees the block once the result is received
+    shared_tiles.close()
+    return result, seconds, profile
+
+
+# state of each worker process of a local process pool, set once when the process starts
+_local_worker_state = {}
+
+
+def _init_local_worker(backends, pipeline):
+    """
+    Initialize a worker process of a local process pool with the pickled list of slide backends and pipeline.
+    """
+    _local_worker_state["backends"] = pickle.loads(backends)
+    _local_worker_state["pipeline"] = pickle.loads(pipeline)
+
+
+def _local_worker_read_and_apply_pipeline_batch(slide_index, *args, **kwargs):
+    """
+    Call :func:`_read_and_apply_pipeline_batch` with the backend of slide ``slide_index`` and the pipeline of this
+    worker process.
+    """
+    return _read_and_apply_pipeline_batch(
+        _local_worker_state["backends"][slide_index],
+        _local_worker_state["pipeline"],
+        *args,
+        **kwargs,
+    )
+
+
+class _RunCheckpoint:
+    """
+    Progress manifest of a resumable pipeline run, whose processed tiles are written to an h5path file.
+
+    The manifest is stored next to the h5path file, as ``<path>.progress``. Its first line holds the parameters of the
+    run as JSON, and each following line holds a JSON list of the keys of tiles completed since the previous line.
+    Lines are only appended after the tiles have been flushed to the h5path file, so that every tile in the manifest
+    is on disk.
+
+    Args:
+        path (Union[str, bytes, os.PathLike]): path to h5path file holding the processed tiles
+        h5manager (pathml.core.h5managers.h5pathManager): manager backed by the h5path file
+        params (dict): parameters of the run, which must be the same when resuming
+        interval (float): minimum time between saves of the manifest, in seconds
+    """
+
+    def __init__(self, path, h5manager, params, interval=10.0):
+        self.path = Path(str(path) + ".progress")
+        self.h5manager = h5manager
+        # round trip through JSON so that params can be compared with those read from the manifest
+        self.params = json.loads(json.dumps(params))
+        self.interval = interval
+        self.pending = []
+        self.last_save = time.monotonic()
+
+    def completed(self):
+        """
+        Read the manifest, or create it if it does not exist.
+
+        Returns:
+            set: keys of tiles which are recorded as completed in the manifest
+        """
+        lines = self.path.read_text().split("\n") if self.path.exists() else [""]
+        if not lines[0]:
+            # new run, or interrupted before anything was saved
+            self.path.write_text(json.dumps(self.params) + "\n")
+            return set()
+        params = json.loads(lines[0])
+        if params != self.params:
+            raise ValueError(
+                f"cannot resume run from {self.path}: run parameters {self.params} do not match parameters of "
+                f"checkpointed run {params}"
+            )
+        completed = set()
+        for line in lines[1:]:
+            try:
+                completed.update(json.loads(line))
+            except json.JSONDecodeError:
+                # the last line is incomplete if the run was interrupted while writing it
+                continue
+        if not lines[-1] == "":
+            # start a new line after an incomplete one
+            with open(self.path, "a") as f:
+                f.write("\n")
+        return completed
+
+    def record(self, tiles):
+        """
+        Record tiles which have been written, and save the manifest if enough time has passed since the last save.
+        """
+        self.pending.extend(str(tile.coords) for tile in tiles)
+        if time.monotonic() - self.last_save >= self.interval:
+            self.save()
+
+    def save(self):
+        """
+        Flush the h5path file to disk, and then append the tiles written since the last save to the manifest.
+        """
+        self.h5manager.save_counts()
+        self.h5manager.h5.flush()
+        with open(self.path, "a") as f:
+            f.write(json.dumps(self.pending) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = []
+        self.last_save = time.monotonic()
+
+
+class _BatchSizer:
+    """
+    Choose how many tiles to process in each task.
+    With ``batch_size="auto"``, tasks start with one tile each, and then hold as many tiles as can be processed in
+    about ``target_seconds``, based on the average time per tile measured so far.
+
+    Args:
+        batch_size (int or str): number of tiles per task, or ``"auto"``
+        target_seconds (float): target duration of each task, if ``batch_size="auto"``
+        max_batch_size (int): maximum number of tiles per task, if ``batch_size="auto"``
+    """
+
+    def __init__(self, batch_size, target_seconds=0.2, max_batch_size=256):
+        assert batch_size == "auto" or (
+            isinstance(batch_size, int) and batch_size > 0
+        ), f"batch_size {batch_size} invalid. Must be a positive integer or 'auto'"
+        self.batch_size = batch_size
+        self.target_seconds = target_seconds
+        self.max_batch_size = max_batch_size
+        self.n_tiles = 0
+        self.seconds = 0.0
+
+    def record(self, n_tiles, seconds):
+        """
+        Record the time taken to process a batch of tiles.
+        """
+        self.n_tiles += n_tiles
+        self.seconds += seconds
+
+    @property
+    def size(self):
+        """
+        Number of tiles to put in the next task.
+        """
+        if self.batch_size != "auto":
+            return self.batch_size
+        if self.n_tiles == 0 or self.seconds == 0:
+            return 1
+        per_tile = self.seconds / self.n_tiles
+        return int(min(max(self.target_seconds / per_tile, 1), self.max_batch_size))
+
+
+def _mask_coverage(mask, coords, shape, image_shape):
+    """
+    Compute the fraction of each tile which is covered by a mask, for all tiles at once, using a summed-area table.
+    The mask may have a different resolution than the image (e.g. a tissue mask computed from a thumbnail); tile
+    coordinates are scaled to the mask.
+
+    Args:
+        mask (np.ndarray): mask of shape (H, W, ...). Nonzero pixels are considered foreground.
+        coords (np.ndarray): (n_tiles, 2) array of tile coordinates, in the coordinates of the image
+        shape (Tuple[int, int]): shape of tiles, in the coordinates of the image
+        image_shape (Tuple[int, int]): shape of the image
+
+    Returns:
+        np.ndarray: array of shape (n_tiles, ) with the fraction of each tile covered by the mask
+    """
+    mask = np.asarray(mask) != 0
+    if mask.ndim > 2:
+        mask = mask.reshape(mask.shape[0], mask.shape[1], -1).any(axis=2)
+    h, w = mask.shape
+    summed = np.zeros((h + 1, w + 1), dtype=np.int64)
+    summed[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+
+    scale = np.array([h / image_shape[0], w / image_shape[1]])
+    start = np.floor(coords * scale).astype(np.int64)
+    stop = np.ceil((coords + np.asarray(shape)) * scale).astype(np.int64)
+    area = np.prod(np.maximum(stop - start, 1), axis=1)
+    # clip to the mask, so that regions of tiles outside of the image count as background
+    i0, j0 = np.clip(start, 0, [h, w]).T
+    i1, j1 = np.clip(stop, 0, [h, w]).T
+    covered = summed[i1, j1] - summed[i0, j1] - summed[i1, j0] + summed[i0, j0]
+    return covered / area
+
+
+class _BackendArray:
+    """
+    Array-like view of one level of a slide, reading regions through the backend when indexed.
+    Used as input to ``dask.array.from_array()``.
+
+    Args:
+        backend (pathml.core.slide_backends.SlideBackend): backend for the slide
+        level (int): level of the slide
+    """
+
+    def __init__(self, backend, level):
+        self.backend = backend
+        self.level = level
+        # read a single pixel to find the dimensions and dtype of regions returned by the backend
+        sample = self._read((0, 0), (1, 1))
+        self.shape = tuple(backend.get_image_shape(level=level)) + sample.shape[2:]
+        self.dtype = sample.dtype
+        self.ndim = len(self.shape)
+
+    def _read(self, location, size):
+        if isinstance(self.backend, pathml.core.OpenSlideBackend):
+            # openslide takes location as (x, y) in level 0 coordinates, and size as (width, height) at the level
+            downsample = self.backend.slide.level_downsamples[self.level]
+            location = tuple(int(round(x * downsample)) for x in location[::-1])
+            size = size[::-1]
+        return self.backend._run_in_thread(
+            self.backend.extract_region, location=location, size=size, level=self.level
+        )
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (self.ndim - len(key))
+        (start_i, stop_i, step_i), (start_j, stop_j, step_j) = [
+            k.indices(dim) for k, dim in zip(key[:2], self.shape[:2])
+        ]
+        if stop_i <= start_i or stop_j <= start_j:
+            size = (max(stop_i - start_i, 0), max(stop_j - start_j, 0))
+            region = np.zeros(size + self.shape[2:], dtype=self.dtype)
+        else:
+            size = (stop_i - start_i, stop_j - start_j)
+            region = np.asarray(self._read((start_i, start_j), size), dtype=self.dtype)
+        return region[(slice(None, None, step_i), slice(None, None, step_j)) + key[2:]]
+
+
+class _TileWriter:
+    """
+    Write processed tiles to their slides on a background thread, fed by a bounded queue, so that writing tiles to h5
+    overlaps with reading tiles, submitting them to workers and processing them.
+    Errors raised while writing are raised again in the driver on the next call to :meth:`put` or :meth:`close`.
+
+    Args:
+        stats (pathml.core.RunStats): statistics of the run, updated as tiles are queued and written
+        max_queued (int): Maximum number of batches waiting to be written. When the queue is full, the driver waits
+            for the writer to catch up, so that memory use stays bounded.
+    """
+
+    def __init__(self, stats, max_queued=16):
+        self.stats = stats
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.error = None
+        self.thread = threading.Thread(
+            target=self._write_batches, name="pathml-tile-writer", daemon=True
+        )
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # write tiles which are already queued even if the run failed, e.g. so that they are checkpointed.
+        # Errors from writing are only raised if they would not hide the error which ended the run
+        self.queue.put(None)
+        self.thread.join()
+        if exc_type is None:
+            self._raise_error()
+
+    def put(self, slide, tiles, checkpoint=None):
+        """
+        Queue a batch of processed tiles to be written to a slide.
+        """
+        self._raise_error()
+        start = time.perf_counter()
+        self.queue.put((slide, tiles, checkpoint))
+        self.stats.record_queued(self.queue.qsize(), time.perf_counter() - start)
+
+    def close(self):
+        """
+        Write all queued tiles, and stop the writer thread.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _write_batches(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            slide, tiles, checkpoint = item
+            if self.error is not None:
+                # after an error, tiles are discarded, but their shared memory must still be freed
+                if isinstance(tiles, SharedTiles):
+                    tiles.release()
+                continue
+            start = time.perf_counter()
+            try:
+                slide._add_processed_tiles(tiles, checkpoint)
+            except BaseException as e:
+                self.error = e
+                continue
+            self.stats.record_write(len(tiles), time.perf_counter() - start)
+
+
+def _prefetch(backend, iterable, max_queued):
+    """
+    Iterate over ``iterable`` on a background thread, e.g. to read tiles from a slide, staying up to ``max_queued``
+    items ahead of the consumer. The thread is run through ``backend._run_in_thread()``, so that backends can set up
+    any per-thread state they need.
+    """
+    items = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+
+    def put(item):
+        # give up if the consumer has stopped, rather than blocking forever on a full queue
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+        except BaseException as e:
+            put((False, e))
+        else:
+            put((False, None))
+
+    thread = threading.Thread(
+        target=backend._run_in_thread, args=(produce,), daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            ok, item = items.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _run_slides(
+    slides,
+    pipeline,
+    tile_coords,
+    checkpoints,
+    distributed=True,
+    client=None,
+    tile_size=3000,
+    tile_stride=None,
+    level=0,
+    tile_pad=False,
+    overwrite_existing_tiles=False,
+    read_on_workers=False,
+    max_in_flight=None,
+    batch_size=1,
+    executor=None,
+    n_workers=None,
+    shared_memory=None,
+    profile=False,
+):
+    """
+    Run a preprocessing pipeline on one or more slides, writing the processed tiles of each slide to that slide.
+    With parallel execution, the tiles of all slides are submitted to the same workers, one slide after the other,
+    with at most ``max_in_flight`` tasks in flight across all slides. The workers therefore stay busy from one slide
+    to the next, and several small slides are processed at the same time.
+
+    Args:
+        slides (list[SlideData]): slides to process
+        pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline.
+        tile_coords (list): coordinates of the tiles to process for each slide, or ``None`` to process all tiles
+        checkpoints (list): path to checkpoint file for each slide, or ``None`` for no checkpoint
+        kwargs: see :meth:`SlideData.run`
+    """
+    import pathml.preprocessing.pipeline
+
+    assert isinstance(
+        pipeline, pathml.preprocessing.pipeline.Pipeline
+    ), f"pipeline is of type {type(pipeline)} but must be of type pathml.preprocessing.pipeline.Pipeline"
+    if executor is None:
+        executor = "dask" if distributed else None
+    assert executor in {
+        None,
+        "dask",
+        "process",
+        "thread",
+    }, f"executor {executor} invalid. Must be one of 'dask', 'process', 'thread', or None"
+    assert (
+        max_in_flight is None or max_in_flight > 0
+    ), f"max_in_flight {max_in_flight} invalid. Must be a positive integer or None"
+    shape = (tile_size, tile_size) if isinstance(tile_size, int) else tile_size
+
+    tile_coords, checkpoints = zip(
+        *[
+            slide._prepare_run(
+                pipeline,
+                shape,
+                tile_stride,
+                tile_pad,
+                level,
+                coords,
+                overwrite_existing_tiles,
+                checkpoint,
+            )
+            for slide, coords, checkpoint in zip(slides, tile_coords, checkpoints)
+        ]
+    )
+    stats = RunStats()
+    if profile:
+        memory = True
+        if executor == "thread":
+            # tracemalloc keeps a single peak for the whole process, which each thread would reset under the others
+            warn(
+                "Memory is not profiled with executor='thread', as the peak memory of transforms applied at the "
+                "same time on several threads cannot be told apart. Use executor='process' to profile memory."
+            )
+            memory = False
+        stats.profile = pathml.preprocessing.pipeline.PipelineProfile(memory=memory)
+    if all(coords is not None and len(coords) == 0 for coords in tile_coords):
+        # nothing left to do, e.g. resuming a run which was already complete
+        return stats
+
+    if shared_memory is None:
+        # worker processes of a local pool are always on this machine, but dask workers may not be
+        shared_memory = executor == "process"
+    start = time.perf_counter()
+    # memory is traced while profiling, including in the driver if tiles are processed there
+    tracing = tracemalloc.is_tracing()
+    runs = list(zip(slides, tile_coords, checkpoints))
+    pool = None
+    if executor in {"process", "thread"}:
+        if n_workers is None:
+            n_workers = os.cpu_count()
+        # the pool is started before the tile writer thread, so that worker processes are not forked while another
+        # thread of the run holds a lock, e.g. of h5py
+        pool = _start_local_pool(executor, n_workers, runs, pipeline)
+    try:
+        with _TileWriter(stats) as writer:
+            _run_slides_on_executor(
+                runs,
+                pipeline,
+                writer,
+                executor=executor,
+                client=client,
+                pool=pool,
+                n_workers=n_workers,
+                shape=shape,
+                stride=tile_stride,
+                pad=tile_pad,
+                level=level,
+                read_on_workers=read_on_workers,
+                max_in_flight=max_in_flight,
+                batch_size=batch_size,
+                shared_memory=shared_memory,
+                profile=stats.profile,
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for checkpoint in checkpoints:
+            if checkpoint is not None:
+                checkpoint.save()
+        # release the file handles of each slide, so that running many slides does not exhaust them. Backends
+        # reopen the slide lazily if it is used again
+        for slide in slides:
+            if isinstance(slide.slide, pathml.core.slide_backends.SlideBackend):
+                slide.slide.close()
+        stats.seconds = time.perf_counter() - start
+        if not tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return stats
+
+
+def _run_slides_on_executor(
+    runs,
+    pipeline,
+    writer,
+    executor,
+    client,
+    pool,
+    n_workers,
+    shape,
+    stride,
+    pad,
+    level,
+    read_on_workers,
+    max_in_flight,
+    batch_size,
+    shared_memory,
+    profile,
+):
+    """
+    Process the tiles of several slides, passing processed tiles to ``writer``.
+
+    Args:
+        runs (list): (slide, coords, checkpoint) for each slide
+        profile (pathml.preprocessing.pipeline.PipelineProfile): profile in which to gather the time and memory used
+            by each transform on all workers, or ``None`` if not profiling
+    """
+    if executor == "dask":
+        _run_slides_dask(
+            runs,
+            pipeline,
+            writer,
+            client=client,
+            shape=shape,
+            stride=stride,
+            pad=pad,
+            level=level,
+            read_on_workers=read_on_workers,
+            max_in_flight=max_in_flight,
+            batch_size=batch_size,
+            shared_memory=shared_memory,
+            profile=profile,
+        )
+    elif executor in {"process", "thread"}:
+        _run_slides_local(
+            runs,
+            pipeline,
+            writer,
+            executor=executor,
+            pool=pool,
+            n_workers=n_workers,
+            shape=shape,
+            stride=stride,
+            pad=pad,
+            level=level,
+            max_in_flight=max_in_flight,
+            batch_size=batch_size,
+            shared_memory=shared_memory,
+            profile=profile,
+        )
+    else:
+        # tiles are read ahead on one thread, processed on this thread, and written on the writer thread
+        for slide, coords, checkpoint in runs:
+            tiles = slide.generate_tiles(
+                level=level, shape=shape, stride=stride, pad=pad, coords=coords
+            )
+            for tile in _prefetch(slide.slide, tiles, max_queued=4):
+                if not tile.slide_type:
+                    tile.slide_type = slide.slide_type
+                pipeline.apply(tile, profile=profile)
+                writer.put(slide, [tile], checkpoint)
+
+
+def _run_slides_dask(
+    runs,
+    pipeline,
+    writer,
+    client,
+    shape,
+    stride,
+    pad,
+    level,
+    read_on_workers,
+    max_in_flight,
+    batch_size,
+    shared_memory,
+    profile,
+):
+    """
+    Run a pipeline on the tiles of several slides on a dask cluster.
+
+    Args:
+        runs (list): (slide, coords, checkpoint) for each slide
+    """
+    import dask.distributed
+
+    if client is None:
+        client = dask.distributed.Client()
+
+    batch_sizer = _BatchSizer(batch_size)
+    if batch_size == "auto" and max_in_flight is None:
+        # a couple of batches per worker thread keeps the workers busy without holding many tiles in memory
+        max_in_flight = 2 * sum(client.nthreads().values())
+
+    # blocks of shared memory holding tiles sent to the workers, to be freed once the tiles are processed
+    shared_batches = {}
+
+    # map pipeline application onto batches of tiles
+    # tasks are not pure, so that identical batches from different slides (e.g. copies of the same slide) are all
+    # processed and written to their own slide
+    def submit_slide_batches(slide, coords):
+        if read_on_workers:
+            # backends pickle as just their filename and parameters, and reopen the slide on the worker
+            backend_future = client.scatter(slide.slide, broadcast=True)
+            items = slide._generate_tile_coords_and_masks(
+                shape, stride, pad, level, coords
+            )
+        else:
+            items = slide.generate_tiles(
+                level=level, shape=shape, stride=stride, pad=pad, coords=coords
+            )
+        while True:
+            batch = list(islice(items, batch_sizer.size))
+            if not batch:
+                return
+            if read_on_workers:
+                batch_coords, batch_masks = zip(*batch)
+                func = _read_and_apply_pipeline_batch
+                if shared_memory:
+                    func = partial(_share_result, func)
+                yield client.submit(
+                    func,
+                    backend_future,
+                    pipeline,
+                    list(batch_coords),
+                    shape,
+                    level,
+                    list(batch_masks),
+                    labels=slide.labels,
+                    slide_type=slide.slide_type,
+                    profile=_profile_options(profile),
+                    pure=False,
+                )
+                continue
+            for tile in batch:
+                if not tile.slide_type:
+                    tile.slide_type = slide.slide_type
+            if shared_memory:
+                shared_batch = SharedTiles(batch)
+                future = client.submit(
+                    _apply_pipeline_shared_batch,
+                    pipeline,
+                    shared_batch,
+                    profile=_profile_options(profile),
+                    pure=False,
+                )
+                shared_batches[future.key] = shared_batch
+                yield future
+                continue
+            # explicitly scatter data, i.e. send the tile data out to the cluster before applying the
+            # pipeline according to dask, this can reduce scheduler burden and keep data on workers
+            big_future = client.scatter(batch)
+            yield client.submit(
+                _apply_pipeline_batch,
+                pipeline,
+                big_future,
+                profile=_profile_options(profile),
+                pure=False,
+            )
+
+    # futures are submitted lazily, and only referenced until their results are written, so that the cluster
+    # does not hold on to tiles which have already been processed
+    run_of_future = {}
+
+    def submit_batches():
+        for run in runs:
+            slide, coords, checkpoint = run
+            for future in submit_slide_batches(slide, coords):
+                run_of_future[future.key] = run
+                yield future
+
+    batch_futures = submit_batches()
+    processed_batches = dask.distributed.as_completed(
+        list(islice(batch_futures, max_in_flight)), with_results=True
+    )
+    # as batches are processed, add their tiles to h5, and submit the next batch in their place
+    for future, (tiles, seconds, batch_profile) in processed_batches:
+        slide, coords, checkpoint = run_of_future.pop(future.key)
+        if future.key in shared_batches:
+            shared_batches.pop(future.key).release()
+        batch_sizer.record(len(tiles), seconds)
+        if batch_profile is not None:
+            profile.update(batch_profile)
+        writer.put(slide, tiles, checkpoint)
+        next_future = next(batch_futures, None)
+        if next_future is not None:
+            processed_batches.add(next_future)
+
+
+def _start_local_pool(executor, n_workers, runs, pipeline):
+    """
+    Create the pool of worker processes or threads of a local run.
+    Worker processes are started straight away: with the ``fork`` start method, all workers of a pool are started
+    when the first task is submitted.
+
+    Args:
+        executor (str): ``"process"`` or ``"thread"``
+        n_workers (int): number of workers
+        runs (list): (slide, coords, checkpoint) for each slide
+        pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline
+
+    Returns:
+        concurrent.futures.Executor: pool of workers
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=n_workers)
+    # the backends and pipeline are sent to each worker process once, and pickled explicitly so that workers
+    # open their own handles to the slides rather than inheriting the driver's
+    pool = ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_local_worker,
+        initargs=(
+            pickle.dumps([slide.slide for slide, _, _ in runs]),
+            pickle.dumps(pipeline),
+        ),
+    )
+    pool.submit(int).result()
+    return pool
+
+
+def _run_slides_local(
+    runs,
+    pipeline,
+    writer,
+    executor,
+    pool,
+    n_workers,
+    shape,
+    stride,
+    pad,
+    level,
+    max_in_flight,
+    batch_size,
+    shared_memory,
+    profile,
+):
+    """
+    Run a pipeline on the tiles of several slides on a local pool of worker processes or threads, without dask.
+    Each worker reads its tiles from the slide itself, so only tile coordinates are sent to the workers. Processed
+    tiles are written in the order in which they were submitted.
+
+    Args:
+        runs (list): (slide, coords, checkpoint) for each slide
+        pool (concurrent.futures.Executor): pool of workers, from :func:`_start_local_pool`
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * n_workers
+    batch_sizer = _BatchSizer(batch_size)
+
+    if executor == "process":
+        funcs = [
+            partial(_local_worker_read_and_apply_pipeline_batch, slide_index)
+            for slide_index in range(len(runs))
+        ]
+        if shared_memory:
+            funcs = [partial(_share_result, func) for func in funcs]
+    else:
+        # reads go through the backend on the worker thread, e.g. to attach the thread to the JVM for bioformats,
+        # as when reading on any other thread
+        funcs = [
+            partial(
+                slide.slide._run_in_thread,
+                partial(_read_and_apply_pipeline_batch, slide.slide, pipeline),
+            )
+            for slide, _, _ in runs
+        ]
+
+    def generate_batches():
+        for run, func in zip(runs, funcs):
+            slide, coords, checkpoint = run
+            items = slide._generate_tile_coords_and_masks(
+                shape, stride, pad, level, coords
+            )
+            while True:
+                batch = list(islice(items, batch_sizer.size))
+                if not batch:
+                    break
+                yield run, func, batch
+
+    batches = generate_batches()
+
+    def submit_next():
+        for run, func, batch in islice(batches, 1):
+            slide = run[0]
+            batch_coords, batch_masks = zip(*batch)
+            future = pool.submit(
+                func,
+                coords=list(batch_coords),
+                shape=shape,
+                level=level,
+                masks=list(batch_masks),
+                labels=slide.labels,
+                slide_type=slide.slide_type,
+                profile=_profile_options(profile),
+            )
+            pending.append((run, future))
+
+    pending = deque()
+    for _ in range(max_in_flight):
+        submit_next()
+    while pending:
+        (slide, coords, checkpoint), future = pending.popleft()
+        tiles, seconds, batch_profile = future.result()
+        batch_sizer.record(len(tiles), seconds)
+        if batch_profile is not None:
+            profile.update(batch_profile)
+        writer.put(slide, tiles, checkpoint)
+        submit_next()
+
+
 class SlideData:
     """
     Main class representing a slide and its annotations.
 
     Args:
-        filepath (str): Path to file on disk.
+        filepath (str, optional): Path to file on disk. For DICOM whole-slide images stored as a series of instances,
+            may be a path to the directory containing the instances. Not needed if ``backend`` is a backend object.
         name (str, optional): name of slide. If ``None``, and a ``filepath`` is provided, name defaults to filepath.
+            If ``None`` and a backend object is provided without ``filepath``, defaults to the name of its class.
         masks (pathml.core.Masks, optional): object containing {key, mask} pairs
         tiles (pathml.core.Tiles, optional): object containing {coordinates, tile} pairs
         labels (collections.OrderedDict, optional): dictionary containing {key, label} pairs
-        backend (str, optional): backend to use for interfacing with slide on disk.
-            Must be one of {"OpenSlide", "BioFormats", "DICOM"} (case-insensitive).
+        backend (str or pathml.core.slide_backends.SlideBackend, optional): backend to use for interfacing with
+            slide on disk. Must be one of {"OpenSlide", "BioFormats", "DICOM", "TiffFile"} (case-insensitive), or a
+            backend object which has already been created (e.g. an :class:`~pathml.core.ArrayBackend`).
             If ``None``, and a ``filepath`` is provided, tries to infer the correct backend from the file extension.
+            TIFF files which are not handled by OpenSlide are read with the TiffFile backend when possible, falling
+            back to BioFormats otherwise.
         slide_type (pathml.core.SlideType, optional): slide type specification. Must be a
             :class:`~pathml.core.SlideType` object. Alternatively, slide type can be specified by using the
             parameters ``stain``, ``tma``, ``rgb``, ``volumetric``, and ``time_series``.
@@ -77,7 +1054,7 @@ class SlideData:
 
     def __init__(
         self,
-        filepath,
+        filepath=None,
         name=None,
         masks=None,
         tiles=None,
@@ -117,10 +1094,16 @@ class SlideData:
         assert slide_type is None or isinstance(
             slide_type, pathml.core.SlideType
         ), f"slide_type is of type {type(slide_type)} but must be of type pathml.core.types.SlideType"
-        assert backend is None or (
-            isinstance(backend, str)
-            and backend.lower() in {"openslide", "bioformats", "dicom"}
-        ), f"backend {backend} must be one of ['OpenSlide', 'BioFormats', 'DICOM'] (case-insensitive)."
+        assert (
+            backend is None
+            or isinstance(backend, pathml.core.slide_backends.SlideBackend)
+            or (
+                isinstance(backend, str)
+                and backend.lower() in {"openslide", "bioformats", "dicom", "tifffile"}
+            )
+        ), f"backend {backend} must be one of ['OpenSlide', 'BioFormats', 'DICOM', 'TiffFile'] (case-insensitive), or a SlideBackend object."
+        import anndata
+
         assert counts is None or isinstance(
             counts, anndata.AnnData
         ), f"counts is if type {type(counts)} but must be of type anndata.AnnData"
@@ -148,14 +1131,19 @@ class SlideData:
 
         _load_from_h5path = False
 
-        if backend:
+        if isinstance(backend, str):
             # convert everything to lower so it's case insensitive
             backend = backend.lower()
-        else:
+        elif backend is None:
             # try to infer the correct backend
-            ext = get_file_ext(filepath)
-            if ext in openslideext:
+            ext = None if os.path.isdir(filepath) else get_file_ext(filepath)
+            if ext is None:
+                # directory of instances making up a DICOM whole-slide image series
+                backend = "dicom"
+            elif ext in openslideext:
                 backend = "openslide"
+            elif ext in tifffileext and pathml.core.TiffFileBackend.can_read(filepath):
+                backend = "tifffile"
             elif ext in bioformatsext:
                 backend = "bioformats"
             elif ext in dicomext:
@@ -169,12 +1157,20 @@ class SlideData:
                     f"Backend not specified, but cannot infer correct backend from input path {filepath}"
                 )
 
-        if backend.lower() == "openslide":
+        if isinstance(backend, pathml.core.slide_backends.SlideBackend):
+            # backend object which has already been created, e.g. an ArrayBackend
+            backend_obj = backend
+            backend = type(backend).__name__
+            if name is None:
+                name = backend
+        elif backend.lower() == "openslide":
             backend_obj = pathml.core.OpenSlideBackend(filepath)
         elif backend.lower() == "bioformats":
             backend_obj = pathml.core.BioFormatsBackend(filepath)
         elif backend.lower() == "dicom":
             backend_obj = pathml.core.DICOMBackend(filepath)
+        elif backend.lower() == "tifffile":
+            backend_obj = pathml.core.TiffFileBackend(filepath)
         elif backend.lower() == "h5path":
             backend_obj = None
         else:
@@ -250,6 +1246,15 @@ class SlideData:
         level=0,
         tile_pad=False,
         overwrite_existing_tiles=False,
+        read_on_workers=False,
+        tile_coords=None,
+        max_in_flight=None,
+        batch_size=1,
+        executor=None,
+        n_workers=None,
+        shared_memory=None,
+        checkpoint=None,
+        profile=False,
     ):
         """
         Run a preprocessing pipeline on SlideData.
@@ -257,8 +1262,9 @@ class SlideData:
 
         Args:
             pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline.
-            distributed (bool): Whether to distribute model using client. Defaults to True.
-            client: dask.distributed client
+            distributed (bool): Whether to distribute model using client. Ignored if ``executor`` is given.
+                Defaults to True.
+            client: dask.distributed client. Only used if ``executor="dask"``.
             tile_size (int, optional): Size of each tile. Defaults to 3000px
             tile_stride (int, optional): Stride between tiles. If ``None``, uses ``tile_stride = tile_size``
                 for non-overlapping tiles. Defaults to ``None``.
@@ -268,13 +1274,108 @@ class SlideData:
                 Defaults to ``False``.
             overwrite_existing_tiles (bool): Whether to overwrite existing tiles. If ``False``, running a pipeline will
                 fail if ``tiles is not None``. Defaults to ``False``.
+            read_on_workers (bool): Only used with ``executor="dask"``. If ``True``, the slide backend is sent to the
+                workers once, and then only tile coordinates are submitted; each worker reads its tiles from the slide
+                itself. If ``False``, tiles are read on the driver and their pixel data sent to the workers.
+                Defaults to ``False``.
+            tile_coords (np.ndarray, optional): Coordinates of the tiles to process, e.g. as returned by
+                :meth:`plan_tiles`. If ``None``, all tiles in the grid defined by ``tile_size``, ``tile_stride`` and
+                ``tile_pad`` are processed. Defaults to ``None``.
+            max_in_flight (int, optional): Only used for parallel execution. Maximum number of tasks submitted to the
+                workers at once, where each task processes ``batch_size`` tiles. The next task is submitted as each
+                processed batch is written, so that memory use is bounded by the tile size times ``batch_size`` times
+                ``max_in_flight`` rather than by the size of the slide. A few times the number of worker threads is
+                enough to keep the workers busy. If ``None``, all tasks are submitted at once with ``executor="dask"``,
+                unless ``batch_size="auto"``; otherwise it defaults to twice the number of workers.
+                Defaults to ``None``.
+            batch_size (int or str): Only used for parallel execution. Number of tiles processed by each task. Tiles in
+                a batch are processed one after the other on the same worker, and written together, which reduces the
+                overhead of scheduling many small tasks when the pipeline is fast. If ``"auto"``, the batch size is
+                tuned from the measured time taken per tile, so that each task takes about 0.2 seconds.
+                Defaults to 1.
+            executor (str, optional): How to process tiles in parallel. Must be one of:
+                ``"dask"``: on the dask cluster of ``client``.
+                ``"process"``: on a local pool of worker processes, without dask. The slide backend and pipeline are
+                sent to each process once, and each process reads its tiles from the slide itself.
+                ``"thread"``: on a local pool of worker threads, without dask. Threads share the slide backend, which
+                must be safe to read from several threads at once. Useful when the pipeline releases the GIL, e.g.
+                when it runs a model on a GPU.
+                With ``"process"`` and ``"thread"``, tiles are written in the order in which they were planned. If
+                ``None``, uses ``"dask"`` if ``distributed=True``, otherwise processes tiles serially.
+                Defaults to ``None``.
+            n_workers (int, optional): Number of worker processes or threads, with ``executor="process"`` or
+                ``executor="thread"``. If ``None``, uses the number of CPUs. Defaults to ``None``.
+            shared_memory (bool, optional): Only used with ``executor="process"`` or ``executor="dask"``. If
+                ``True``, the pixel data of tiles is moved between the driver and the workers through shared memory,
+                instead of being pickled and copied (see :class:`~pathml.core.shared_tiles.SharedTiles`). Workers must
+                run on the same machine as the driver. If ``None``, shared memory is used with ``executor="process"``,
+                whose workers always run on this machine, and not with ``executor="dask"``. Defaults to ``None``.
+            checkpoint (Union[str, bytes, os.PathLike], optional): Path to an h5path file in which to store tiles as
+                they are processed, so that an interrupted run can be resumed. Progress is saved periodically to a
+                manifest next to the file (``<checkpoint>.progress``). If the file already exists, the run is resumed:
+                tiles which were saved are kept and skipped, and only the remaining tiles are processed. The run must
+                be resumed with the same pipeline (compared by its ``repr``), ``tile_coords``, ``tile_size``,
+                ``tile_stride``, ``tile_pad`` and ``level``, otherwise a ``ValueError`` is raised. Once the run is
+                complete, the file holds the processed slide and can be loaded with ``SlideData(checkpoint)``.
+                The slide stays backed by the file after the run, so later changes to the slide are written to it.
+                When resuming, the contents of the file replace those of the slide; a ``ValueError`` is raised if
+                the slide holds tiles or masks which are not in the file. Defaults to ``None``.
+            profile (bool): If ``True``, record the wall time, CPU time and peak memory of each transform on each
+                tile, on whichever workers the tiles are processed. The measurements of all workers are gathered in
+                the ``profile`` of the returned :class:`~pathml.core.RunStats` (see
+                :class:`~pathml.preprocessing.pipeline.PipelineProfile`). Memory is traced with :mod:`tracemalloc`,
+                which stays enabled in worker processes after the run. Memory is not profiled with
+                ``executor="thread"``, and is only meaningful on dask workers with one thread each.
+                Defaults to ``False``.
+
+        Returns:
+            pathml.core.RunStats: statistics of the run, e.g. to check whether writing tiles is the bottleneck
+        """
+        return _run_slides(
+            [self],
+            pipeline,
+            tile_coords=[tile_coords],
+            checkpoints=[checkpoint],
+            distributed=distributed,
+            client=client,
+            tile_size=tile_size,
+            tile_stride=tile_stride,
+            level=level,
+            tile_pad=tile_pad,
+            overwrite_existing_tiles=overwrite_existing_tiles,
+            read_on_workers=read_on_workers,
+            max_in_flight=max_in_flight,
+            batch_size=batch_size,
+            executor=executor,
+            n_workers=n_workers,
+            shared_memory=shared_memory,
+            profile=profile,
+        )
+
+    def _prepare_run(
+        self,
+        pipeline,
+        shape,
+        stride,
+        pad,
+        level,
+        coords,
+        overwrite_existing_tiles,
+        checkpoint,
+    ):
+        """
+        Check that a pipeline can be run on the slide, remove existing tiles if they are to be overwritten, and start
+        the checkpoint of the run, if any.
+
+        Returns:
+            Tuple[np.ndarray, _RunCheckpoint]: the coordinates of the tiles to be processed (``None`` for all tiles),
+            and the checkpoint of the run (``None`` if the run is not checkpointed)
         """
-        assert isinstance(
-            pipeline, pathml.preprocessing.pipeline.Pipeline
-        ), f"pipeline is of type {type(pipeline)} but must be of type pathml.preprocessing.pipeline.Pipeline"
         assert self.slide is not None, "cannot run pipeline because self.slide is None"
 
-        if len(self.tiles) != 0:
+        # when resuming from a checkpoint, existing tiles are kept
+        resuming = checkpoint is not None and Path(checkpoint).exists()
+        if len(self.tiles) != 0 and not resuming:
             # in this case, tiles already exist
             if not overwrite_existing_tiles:
                 raise Exception(
@@ -286,38 +1387,83 @@ class SlideData:
                 for tile_key in self.tiles.keys:
                     self.tiles.remove(tile_key)
 
-        if distributed:
-            if client is None:
-                client = dask.distributed.Client()
+        if checkpoint is None:
+            return coords, None
+        return self._start_checkpoint(
+            checkpoint, pipeline, shape, stride, pad, level, coords
+        )
 
-            # map pipeline application onto each tile
-            processed_tile_futures = []
+    def _generate_tile_coords_and_masks(self, shape, stride, pad, level, coords):
+        """
+        Generate (coords, masks) for each tile to be read by a worker, where masks are the slices of ``self.masks``
+        covering the tile.
+        Only masks which the slide had before the run are sliced: masks of processed tiles are written to the
+        slide-level masks while later tiles are still being generated, and would only partly cover them.
+        """
+        if coords is None:
+            coords = self.plan_tiles(shape=shape, stride=stride, pad=pad, level=level)
+        keys = self.masks.keys if self.masks is not None else []
+        for tile_coords in pathml.core.slide_backends._coords_to_tuples(coords):
+            yield tile_coords, (
+                None if pad else self._slice_masks(tile_coords, shape, keys=keys)
+            )
 
-            for tile in self.generate_tiles(
-                level=level, shape=tile_size, stride=tile_stride, pad=tile_pad
-            ):
-                if not tile.slide_type:
-                    tile.slide_type = self.slide_type
-                # explicitly scatter data, i.e. send the tile data out to the cluster before applying the pipeline
-                # according to dask, this can reduce scheduler burden and keep data on workers
-                big_future = client.scatter(tile)
-                f = client.submit(pipeline.apply, big_future)
-                processed_tile_futures.append(f)
-
-            # as tiles are processed, add them to h5
-            for future, tile in dask.distributed.as_completed(
-                processed_tile_futures, with_results=True
-            ):
-                self.tiles.add(tile)
+    def _add_processed_tiles(self, tiles, checkpoint=None):
+        """
+        Write a batch of processed tiles, which may be held in shared memory, and record the progress of the run.
+        """
+        shared_tiles = tiles if isinstance(tiles, SharedTiles) else None
+        if shared_tiles is not None:
+            tiles = shared_tiles.load()
+        self.tiles.add_tiles(tiles)
+        if checkpoint is not None:
+            checkpoint.record(tiles)
+        if shared_tiles is not None:
+            del tiles
+            shared_tiles.release()
+
+    def _start_checkpoint(self, path, pipeline, shape, stride, pad, level, coords):
+        """
+        Store tiles in the h5path file at ``path`` as they are processed, resuming from the tiles already in the file
+        if it exists.
 
-        else:
-            for tile in self.generate_tiles(
-                level=level, shape=tile_size, stride=tile_stride, pad=tile_pad
-            ):
-                if not tile.slide_type:
-                    tile.slide_type = self.slide_type
-                pipeline.apply(tile)
-                self.tiles.add(tile)
+        Returns:
+            Tuple[np.ndarray, _RunCheckpoint]: the coordinates of the tiles still to be processed, and the checkpoint
+        """
+        self.h5manager.persist(path)
+        if coords is not None:
+            coords = np.asarray(coords).reshape(-1, 2)
+        checkpoint = _RunCheckpoint(
+            path,
+            self.h5manager,
+            params={
+                "pipeline": repr(pipeline),
+                "shape": [int(x) for x in shape],
+                "stride": stride,
+                "pad": bool(pad),
+                "level": int(level),
+                # planned tiles are identified by a hash of their coordinates, to keep the manifest small
+                "tile_coords": (
+                    None
+                    if coords is None
+                    else hashlib.sha1(coords.astype(np.int64).tobytes()).hexdigest()
+                ),
+            },
+        )
+        # tiles are only complete if they are both recorded in the manifest and present in the file
+        completed = checkpoint.completed()
+        for key in self.tiles.keys:
+            if key not in completed:
+                # tile was written after the last save of the manifest, so it may be incomplete
+                self.tiles.remove(key)
+        if coords is None:
+            coords = self.plan_tiles(shape=shape, stride=stride, pad=pad, level=level)
+        coords = np.asarray(coords).reshape(-1, 2)
+        remaining = [
+            str(tuple(int(x) for x in tile_coords)) not in completed
+            for tile_coords in coords
+        ]
+        return coords[np.array(remaining, dtype=bool)], checkpoint
 
     @property
     def tile_dataset(self):
@@ -340,6 +1486,8 @@ class SlideData:
 
     @staticmethod
     def _create_tile_dataset(slidedata):
+        from torch.utils.data import Dataset
+
         # create a pytorch dataset for tiles, also with slide-level labels
         class TileDataset(Dataset):
             def __init__(self, slidedata):
@@ -358,6 +1506,94 @@ class SlideData:
 
         return TileDataset(slidedata)
 
+    def plan_tiles(
+        self,
+        shape=3000,
+        stride=None,
+        pad=False,
+        level=0,
+        mask=None,
+        min_coverage=0.5,
+        roi=None,
+        n_tiles=None,
+        random_state=None,
+    ):
+        """
+        Compute the coordinates of tiles, without reading any pixels.
+        Tiles are laid out on the same grid as in :meth:`generate_tiles`, and can then be filtered. The resulting plan
+        can be passed to :meth:`generate_tiles`, :meth:`run`, or :meth:`~pathml.core.SlideDataset.run`, and can be
+        split up to distribute or resume work.
+
+        Args:
+            shape (int or tuple(int)): Size of each tile. May be a tuple of (height, width) or a single integer,
+                in which case square tiles of that size are used.
+            stride (int): stride between chunks. If ``None``, uses ``stride = size`` for non-overlapping chunks.
+                Defaults to ``None``.
+            pad (bool): Whether to include incomplete tiles on the edges. Defaults to ``False``.
+            level (int, optional): Level that the tile coordinates refer to. Defaults to 0 (highest resolution).
+            mask (str or np.ndarray, optional): Mask used to filter tiles, e.g. a tissue mask. Either the key of a
+                mask in ``self.masks``, or an array. The mask may have a lower resolution than the image, e.g. if it
+                was computed from a thumbnail. Defaults to ``None``.
+            min_coverage (float): Minimum fraction of each tile which must be nonzero in ``mask`` for the tile to be
+                kept. Only used if ``mask`` is given. Defaults to 0.5.
+            roi (np.ndarray, optional): Polygon given as an array of (i, j) vertices, in the coordinates of ``level``.
+                Only tiles whose centers are inside the polygon are kept. Defaults to ``None``.
+            n_tiles (int, optional): If given, a random subset of this many tiles is kept, after applying the other
+                filters. Defaults to ``None``.
+            random_state (int, optional): Seed for the random subset. Defaults to ``None``.
+
+        Returns:
+            np.ndarray: array of shape (n_tiles, 2) with the (i, j) coordinates of the top-left corner of each tile,
+            in row-major order
+        """
+        if isinstance(shape, int):
+            shape = (shape, shape)
+        coords = self.slide.generate_tile_coords(
+            shape=shape, stride=stride, pad=pad, level=level
+        )
+
+        if mask is not None and len(coords) != 0:
+            if isinstance(mask, str):
+                mask = self.masks[mask]
+            coverage = _mask_coverage(
+                mask, coords, shape, self.slide.get_image_shape(level=level)
+            )
+            coords = coords[coverage >= min_coverage]
+
+        if roi is not None and len(coords) != 0:
+            from matplotlib.path import Path as MplPath
+
+            centers = coords + np.asarray(shape) / 2
+            coords = coords[MplPath(np.asarray(roi)).contains_points(centers)]
+
+        if n_tiles is not None and n_tiles < len(coords):
+            rng = np.random.default_rng(random_state)
+            keep = np.sort(rng.choice(len(coords), size=n_tiles, replace=False))
+            coords = coords[keep]
+
+        return coords
+
+    def _slice_masks(self, coords, shape, keys=None):
+        """
+        Get the slide-level masks corresponding to a tile.
+
+        Args:
+            coords (Tuple[int, int]): coordinates of top-left corner of tile
+            shape (Tuple[int, int]): shape of tile
+            keys (list, optional): keys of the masks to slice. If ``None``, all masks are sliced.
+
+        Returns:
+            dict: masks for the tile. Empty if the slide has no masks.
+        """
+        if self.masks is None or len(self.masks) == 0:
+            return {}
+        i, j = coords
+        di, dj = shape
+        slicer = [slice(i, i + di), slice(j, j + dj)]
+        if keys is None:
+            return self.masks.slice(slicer)
+        return {key: self.masks.h5manager.get_mask(key, slicer=slicer) for key in keys}
+
     def generate_tiles(self, shape=3000, stride=None, pad=False, **kwargs):
         """
         Generator over Tile objects containing regions of the image.
@@ -373,7 +1609,8 @@ class SlideData:
             pad (bool): How to handle tiles on the edges. If ``True``, these edge tiles will be zero-padded
                 and yielded with the other chunks. If ``False``, incomplete edge chunks will be ignored.
                 Defaults to ``False``.
-            **kwargs: Other arguments passed through to ``generate_tiles()`` method of the backend.
+            **kwargs: Other arguments passed through to ``generate_tiles()`` method of the backend. For example,
+                ``coords`` can be used to only read the tiles in a plan computed by :meth:`plan_tiles`.
 
         Yields:
             pathml.core.tile.Tile: Extracted Tile object
@@ -396,8 +1633,7 @@ class SlideData:
                         len(tile.masks) == 0
                     ), "tile yielded from backend already has mask. slide_data.generate_tiles is trying to overwrite it"
 
-                    tile_slices = [slice(i, i + di), slice(j, j + dj)]
-                    tile.masks = self.masks.slice(tile_slices)
+                    tile.masks = self._slice_masks((i, j), (di, dj))
 
             # add slide-level labels to each tile, if possible
             if self.labels is not None:
@@ -409,6 +1645,56 @@ class SlideData:
 
             yield tile
 
+    def to_dask(self, level=0, chunks=3000):
+        """
+        Get a lazy ``dask.array`` view of an entire level of the slide.
+        Chunks are only read from the slide, through ``extract_region()`` of the backend, when they are computed.
+        This allows whole-slide array operations (e.g. ``map_overlap()``, reductions, thresholding) to run
+        out-of-core and in parallel on the dask scheduler.
+        For slides loaded from h5path, wraps the array of tile images stored in the h5path file.
+
+        Args:
+            level (int): Level of the slide. Defaults to 0 (highest resolution).
+            chunks (int or tuple(int)): Shape (H, W) of chunks. May be a single integer, in which case square chunks
+                are used. Any other dimensions (e.g. channels) are not chunked. Defaults to 3000.
+
+        Returns:
+            dask.array.Array: array of shape (H, W, ...) at the specified level
+        """
+        import dask.array
+
+        if isinstance(chunks, int):
+            chunks = (chunks, chunks)
+        assert (
+            isinstance(chunks, tuple) and len(chunks) == 2
+        ), f"input chunks {chunks} invalid. Must be a tuple of (H, W), or a single integer for square chunks"
+
+        if self.slide is None:
+            assert (
+                level == 0
+            ), f"level {level} invalid. Slides without a backend only have level 0"
+            if (
+                "array" not in self.h5manager.h5.keys()
+                or not self.h5manager.h5["array"].shape
+            ):
+                raise ValueError(
+                    "Slide has no backend and no tiles, so there is no image to view"
+                )
+            array = self.h5manager.h5["array"]
+            # h5py datasets are not thread-safe, so chunks must be read one at a time
+            return dask.array.from_array(
+                array, chunks=chunks + (-1,) * (array.ndim - 2), lock=True
+            )
+
+        array = _BackendArray(self.slide, level=level)
+        return dask.array.from_array(
+            array,
+            chunks=chunks + (-1,) * (array.ndim - 2),
+            name="slide-" + dask.base.tokenize(self.slide._init_kwargs, level, chunks),
+            asarray=False,
+            fancy=False,
+        )
+
     def plot(self, ax=None):
         """
         View a thumbnail of the image, using matplotlib.
@@ -429,6 +1715,8 @@ class SlideData:
                     f"plotting not supported for slide_backend={self.slide.__class__.__name__}"
                 )
         if ax is None:
+            import matplotlib.pyplot as plt
+
             ax = plt.gca()
         ax.imshow(thumbnail)
         if self.name:
@@ -442,6 +1730,8 @@ class SlideData:
     @counts.setter
     def counts(self, value):
         if self.tiles.h5manager:
+            import anndata
+
             assert value is None or isinstance(
                 value, anndata.AnnData
             ), f"cannot set counts with obj of type {type(value)}. Must be Anndata"
@@ -467,6 +1757,47 @@ class SlideData:
             if self.counts:
                 pathml.core.utils.writecounts(f["counts"], self.counts)
 
+    def export_raw_tiles(self, path, level=0, coords=None):
+        """
+        Export tiles to disk by copying the compressed tiles stored in the slide, without decoding or re-encoding
+        them. This is much faster than running a pipeline and writing the result, for exporting tiles which align with
+        the tiles stored in the slide (e.g. JPEG-compressed tiles in an Aperio SVS file, or frames of a JPEG Baseline
+        DICOM file). Exported tiles are decoded when they are read with :class:`~pathml.core.raw_tiles.RawTileFile`.
+
+        Use ``self.slide.get_raw_tile_shape()`` to get the shape of the stored tiles, e.g. to select a subset of tiles with
+        ``plan_tiles()``.
+
+        Args:
+            path (Union[str, bytes, os.PathLike]): path to HDF5 file to be written
+            level (int, optional): level from which to read tiles. Defaults to 0 (highest resolution).
+            coords (np.ndarray, optional): (i, j) coordinates of the tiles to export, e.g. as returned by
+                ``plan_tiles()``. Must be aligned to the grid of stored tiles. If ``None``, all tiles are exported.
+                Defaults to ``None``.
+
+        Returns:
+            int: number of tiles written
+        """
+        assert (
+            self.slide is not None
+        ), "cannot export compressed tiles: SlideData was not loaded from a slide"
+        return pathml.core.raw_tiles.write_raw_tiles(
+            self.slide, path, level=level, coords=coords, name=self.name
+        )
+
+
+def _multiparametric_backend(filepath=None, *args, **kwargs):
+    """
+    Default backend for multiparametric slides: ``"tifffile"`` if TiffFileBackend can read the file, otherwise
+    ``"bioformats"``.
+    """
+    if (
+        filepath is not None
+        and not os.path.isdir(filepath)
+        and pathml.core.TiffFileBackend.can_read(filepath)
+    ):
+        return "tifffile"
+    return "bioformats"
+
 
 class HESlide(SlideData):
     """
@@ -483,14 +1814,16 @@ class HESlide(SlideData):
 class MultiparametricSlide(SlideData):
     """
     Convenience class to load a SlideData object for multiparametric immunofluorescence slides.
-    Passes through all arguments to ``SlideData()``, along with ``slide_type = types.IF`` flag and default ``backend = "bioformats"``.
+    Passes through all arguments to ``SlideData()``, along with ``slide_type = types.IF`` flag and a default backend.
+    Files which :class:`~pathml.core.slide_backends.TiffFileBackend` can read default to ``backend = "tifffile"``, which
+    does not need a Java virtual machine, and other files to ``backend = "bioformats"``.
     Refer to :class:`~pathml.core.slide_data.SlideData` for full documentation.
     """
 
     def __init__(self, *args, **kwargs):
         kwargs["slide_type"] = pathml.core.types.IF
         if "backend" not in kwargs:
-            kwargs["backend"] = "bioformats"
+            kwargs["backend"] = _multiparametric_backend(*args, **kwargs)
         super().__init__(*args, **kwargs)
 
 
@@ -509,21 +1842,25 @@ class IHCSlide(SlideData):
 class VectraSlide(SlideData):
     """
     Convenience class to load a SlideData object for Vectra (Polaris) slides.
-    Passes through all arguments to ``SlideData()``, along with ``slide_type = types.Vectra`` flag and default ``backend = "bioformats"``.
+    Passes through all arguments to ``SlideData()``, along with ``slide_type = types.Vectra`` flag and a default backend.
+    Files which :class:`~pathml.core.slide_backends.TiffFileBackend` can read default to ``backend = "tifffile"``, which
+    does not need a Java virtual machine, and other files to ``backend = "bioformats"``.
     Refer to :class:`~pathml.core.slide_data.SlideData` for full documentation.
     """
 
     def __init__(self, *args, **kwargs):
         kwargs["slide_type"] = pathml.core.types.Vectra
         if "backend" not in kwargs:
-            kwargs["backend"] = "bioformats"
+            kwargs["backend"] = _multiparametric_backend(*args, **kwargs)
         super().__init__(*args, **kwargs)
 
 
 class CODEXSlide(SlideData):
     """
     Convenience class to load a SlideData object from Akoya Biosciences CODEX format.
-    Passes through all arguments to ``SlideData()``, along with ``slide_type = types.CODEX`` flag and default ``backend = "bioformats"``.
+    Passes through all arguments to ``SlideData()``, along with ``slide_type = types.CODEX`` flag and a default backend.
+    Files which :class:`~pathml.core.slide_backends.TiffFileBackend` can read default to ``backend = "tifffile"``, which
+    does not need a Java virtual machine, and other files to ``backend = "bioformats"``.
     Refer to :class:`~pathml.core.slide_data.SlideData` for full documentation.
 
     # TODO:
@@ -533,7 +1870,7 @@ class CODEXSlide(SlideData):
     def __init__(self, *args, **kwargs):
         kwargs["slide_type"] = pathml.core.types.CODEX
         if "backend" not in kwargs:
-            kwargs["backend"] = "bioformats"
+            kwargs["backend"] = _multiparametric_backend(*args, **kwargs)
         super().__init__(*args, **kwargs)
 
 
@@ -553,6 +1890,17 @@ openslideext = {
     ".bif",
 }
 
+tifffileext = {
+    ".tiff",
+    ".btf",
+    ".qptiff",
+    ".ome.tiff",
+    ".ome.tif",
+    ".ome.tf2",
+    ".ome.tf8",
+    ".ome.btf",
+}
+
 bioformatsext = {
     ".tiff",
     ".tif",
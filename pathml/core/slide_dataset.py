@@ -3,10 +3,11 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
-from torch.utils.data import ConcatDataset
 from pathlib import Path
 import reprlib
 
+from pathml.core.slide_data import _run_slides
+
 
 class SlideDataset:
     """
@@ -36,21 +37,61 @@ class SlideDataset:
         out += ")"
         return out
 
-    def run(self, pipeline, **kwargs):
+    def run(self, pipeline, tile_coords=None, checkpoint_dir=None, **kwargs):
         """
-        Runs a preprocessing pipeline on all slides in the dataset
+        Runs a preprocessing pipeline on all slides in the dataset.
+        Tiles of all slides are processed on the same dask client or local pool of workers, which is created once for
+        the whole dataset if not given. Tiles are submitted one slide after the other, with at most ``max_in_flight``
+        tasks in flight across all slides, so that the workers do not wait for the end of each slide before starting
+        on the next one.
 
         Args:
             pipeline (pathml.preprocessing.pipeline.Pipeline): Preprocessing pipeline.
-            kwargs (dict): keyword arguments passed to :meth:`~pathml.core.slide_data.SlideData.run` for each slide
+            tile_coords (list, optional): list with the coordinates of tiles to process for each slide, e.g. as
+                returned by :meth:`~pathml.core.slide_data.SlideData.plan_tiles`. Must be the same length as the number
+                of slides in the dataset. If ``None``, all tiles are processed. Defaults to ``None``.
+            checkpoint_dir (Union[str, bytes, os.PathLike], optional): Directory in which to store the tiles of each
+                slide as they are processed, so that an interrupted run can be resumed. Each slide is checkpointed to
+                ``{checkpoint_dir}/{slide.name}.h5path`` (see the ``checkpoint`` argument of
+                :meth:`~pathml.core.slide_data.SlideData.run`), so slide names must be unique. Running again with the
+                same ``checkpoint_dir`` skips slides and tiles which were already processed. Defaults to ``None``.
+            kwargs (dict): keyword arguments as for :meth:`~pathml.core.slide_data.SlideData.run`, applied to each slide
+
+        Returns:
+            pathml.core.RunStats: statistics of the run, across all slides
         """
-        # run preprocessing
-        for slide in self.slides:
-            slide.run(pipeline, **kwargs)
+        if tile_coords is None:
+            tile_coords = [None] * len(self)
+        elif len(tile_coords) != len(self):
+            raise ValueError(
+                f"input list of tile_coords has {len(tile_coords)} elements "
+                f"but must be same length as number of slides in dataset ({len(self)})"
+            )
+        if checkpoint_dir is None:
+            checkpoints = [None] * len(self)
+        else:
+            names = [slide.name for slide in self.slides]
+            if len(set(names)) != len(names):
+                raise ValueError(
+                    f"slide names {reprlib.repr(names)} must be unique to checkpoint each slide to a separate file"
+                )
+            checkpoints = [Path(checkpoint_dir) / f"{name}.h5path" for name in names]
+
+        # run preprocessing on all slides at once, so that the workers are kept busy from one slide to the next
+        stats = _run_slides(
+            self.slides,
+            pipeline,
+            tile_coords=tile_coords,
+            checkpoints=checkpoints,
+            **kwargs,
+        )
+
+        from torch.utils.data import ConcatDataset
 
         assert not any([s.tile_dataset is None for s in self.slides])
         # create a tile dataset for the whole dataset
         self._tile_dataset = ConcatDataset([s.tile_dataset for s in self.slides])
+        return stats
 
     def reshape(self, shape, centercrop=False):
         for slide in self.slides:
@@ -0,0 +1,220 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+import pathml.core
+from pathml.core.slide_backends import ArrayBackend
+
+# optical density of unit concentrations of hematoxylin and eosin in RGB (Ruifrok & Johnston, 2001)
+_HEMATOXYLIN_OD = np.array([0.65, 0.70, 0.29], dtype=np.float32)
+_EOSIN_OD = np.array([0.07, 0.99, 0.11], dtype=np.float32)
+# tissue is laid out on a grid of square cells of this size
+_TISSUE_CELL = 64
+# downsampling factor between levels of the pyramid
+_LEVEL_DOWNSAMPLE = 4
+
+
+def synthetic_slide(
+    shape=(8192, 8192),
+    stain="HE",
+    n_channels=4,
+    n_levels=1,
+    seed=0,
+    path=None,
+    name=None,
+    block_size=2048,
+):
+    """
+    Generate a synthetic slide, for testing and benchmarking at scale without slide files.
+    The slide contains blobs of tissue with nuclei scattered throughout, on an empty background. Generation is
+    deterministic: the same arguments always give the same slide.
+
+    Args:
+        shape (Tuple[int, int]): (H, W) shape of the slide at the highest resolution. Defaults to (8192, 8192).
+        stain (str): Type of slide to generate. Must be one of:
+            ``"HE"``: H&E-stained brightfield slide, of shape (H, W, 3) and dtype uint8.
+            ``"Fluor"``: multiplex immunofluorescence slide, of shape (H, W, 1, n_channels, 1) and dtype uint16, with
+            a nuclear stain in the first channel.
+            Defaults to ``"HE"``.
+        n_channels (int): Number of channels of ``"Fluor"`` slides. Ignored for ``"HE"`` slides. Defaults to 4.
+        n_levels (int): Number of levels of the pyramid. Each level is downsampled by a factor of 4 from the
+            previous level. Defaults to 1.
+        seed (int): Random seed. Defaults to 0.
+        path (str, optional): Directory in which to store the levels of the slide as ``.npy`` files. Levels are then
+            memory-mapped instead of held in memory, for slides which are too large to fit in memory. Defaults to
+            ``None``.
+        name (str, optional): Name of slide. If ``None``, defaults to ``"synthetic_{stain}_{seed}"``.
+        block_size (int): The slide is generated in square blocks of this size, to limit memory use. Must be a
+            multiple of 64. Defaults to 2048.
+
+    Returns:
+        pathml.core.SlideData: synthetic slide, read through an :class:`~pathml.core.ArrayBackend`
+
+    Example:
+        >>> from pathml.core import synthetic_slide
+        >>> wsi = synthetic_slide(shape=(25600, 25600), n_levels=3, path="synthetic")
+        >>> wsi.run(pipeline, tile_size=256)    # 10,000 tiles
+    """
+    assert stain in {
+        "HE",
+        "Fluor",
+    }, f"stain {stain} invalid. Must be one of 'HE', 'Fluor'"
+    assert (
+        block_size % _TISSUE_CELL == 0
+    ), f"block_size {block_size} invalid. Must be a multiple of {_TISSUE_CELL}"
+    assert n_levels >= 1, f"n_levels {n_levels} invalid. Must be at least 1"
+    h, w = shape
+    if stain == "HE":
+        dims, dtype, slide_type = (3,), np.uint8, pathml.core.types.HE
+    else:
+        dims, dtype, slide_type = (1, n_channels, 1), np.uint16, pathml.core.types.IF
+    if path is not None:
+        Path(path).mkdir(parents=True, exist_ok=True)
+
+    tissue = _tissue_map(
+        np.random.default_rng(seed), (-(-h // _TISSUE_CELL), -(-w // _TISSUE_CELL))
+    )
+    image = _allocate_level(path, 0, (h, w) + dims, dtype)
+    cells_per_block = block_size // _TISSUE_CELL
+    for i in range(0, h, block_size):
+        for j in range(0, w, block_size):
+            # each block has its own random state, so that blocks do not depend on each other
+            rng = np.random.default_rng([seed, i // block_size, j // block_size])
+            block_shape = (min(block_size, h - i), min(block_size, w - j))
+            ci, cj = i // _TISSUE_CELL, j // _TISSUE_CELL
+            block_tissue = tissue[ci : ci + cells_per_block, cj : cj + cells_per_block]
+            block_tissue = block_tissue.repeat(_TISSUE_CELL, axis=0).repeat(
+                _TISSUE_CELL, axis=1
+            )[: block_shape[0], : block_shape[1]]
+            if stain == "HE":
+                block = _he_block(rng, block_tissue)
+            else:
+                block = _fluor_block(rng, block_tissue, n_channels)
+            image[i : i + block_shape[0], j : j + block_shape[1]] = block.reshape(
+                block_shape + dims
+            )
+    levels = [image]
+    for level in range(1, n_levels):
+        levels.append(_downsample_level(levels[-1], path, level, block_size))
+
+    if path is not None:
+        # reopen read-only, so that the levels are pickled as references to their files
+        for level in levels:
+            level.flush()
+        levels = [
+            np.load(_level_path(path, level), mmap_mode="r")
+            for level in range(n_levels)
+        ]
+    if name is None:
+        name = f"synthetic_{stain}_{seed}"
+    return pathml.core.SlideData(
+        backend=ArrayBackend(levels), name=name, slide_type=slide_type
+    )
+
+
+def _level_path(path, level):
+    return Path(path) / f"level_{level}.npy"
+
+
+def _allocate_level(path, level, shape, dtype):
+    """
+    Allocate an array for one level of a synthetic slide, either in memory or memory-mapped to a ``.npy`` file.
+    """
+    if path is None:
+        return np.empty(shape, dtype=dtype)
+    return np.lib.format.open_memmap(
+        _level_path(path, level), mode="w+", dtype=dtype, shape=shape
+    )
+
+
+def _downsample_level(image, path, level, block_size):
+    """
+    Compute the next level of a pyramid, by averaging blocks of pixels. Processed in blocks to limit memory use.
+    """
+    f = _LEVEL_DOWNSAMPLE
+    h, w = image.shape[0] // f, image.shape[1] // f
+    dims = image.shape[2:]
+    out = _allocate_level(path, level, (h, w) + dims, image.dtype)
+    step = block_size // f
+    for i in range(0, h, step):
+        for j in range(0, w, step):
+            bh, bw = min(step, h - i), min(step, w - j)
+            block = np.asarray(image[i * f : (i + bh) * f, j * f : (j + bw) * f])
+            total = sum(
+                block[di::f, dj::f].astype(np.uint32)
+                for di in range(f)
+                for dj in range(f)
+            )
+            out[i : i + bh, j : j + bw] = (total + f * f // 2) // (f * f)
+    return out
+
+
+def _tissue_map(rng, shape):
+    """
+    Random smooth blobs of tissue covering about half of the slide, with one pixel per tissue cell.
+    """
+    from scipy.ndimage import gaussian_filter
+
+    field = gaussian_filter(rng.standard_normal(shape), sigma=max(min(shape) / 8, 1))
+    return field > np.median(field)
+
+
+def _blobs(rng, shape, size, threshold):
+    """
+    Random round blobs about ``size`` pixels across, made by thresholding noise which is linearly interpolated from
+    a grid with spacing ``size``. Higher thresholds give fewer, smaller blobs.
+    """
+    noise = rng.random((shape[0] // size + 2, shape[1] // size + 2), dtype=np.float32)
+    weights = np.arange(size, dtype=np.float32) / size
+    # interpolate along each axis in turn
+    noise = (
+        noise[:-1, None, :] * (1 - weights[None, :, None])
+        + noise[1:, None, :] * weights[None, :, None]
+    )
+    noise = noise.reshape(-1, noise.shape[2])
+    noise = noise[:, :-1, None] * (1 - weights) + noise[:, 1:, None] * weights
+    noise = noise.reshape(noise.shape[0], -1)
+    return noise[: shape[0], : shape[1]] > threshold
+
+
+def _he_block(rng, tissue):
+    """
+    Generate an RGB block of an H&E slide, by mixing stain concentrations with the Beer-Lambert law.
+    """
+    nuclei = _blobs(rng, tissue.shape, 8, 0.78)
+    texture = rng.random(tissue.shape, dtype=np.float32)
+    eosin = tissue * (0.3 + 0.3 * texture)
+    hematoxylin = tissue * np.where(nuclei, np.float32(1.0), np.float32(0.1))
+    # slight background absorbance, so that empty areas are not pure white
+    background = np.float32(0.05) * texture
+    block = np.empty(tissue.shape + (3,), dtype=np.uint8)
+    for channel in range(3):
+        od = (
+            hematoxylin * _HEMATOXYLIN_OD[channel]
+            + eosin * _EOSIN_OD[channel]
+            + background
+        )
+        block[..., channel] = 255 * np.exp(-od)
+    return block
+
+
+def _fluor_block(rng, tissue, n_channels):
+    """
+    Generate a block of a multiplex immunofluorescence slide, with nuclei in the first channel and patches of
+    marker expression in the other channels.
+    """
+    block = rng.integers(0, 200, size=tissue.shape + (n_channels,), dtype=np.uint16)
+    block[..., 0] += (tissue & _blobs(rng, tissue.shape, 8, 0.78)).astype(
+        np.uint16
+    ) * np.uint16(3000)
+    for channel in range(1, n_channels):
+        marker = tissue & _blobs(rng, tissue.shape, 16, 0.65)
+        block[..., channel] += marker.astype(np.uint16) * np.uint16(
+            rng.integers(500, 3000)
+        )
+    return block
@@ -4,13 +4,21 @@ License: GNU GPL 2.0
 """
 
 import numpy as np
-import anndata
 from collections import OrderedDict
-import matplotlib.pyplot as plt
 import h5py
 import reprlib
 
 import pathml.core.masks
+import pathml.utils
+
+# representations of tile images which can be requested with Tile.derived()
+_derived_representations = {
+    "GREY": pathml.utils.RGB_to_GREY,
+    "HSI": pathml.utils.RGB_to_HSI,
+    "HSV": pathml.utils.RGB_to_HSV,
+    "LAB": pathml.utils.RGB_to_LAB,
+    "OD": pathml.utils.RGB_to_OD,
+}
 
 
 class Tile:
@@ -106,6 +114,8 @@ class Tile:
             if stain_type_dict:
                 slide_type = pathml.core.types.SlideType(**stain_type_dict)
 
+        import anndata
+
         assert counts is None or isinstance(
             counts, anndata.AnnData
         ), f"counts is of type {type(counts)} but must be of type anndata.AnnData or None"
@@ -120,6 +130,7 @@ class Tile:
         elif masks is None:
             self.masks = OrderedDict()
 
+        self._derived = {}
         self.image = image
         self.name = name
         self.coords = coords
@@ -127,6 +138,51 @@ class Tile:
         self.labels = labels
         self.counts = counts
 
+    @property
+    def image(self):
+        """
+        Image array of tile. Assigning a new image clears the representations computed by :meth:`derived`.
+        """
+        return self._image
+
+    @image.setter
+    def image(self, image):
+        self._image = image
+        self._derived = {}
+
+    def __getstate__(self):
+        # derived representations are recomputed where they are needed, rather than copied with the tile
+        state = self.__dict__.copy()
+        state["_derived"] = {}
+        return state
+
+    def derived(self, name):
+        """
+        Get a representation of the image of the tile in another color space, e.g. optical density.
+        Each representation is computed once, and shared by all transforms which request it, until a new image is
+        assigned to ``tile.image``. Returned arrays are read-only, since they are shared.
+        Modifying ``tile.image`` in-place, rather than assigning a new image, does not clear computed representations.
+
+        Args:
+            name (str): Representation to get. Must be one of:
+                ``"GREY"``: greyscale, see :func:`~pathml.utils.RGB_to_GREY`
+                ``"HSI"``: hue, saturation, intensity, see :func:`~pathml.utils.RGB_to_HSI`
+                ``"HSV"``: hue, saturation, value, see :func:`~pathml.utils.RGB_to_HSV`
+                ``"LAB"``: CIELAB, see :func:`~pathml.utils.RGB_to_LAB`
+                ``"OD"``: optical density, see :func:`~pathml.utils.RGB_to_OD`
+
+        Returns:
+            np.ndarray: representation of the tile image
+        """
+        assert (
+            name in _derived_representations
+        ), f"name {name} invalid. Must be one of {list(_derived_representations)}"
+        if name not in self._derived:
+            array = _derived_representations[name](self.image)
+            array.flags.writeable = False
+            self._derived[name] = array
+        return self._derived[name]
+
     def __repr__(self):
         out = []
         out.append(f"Tile(coords={self.coords}")
@@ -167,6 +223,8 @@ class Tile:
             )
 
         if ax is None:
+            import matplotlib.pyplot as plt
+
             ax = plt.gca()
 
         ax.imshow(self.image)
@@ -81,6 +81,22 @@ class Tiles:
         self.h5manager.add_tile(tile)
         del tile
 
+    def add_tiles(self, tiles):
+        """
+        Add a batch of tiles, each indexed by tile.coords.
+        Faster than calling ``add()`` for each tile.
+
+        Args:
+            tiles(list[Tile]): tile objects
+        """
+        tiles = list(tiles)
+        for tile in tiles:
+            if not isinstance(tile, pathml.core.tile.Tile):
+                raise ValueError(
+                    f"can not add {type(tile)}, tile must be of type pathml.core.tiles.Tile"
+                )
+        self.h5manager.add_tiles(tiles)
+
     def update(self, key, val, target="all"):
         """
         Update a tile.
@@ -8,11 +8,8 @@ import tempfile
 from collections import OrderedDict
 from dataclasses import asdict
 
-import anndata
 import h5py
 import numpy as np
-import pathml.core.slide_backends
-import pathml.core.slide_data
 
 
 # TODO: Fletcher32 checksum?
@@ -107,6 +104,8 @@ def readcounts(h5):
     Args:
         h5(h5py.Dataset): h5 object that will be read
     """
+    import anndata
+
     # create and save temp h5py file
     # read using anndata from temp file
     # anndata does not support reading directly from h5
@@ -3,7 +3,8 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
-from .pipeline import Pipeline
+from .pipeline import Pipeline, PipelineProfile
+from .pipeline_cache import PipelineCache
 from .transforms import (
     BinaryThreshold,
     BoxBlur,
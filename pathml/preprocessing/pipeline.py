@@ -3,9 +3,18 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import json
+import os
 import pickle
+import socket
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from warnings import warn
 
 import pathml.core.tile
+from pathml.preprocessing.pipeline_cache import PipelineCache
 from pathml.preprocessing.transforms import Transform
 
 
@@ -16,13 +25,19 @@ class Pipeline(Transform):
     Args:
         transform_sequence (list): sequence of transforms to be consecutively applied.
             List of `pathml.core.Transform` objects
+        cache (Union[PipelineCache, str], optional): cache of the results of the transforms on each tile, or path to
+            its directory, so that when the pipeline is changed and run again, the transforms it starts with are not
+            recomputed. See :class:`~pathml.preprocessing.pipeline_cache.PipelineCache`. Defaults to ``None``.
     """
 
-    def __init__(self, transform_sequence):
+    def __init__(self, transform_sequence, cache=None):
         assert all([isinstance(t, Transform) for t in transform_sequence]), (
             f"All elements in input list must be of" f" type pathml.core.Transform"
         )
         self.transforms = transform_sequence
+        if cache is not None and not isinstance(cache, PipelineCache):
+            cache = PipelineCache(cache)
+        self.cache = cache
 
     def __len__(self):
         return len(self.transforms)
@@ -34,15 +49,34 @@ class Pipeline(Transform):
         out += "])"
         return out
 
-    def apply(self, tile):
+    def apply(self, tile, profile=None):
         # this function has side effects
         # modifies the tile in place, but also returns the modified tile
         # need to do this for dask distributed
         assert isinstance(
             tile, pathml.core.tile.Tile
         ), f"argument of type {type(tile)} must be a pathml.core.Tile object."
-        for t in self.transforms:
-            t.apply(tile)
+        # pipelines saved before caching was added have no cache attribute
+        cache = getattr(self, "cache", None)
+        keys = []
+        start = 0
+        if cache is not None:
+            keys = cache.prefix_keys(tile, self.transforms)
+            # resume from the result of the longest prefix of the pipeline which is in the cache
+            for i in reversed(range(len(keys))):
+                if cache.get(keys[i], tile):
+                    start = i + 1
+                    break
+        for i in range(start, len(self.transforms)):
+            t = self.transforms[i]
+            # if a PipelineProfile is given, the time and memory used by each transform are recorded in it
+            if profile is None:
+                t.apply(tile)
+            else:
+                with profile.measure(i, t, tile):
+                    t.apply(tile)
+            if i < len(keys):
+                cache.put(keys[i], tile)
         return tile
 
     def save(self, filename):
@@ -53,3 +87,174 @@ class Pipeline(Transform):
             filename (str): save path on disk
         """
         pickle.dump(self, open(filename, "wb"))
+
+
+class PipelineProfile:
+    """
+    Time and memory used by each transform of a pipeline on each tile.
+    Filled in by :meth:`Pipeline.apply` when it is given a profile, and returned in the
+    :class:`~pathml.core.RunStats` of :meth:`~pathml.core.SlideData.run` when run with ``profile=True``, with the
+    measurements of all workers.
+
+    For each transform applied to each tile, records:
+
+        * ``wall_seconds``: wall time taken by the transform
+        * ``cpu_seconds``: CPU time used by the thread applying the transform. Lower than ``wall_seconds`` when the
+          transform waits, e.g. on I/O, a GPU or the GIL, or when its work is done on other threads, e.g. by OpenCV.
+        * ``peak_bytes``: peak memory allocated while applying the transform, above what was allocated before, as
+          traced by :mod:`tracemalloc` (including numpy arrays). ``None`` if ``memory=False``.
+
+    Memory is traced in the whole process, which has a single peak: measurements are only meaningful if one tile is
+    processed at a time in each process. When tiles are processed on several threads of the same process, e.g. on a
+    dask worker with several threads, each thread resets the peak of the others, and ``peak_bytes`` may be too low or
+    include allocations by the other threads. :meth:`~pathml.core.SlideData.run` therefore does not profile memory
+    with ``executor="thread"``.
+
+    Args:
+        memory (bool): Whether to trace memory allocations. Tracing memory slows down transforms which allocate many
+            Python objects. Requires Python >= 3.9; on older versions a warning is raised and memory is not traced.
+            Defaults to ``True``.
+
+    Attributes:
+        events (list[dict]): one measurement for each transform applied to each tile
+    """
+
+    def __init__(self, memory=True):
+        # reset_peak() was added in python 3.9
+        if memory and not hasattr(tracemalloc, "reset_peak"):
+            warn(
+                "Memory is not profiled on Python < 3.9, which lacks tracemalloc.reset_peak()"
+            )
+            memory = False
+        self.memory = memory
+        self.events = []
+
+    def __len__(self):
+        return len(self.events)
+
+    def __repr__(self):
+        if not self.events:
+            return "PipelineProfile(empty)"
+        return f"PipelineProfile:\n{self.summary().to_string()}"
+
+    @contextmanager
+    def measure(self, index, transform, tile):
+        """
+        Measure applying a transform to a tile, as the body of a ``with`` block.
+
+        Args:
+            index (int): position of the transform in the pipeline
+            transform (pathml.preprocessing.transforms.Transform): transform being applied
+            tile (pathml.core.tile.Tile): tile to which it is applied
+        """
+        memory = self.memory
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            allocated = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.time()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        yield
+        wall = time.perf_counter() - wall
+        cpu = time.thread_time() - cpu
+        self.events.append(
+            {
+                "index": index,
+                "transform": type(transform).__name__,
+                "tile": str(tile.coords),
+                "start": start,
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+                "peak_bytes": (
+                    tracemalloc.get_traced_memory()[1] - allocated if memory else None
+                ),
+                "process": f"{socket.gethostname()}:{os.getpid()}",
+                "thread": threading.get_ident(),
+            }
+        )
+
+    def update(self, other):
+        """
+        Add the measurements of another profile, e.g. from another worker.
+
+        Args:
+            other (PipelineProfile): profile to add
+        """
+        self.events.extend(other.events)
+
+    def summary(self):
+        """
+        Summarize the measurements of each transform across all tiles.
+
+        Returns:
+            pandas.DataFrame: one row for each transform of the pipeline, in order, with the number of tiles it was
+            applied to, its total and mean wall time, its total CPU time, and its maximum peak memory
+        """
+        import pandas as pd
+
+        events = pd.DataFrame(self.events)
+        if events.empty:
+            return events
+        summary = events.groupby(["index", "transform"]).agg(
+            n_tiles=("tile", "size"),
+            wall_seconds=("wall_seconds", "sum"),
+            mean_wall_seconds=("wall_seconds", "mean"),
+            cpu_seconds=("cpu_seconds", "sum"),
+            max_peak_bytes=("peak_bytes", "max"),
+        )
+        summary["wall_fraction"] = summary.wall_seconds / summary.wall_seconds.sum()
+        return summary
+
+    def to_json(self, path):
+        """
+        Write all measurements to a JSON file, as a list of events.
+
+        Args:
+            path (str): path to JSON file
+        """
+        with open(path, "w") as f:
+            json.dump({"events": self.events}, f)
+
+    def to_chrome_trace(self, path):
+        """
+        Write all measurements to a JSON file in the Chrome trace event format, to be viewed as a timeline in
+        ``chrome://tracing`` or https://ui.perfetto.dev. Each process and thread which applied transforms has its own
+        track. Times of events on different machines are only as aligned as their clocks.
+
+        Args:
+            path (str): path to JSON file
+        """
+        process_ids = {}
+        trace = []
+        for event in self.events:
+            if event["process"] not in process_ids:
+                process_ids[event["process"]] = len(process_ids)
+                trace.append(
+                    {
+                        "name": "process_name",
+                        "ph": "M",
+                        "pid": process_ids[event["process"]],
+                        "args": {"name": event["process"]},
+                    }
+                )
+            trace.append(
+                {
+                    "name": event["transform"],
+                    "cat": "transform",
+                    "ph": "X",
+                    "ts": event["start"] * 1e6,
+                    "dur": event["wall_seconds"] * 1e6,
+                    "pid": process_ids[event["process"]],
+                    "tid": event["thread"],
+                    "args": {
+                        "tile": event["tile"],
+                        "index": event["index"],
+                        "cpu_seconds": event["cpu_seconds"],
+                        "peak_bytes": event["peak_bytes"],
+                    },
+                }
+            )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,219 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+from pathml.preprocessing.transforms import Transform
+
+# when the cache is over its size limit, least recently used entries are evicted until it is below this fraction of
+# the limit, so that eviction does not run on every write
+_EVICT_TO = 0.9
+# each process rescans the cache once it may have grown by this fraction of the limit since its last scan, to account
+# for entries written by other processes
+_RESCAN_AFTER = 0.1
+
+
+class PipelineCache:
+    """
+    Local on-disk cache of the results of applying a pipeline to tiles, so that when a pipeline is run again after
+    changing only its last transforms, the transforms it starts with are not recomputed.
+
+    Results are content-addressed: the state of a tile after the first ``k`` transforms of a pipeline is keyed by a
+    hash of the tile before the pipeline (its image, masks, labels, coordinates and other attributes), and of the
+    class and ``repr`` of each of the ``k`` transforms. When the pipeline is applied to a tile, the result of its
+    longest cached prefix is loaded, and only the remaining transforms are applied, caching the result of each.
+
+    Transforms are only cached if they define a ``__repr__`` showing all parameters which affect their result, as
+    all transforms in ``pathml.preprocessing`` do. A transform which does not, and all transforms after it in the
+    pipeline, are always applied. The cache does not know about changes to the code of transforms, e.g. after
+    upgrading ``pathml``, so it should then be cleared with :meth:`clear`.
+
+    The total size of the cache is bounded by evicting the least recently used entries. With several processes
+    writing to the same cache, e.g. dask workers on a shared filesystem, each process only rescans the cache
+    periodically, so the bound is approximate.
+
+    Entries are pickled, so only use a cache directory which is trusted.
+
+    Args:
+        cache_dir (str): path to directory in which to store cached results. Created if it does not exist.
+        max_bytes (int): Maximum total size of cached results, in bytes. Defaults to 10 GiB.
+
+    Example:
+        >>> from pathml.preprocessing import Pipeline, PipelineCache
+        >>> pipeline = Pipeline([StainNormalizationHE(), TissueDetectionHE(mask_name="tissue")],
+        ...                     cache=PipelineCache("pipeline_cache"))
+    """
+
+    def __init__(self, cache_dir, max_bytes=10 * 2**30):
+        assert max_bytes > 0, f"max_bytes {max_bytes} invalid. Must be positive"
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # estimated total size of the cache, from the last scan and entries written since, or None before a scan
+        self._size = None
+        self._scanned_size = 0
+
+    def __repr__(self):
+        return f"PipelineCache('{self.cache_dir}', max_bytes={self.max_bytes})"
+
+    def __getstate__(self):
+        # each process, e.g. each worker, keeps its own estimate of the size of the cache
+        state = self.__dict__.copy()
+        state["_size"] = None
+        state["_scanned_size"] = 0
+        return state
+
+    @staticmethod
+    def tile_hash(tile):
+        """
+        Compute the hash of the content of a tile.
+
+        Args:
+            tile (pathml.core.tile.Tile): tile
+
+        Returns:
+            str: hex digest of the image, masks, labels, coordinates and other attributes of the tile
+        """
+        h = hashlib.sha1()
+        # arrays are passed as out-of-band buffers, so that they are hashed without being copied
+        buffers = []
+        h.update(
+            pickle.dumps(_tile_state(tile), protocol=5, buffer_callback=buffers.append)
+        )
+        for buffer in buffers:
+            h.update(buffer.raw())
+        return h.hexdigest()
+
+    @staticmethod
+    def prefix_keys(tile, transforms):
+        """
+        Compute the keys of the results of each prefix of a sequence of transforms on a tile.
+
+        Args:
+            tile (pathml.core.tile.Tile): tile, before any transform is applied
+            transforms (list): sequence of transforms
+
+        Returns:
+            list[str]: key of the result of the first ``k + 1`` transforms, for each ``k`` up to the first transform
+            which cannot be cached
+        """
+        h = hashlib.sha1(PipelineCache.tile_hash(tile).encode())
+        keys = []
+        for transform in transforms:
+            if type(transform).__repr__ is Transform.__repr__:
+                break
+            cls = type(transform)
+            h.update(f"{cls.__module__}.{cls.__qualname__}:{transform!r};".encode())
+            keys.append(h.copy().hexdigest())
+        return keys
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key[2:]}.pkl"
+
+    def get(self, key, tile):
+        """
+        Load a cached result into a tile.
+
+        Args:
+            key (str): key of the result
+            tile (pathml.core.tile.Tile): tile to update in-place
+
+        Returns:
+            bool: whether the result was in the cache
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False
+        try:
+            # mark the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        for name, value in state.items():
+            setattr(tile, name, value)
+        return True
+
+    def put(self, key, tile):
+        """
+        Store the state of a tile in the cache.
+
+        Args:
+            key (str): key of the result
+            tile (pathml.core.tile.Tile): tile
+        """
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so that readers never see a partially written entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(_tile_state(tile), f, protocol=pickle.HIGHEST_PROTOCOL)
+                nbytes = f.tell()
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self._size is None:
+            self._evict()
+        else:
+            self._size += nbytes
+            if (
+                self._size > self.max_bytes
+                or self._size - self._scanned_size > _RESCAN_AFTER * self.max_bytes
+            ):
+                self._evict()
+
+    def _evict(self):
+        """
+        Scan the cache, and evict least recently used entries if it is over its size limit.
+        """
+        entries = []
+        for path in self.cache_dir.glob("*/*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum(nbytes for _, nbytes, _ in entries)
+        if size > self.max_bytes:
+            entries.sort(key=lambda entry: entry[0])
+            for _, nbytes, path in entries:
+                if size <= _EVICT_TO * self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                size -= nbytes
+        self._size = self._scanned_size = size
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        for path in self.cache_dir.iterdir():
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+        self._size = self._scanned_size = 0
+
+
+def _tile_state(tile):
+    """
+    Attributes of a tile which are cached. Private attributes, e.g. representations computed by
+    :meth:`~pathml.core.tile.Tile.derived`, are not, except for the image, which is held behind a property.
+    """
+    state = {
+        name: value for name, value in vars(tile).items() if not name.startswith("_")
+    }
+    state["image"] = tile.image
+    return state
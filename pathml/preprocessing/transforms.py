@@ -186,7 +186,7 @@ class BinaryThreshold(Transform):
             self.mask_name is not None
         ), "mask_name is None. Must supply a valid mask name"
         if tile.slide_type.rgb:
-            im = RGB_to_GREY(tile.image)
+            im = tile.derived("GREY")
         else:
             im = np.squeeze(tile.image)
             assert im.ndim == 2, "chunk.image is not RGB and has more than 1 channel"
@@ -567,12 +567,13 @@ class StainNormalizationHE(Transform):
         Args:
             image_ref (np.ndarray): RGB reference image
         """
+        image_OD = RGB_to_OD(image_ref)
         # first estimate stain matrix for reference image_ref
-        stain_matrix = self._estimate_stain_vectors(image=image_ref)
+        stain_matrix = self._estimate_stain_vectors(image=image_ref, image_OD=image_OD)
 
         # next get pixel concentrations for reference image_ref
         C = self._estimate_pixel_concentrations(
-            image=image_ref, stain_matrix=stain_matrix
+            image=image_ref, stain_matrix=stain_matrix, image_OD=image_OD
         )
 
         # get max concentrations
@@ -583,18 +584,23 @@ class StainNormalizationHE(Transform):
         self.stain_matrix_target_od = stain_matrix
         self.max_c_target = max_C
 
-    def _estimate_stain_vectors(self, image):
+    def _estimate_stain_vectors(self, image, image_OD=None):
         """
         Estimate stain vectors using appropriate method
 
         Args:
             image (np.ndarray): RGB image
+            image_OD (np.ndarray, optional): image in optical density space, if already computed
         """
         # first estimate stain matrix for reference image_ref
         if self.stain_estimation_method == "macenko":
-            stain_matrix = self._estimate_stain_vectors_macenko(image)
+            stain_matrix = self._estimate_stain_vectors_macenko(
+                image, image_OD=image_OD
+            )
         elif self.stain_estimation_method == "vahadane":
-            stain_matrix = self._estimate_stain_vectors_vahadane(image)
+            stain_matrix = self._estimate_stain_vectors_vahadane(
+                image, image_OD=image_OD
+            )
         else:
             raise Exception(
                 f"Error: input stain estimation method {self.stain_estimation_method} must be one of "
@@ -602,7 +608,7 @@ class StainNormalizationHE(Transform):
             )
         return stain_matrix
 
-    def _estimate_pixel_concentrations(self, image, stain_matrix):
+    def _estimate_pixel_concentrations(self, image, stain_matrix, image_OD=None):
         """
         Estimate pixel concentrations from a given stain matrix using appropriate method
 
@@ -610,24 +616,31 @@ class StainNormalizationHE(Transform):
             image (np.ndarray): RGB image
             stain_matrix (np.ndarray): matrix of H and E stain vectors in optical density (OD) space.
                 Stain_matrix is (3, 2) and first column corresponds to hematoxylin by convention.
+            image_OD (np.ndarray, optional): image in optical density space, if already computed
         """
         if self.stain_estimation_method == "macenko":
-            C = self._estimate_pixel_concentrations_lstsq(image, stain_matrix)
+            C = self._estimate_pixel_concentrations_lstsq(
+                image, stain_matrix, image_OD=image_OD
+            )
         elif self.stain_estimation_method == "vahadane":
-            C = self._estimate_pixel_concentrations_lasso(image, stain_matrix)
+            C = self._estimate_pixel_concentrations_lasso(
+                image, stain_matrix, image_OD=image_OD
+            )
         else:
             raise Exception(f"Provided target {self.target} invalid")
         return C
 
-    def _estimate_stain_vectors_vahadane(self, image, random_seed=0):
+    def _estimate_stain_vectors_vahadane(self, image, random_seed=0, image_OD=None):
         """
         Estimate stain vectors using dictionary learning method from Vahadane et al.
 
         Args:
             image (np.ndarray): RGB image
+            image_OD (np.ndarray, optional): image in optical density space, if already computed
         """
         # convert to Optical Density (OD) space
-        image_OD = RGB_to_OD(image)
+        if image_OD is None:
+            image_OD = RGB_to_OD(image)
         # reshape to (M*N)x3
         image_OD = image_OD.reshape(-1, 3)
         # drop pixels with low OD
@@ -654,16 +667,18 @@ class StainNormalizationHE(Transform):
             dictionary = dictionary[:, [1, 0]]
         return dictionary
 
-    def _estimate_stain_vectors_macenko(self, image):
+    def _estimate_stain_vectors_macenko(self, image, image_OD=None):
         """
         Estimate stain vectors using Macenko method. Returns a (3, 2) matrix with first column corresponding to
         hematoxylin and second column corresponding to eosin in OD space.
 
         Args:
             image (np.ndarray): RGB image
+            image_OD (np.ndarray, optional): image in optical density space, if already computed
         """
         # convert to Optical Density (OD) space
-        image_OD = RGB_to_OD(image)
+        if image_OD is None:
+            image_OD = RGB_to_OD(image)
         # reshape to (M*N)x3
         image_OD = image_OD.reshape(-1, 3)
         # drop pixels with low OD
@@ -697,7 +712,7 @@ class StainNormalizationHE(Transform):
             HE = np.array((stain1, stain2)).T
         return HE
 
-    def _estimate_pixel_concentrations_lstsq(self, image, stain_matrix):
+    def _estimate_pixel_concentrations_lstsq(self, image, stain_matrix, image_OD=None):
         """
         estimate concentrations of each stain at each pixel using least squares
 
@@ -705,8 +720,11 @@ class StainNormalizationHE(Transform):
             image (np.ndarray): RGB image
             stain_matrix (np.ndarray): matrix of H and E stain vectors in optical density (OD) space.
                 Stain_matrix is (3, 2) and first column corresponds to hematoxylin by convention.
+            image_OD (np.ndarray, optional): image in optical density space, if already computed
         """
-        image_OD = RGB_to_OD(image).reshape(-1, 3)
+        if image_OD is None:
+            image_OD = RGB_to_OD(image)
+        image_OD = image_OD.reshape(-1, 3)
 
         # Get concentrations of each stain at each pixel
         # image_ref.T = S @ C.T
@@ -717,7 +735,7 @@ class StainNormalizationHE(Transform):
         C = np.linalg.lstsq(stain_matrix, image_OD.T, rcond=None)[0].T
         return C
 
-    def _estimate_pixel_concentrations_lasso(self, image, stain_matrix):
+    def _estimate_pixel_concentrations_lasso(self, image, stain_matrix, image_OD=None):
         """
         estimate concentrations of each stain at each pixel using lasso
 
@@ -725,8 +743,11 @@ class StainNormalizationHE(Transform):
             image (np.ndarray): RGB image
             stain_matrix (np.ndarray): matrix of H and E stain vectors in optical density (OD) space.
                 Stain_matrix is (3, 2) and first column corresponds to hematoxylin by convention.
+            image_OD (np.ndarray, optional): image in optical density space, if already computed
         """
-        image_OD = RGB_to_OD(image).reshape(-1, 3)
+        if image_OD is None:
+            image_OD = RGB_to_OD(image)
+        image_OD = image_OD.reshape(-1, 3)
 
         # Get concentrations of each stain at each pixel
         # image_ref.T = S @ C.T
@@ -779,12 +800,17 @@ class StainNormalizationHE(Transform):
         im = im.T.astype(np.uint8)
         return im
 
-    def F(self, image):
+    def F(self, image, image_OD=None):
+        # image_OD is the image in optical density space, if already computed
+        if image_OD is None:
+            image_OD = RGB_to_OD(image)
         # first estimate stain matrix for reference image_ref
-        stain_matrix = self._estimate_stain_vectors(image=image)
+        stain_matrix = self._estimate_stain_vectors(image=image, image_OD=image_OD)
 
         # next get pixel concentrations for reference image_ref
-        C = self._estimate_pixel_concentrations(image=image, stain_matrix=stain_matrix)
+        C = self._estimate_pixel_concentrations(
+            image=image, stain_matrix=stain_matrix, image_OD=image_OD
+        )
 
         # next reconstruct the image_ref
         im_reconstructed = self._reconstruct_image(pixel_intensities=C)
@@ -799,7 +825,7 @@ class StainNormalizationHE(Transform):
         assert (
             tile.slide_type.stain == "HE"
         ), f"Tile has slide_type.stain={tile.slide_type.stain}, but must be 'HE'"
-        tile.image = self.F(tile.image)
+        tile.image = self.F(tile.image, image_OD=tile.derived("OD"))
 
 
 class NucleusDetectionHE(Transform):
@@ -843,7 +869,8 @@ class NucleusDetectionHE(Transform):
             f"stain_kwargs={self.stain_kwargs})"
         )
 
-    def F(self, image):
+    def F(self, image, image_OD=None):
+        # image_OD is the image in optical density space, if already computed
         assert (
             image.dtype == np.uint8
         ), f"Input image dtype {image.dtype} must be np.uint8"
@@ -851,7 +878,7 @@ class NucleusDetectionHE(Transform):
             target="hematoxylin",
             stain_estimation_method=self.stain_estimation_method,
             **self.stain_kwargs,
-        ).F(image)
+        ).F(image, image_OD=image_OD)
         im_interpolated = SuperpixelInterpolation(
             region_size=self.superpixel_region_size, n_iter=self.n_iter
         ).F(im_hematoxylin)
@@ -871,7 +898,7 @@ class NucleusDetectionHE(Transform):
         assert (
             tile.slide_type.stain == "HE"
         ), f"Tile has slide_type.stain={tile.slide_type.stain}, but must be 'HE'"
-        nucleus_mask = self.F(tile.image)
+        nucleus_mask = self.F(tile.image, image_OD=tile.derived("OD"))
         tile.masks[self.mask_name] = nucleus_mask
 
 
@@ -925,16 +952,18 @@ class TissueDetectionHE(Transform):
             f"max_hole_size={self.max_hole_size}, outer_contours_only={self.outer_contours_only})"
         )
 
-    def F(self, image):
+    def F(self, image, image_HSV=None, image_grey=None):
+        # image_HSV and image_grey are the image in HSV and greyscale, if already computed
         assert (
             image.dtype == np.uint8
         ), f"Input image dtype {image.dtype} must be np.uint8"
         # first get single channel image_ref
         if self.use_sat:
-            one_channel = RGB_to_HSV(image)
-            one_channel = one_channel[:, :, 1]
+            if image_HSV is None:
+                image_HSV = RGB_to_HSV(image)
+            one_channel = image_HSV[:, :, 1]
         else:
-            one_channel = RGB_to_GREY(image)
+            one_channel = image_grey if image_grey is not None else RGB_to_GREY(image)
 
         blurred = MedianBlur(kernel_size=self.blur_ksize).F(one_channel)
         if self.threshold is None:
@@ -966,7 +995,10 @@ class TissueDetectionHE(Transform):
         assert (
             tile.slide_type.stain == "HE"
         ), f"Tile has slide_type.stain={tile.slide_type.stain}, but must be 'HE'"
-        mask = self.F(tile.image)
+        if self.use_sat:
+            mask = self.F(tile.image, image_HSV=tile.derived("HSV"))
+        else:
+            mask = self.F(tile.image, image_grey=tile.derived("GREY"))
         tile.masks[self.mask_name] = mask
 
 
@@ -993,8 +1025,9 @@ class LabelWhiteSpaceHE(Transform):
             f"proportion_threshold={self.proportion_threshold})"
         )
 
-    def F(self, image):
-        grey = RGB_to_GREY(image)
+    def F(self, image, image_grey=None):
+        # image_grey is the image in greyscale, if already computed
+        grey = image_grey if image_grey is not None else RGB_to_GREY(image)
         pixel_thresh = np.mean(grey > self.greyscale_threshold)
         return pixel_thresh > self.proportion_threshold
 
@@ -1008,7 +1041,7 @@ class LabelWhiteSpaceHE(Transform):
         assert (
             tile.slide_type.stain == "HE"
         ), f"Tile has slide_type.stain={tile.slide_type.stain}, but must be 'HE'"
-        label = self.F(tile.image)
+        label = self.F(tile.image, image_grey=tile.derived("GREY"))
         if tile.labels:
             tile.labels[self.label_name] = label
         else:
@@ -1035,8 +1068,9 @@ class LabelArtifactTileHE(Transform):
     def __repr__(self):
         return f"LabelArtifactTileHE(label_name={self.label_name})"
 
-    def F(self, image):
-        image_hsi = RGB_to_HSI(image)
+    def F(self, image, image_HSI=None):
+        # image_HSI is the image in HSI, if already computed
+        image_hsi = image_HSI if image_HSI is not None else RGB_to_HSI(image)
         h = image_hsi[:, :, 0]
         s = image_hsi[:, :, 1]
         i = image_hsi[:, :, 2]
@@ -1063,7 +1097,7 @@ class LabelArtifactTileHE(Transform):
         assert (
             tile.slide_type.stain == "HE"
         ), f"Tile has slide_type.stain={tile.slide_type.stain}, but must be 'HE'"
-        label = self.F(tile.image)
+        label = self.F(tile.image, image_HSI=tile.derived("HSI"))
         if tile.labels:
             tile.labels[self.label_name] = label
         else:
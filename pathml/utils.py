@@ -4,9 +4,8 @@ License: GNU GPL 2.0
 """
 
 import numpy as np
-import cv2
-import matplotlib.pyplot as plt
-from matplotlib.colors import TABLEAU_COLORS
+
+# cv2 and matplotlib are imported in the functions which need them, so that importing pathml.utils is fast
 
 
 def upsample_array(arr, factor):
@@ -30,10 +29,15 @@ def upsample_array(arr, factor):
 
 def pil_to_rgb(image_array_pil):
     """
-    Convert PIL RGBA Image to numpy RGB array
+    Convert PIL RGBA or RGB Image to numpy RGB array
     """
     image_array_rgba = np.asarray(image_array_pil)
-    image_array = cv2.cvtColor(image_array_rgba, cv2.COLOR_RGBA2RGB).astype(np.uint8)
+    shape = image_array_rgba.shape
+    assert (
+        len(shape) == 3 and 3 <= shape[2] <= 4
+    ), f"image shape {shape} invalid. Must be RGB or RGBA"
+    # drop alpha channel
+    image_array = np.ascontiguousarray(image_array_rgba[..., :3], dtype=np.uint8)
     return image_array
 
 
@@ -42,6 +46,8 @@ def segmentation_lines(mask_in):
     Generate coords of points bordering segmentations from a given mask.
     Useful for plotting results of tissue detection or other segmentation.
     """
+    import cv2
+
     assert (
         mask_in.dtype == np.uint8
     ), f"Input mask dtype {mask_in.dtype} must be np.uint8"
@@ -70,6 +76,8 @@ def plot_mask(im, mask_in, ax=None, color="red", downsample_factor=None):
 
     x, y = segmentation_lines(mask_in)
     if ax is None:
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots()
     ax.imshow(im)
     ax.scatter(x, y, color=color, marker=".", s=1)
@@ -87,6 +95,8 @@ def contour_centroid(contour):
     :return: (x, y) coordinates of centroid.
     :rtype: tuple
     """
+    import cv2
+
     # from the docs: "Note that the numpy type for the input array should be either np.int32 or np.float32"
     assert contour.dtype == np.float32
     # get the moments
@@ -110,6 +120,8 @@ def sort_points_clockwise(points):
 
     Return sorted points
     """
+    import cv2
+
     # identify centroid as point in center of box bounding all points
     x, y, w, h = cv2.boundingRect(points)
     centroid = (x + w // 2, y + h // 2)
@@ -229,6 +241,8 @@ def RGB_to_OD(imarr):
 
 def RGB_to_HSV(imarr):
     """convert image from RGB to HSV"""
+    import cv2
+
     assert imarr.dtype == np.uint8, f"Input image dtype {imarr.dtype} must be np.uint8"
     hsv = cv2.cvtColor(imarr, cv2.COLOR_RGB2HSV)
     return hsv
@@ -236,6 +250,8 @@ def RGB_to_HSV(imarr):
 
 def RGB_to_LAB(imarr):
     """convert image from RGB to LAB color space"""
+    import cv2
+
     assert imarr.dtype == np.uint8, f"Input image dtype {imarr.dtype} must be np.uint8"
     imarr_float32 = imarr.astype(np.float32) / 255
     lab = cv2.cvtColor(imarr_float32, cv2.COLOR_RGB2Lab)
@@ -244,6 +260,8 @@ def RGB_to_LAB(imarr):
 
 def RGB_to_GREY(imarr):
     """convert image_ref from RGB to HSV"""
+    import cv2
+
     assert imarr.dtype == np.uint8, f"Input image dtype {imarr.dtype} must be np.uint8"
     grey = cv2.cvtColor(imarr, cv2.COLOR_RGB2GRAY)
     return grey
@@ -287,6 +305,8 @@ def plot_segmentation(ax, masks, palette=None, markersize=5):
     n_channels = masks.shape[0]
 
     if palette is None:
+        from matplotlib.colors import TABLEAU_COLORS
+
         palette = list(TABLEAU_COLORS.values())
 
     nucleus_labels = list(np.unique(masks))
@@ -37,6 +37,8 @@ setuptools.setup(
         "opencv-contrib-python==4.5.3.56",
         "tensorly==0.6.0",
         "python-bioformats==4.0.0",
+        "tifffile>=2021.7.2",
+        "imagecodecs>=2021.7.30",
     ],
     classifiers=[
         "License :: OSI Approved :: GNU General Public License v2 (GPLv2)",
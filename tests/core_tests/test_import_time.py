@@ -0,0 +1,56 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+# dependencies which should only be imported when the feature that needs them is used
+HEAVY_MODULES = [
+    "anndata",
+    "bioformats",
+    "cv2",
+    "dask",
+    "javabridge",
+    "matplotlib",
+    "pandas",
+    "pydicom",
+    "scipy.ndimage",
+    "torch",
+]
+
+
+def _import_in_subprocess(statement):
+    """
+    Run an import statement in a fresh interpreter, and return the time taken and the heavy modules it loaded.
+    """
+    code = f"""
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"time": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+    out = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("statement", ["import pathml", "import pathml.core"])
+def test_import_does_not_load_heavy_dependencies(statement):
+    result = _import_in_subprocess(statement)
+    assert result["loaded"] == []
+    # generous bound, to catch regressions such as a heavy dependency being imported eagerly again
+    assert result["time"] < 2.0
+
+
+def test_subpackages_imported_on_access():
+    result = _import_in_subprocess(
+        "import pathml; assert 'pathml.preprocessing' not in sys.modules; pathml.pp.Pipeline"
+    )
+    assert "torch" not in result["loaded"]
@@ -0,0 +1,89 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from pathml.core import (
+    DICOMBackend,
+    OpenSlideBackend,
+    RawTileFile,
+    SlideData,
+    TiffFileBackend,
+)
+
+
+def _decoded_tile(backend, coords, shape):
+    if isinstance(backend, TiffFileBackend):
+        return backend.extract_region(location=coords, size=shape)[:, :, 0, :, 0]
+    return backend.extract_region(location=coords, size=shape)
+
+
+@pytest.mark.parametrize(
+    "path,backend",
+    [
+        ("tests/testdata/small_HE.svs", "openslide"),
+        ("tests/testdata/small_HE.svs", "tifffile"),
+        ("tests/testdata/small_dicom.dcm", "dicom"),
+    ],
+)
+def test_export_raw_tiles(tmp_path, path, backend):
+    wsi = SlideData(path, backend=backend)
+    backend = wsi.slide
+    tile_shape = backend.get_raw_tile_shape()
+    n_tiles = wsi.export_raw_tiles(tmp_path / "tiles.h5")
+    expected_coords = backend.generate_tile_coords(tile_shape, pad=True)
+    assert n_tiles == len(expected_coords)
+
+    with RawTileFile(tmp_path / "tiles.h5") as tiles:
+        assert len(tiles) == n_tiles
+        assert tiles.tile_shape == tile_shape
+        np.testing.assert_array_equal(tiles.coords, expected_coords)
+        # compare tiles which are fully inside the image with decoded regions
+        read_backend = (
+            TiffFileBackend(backend.filename)
+            if isinstance(backend, OpenSlideBackend)
+            else backend
+        )
+        inside = backend.generate_tile_coords(tile_shape, pad=False)
+        for coords in inside[:: max(len(inside) // 5, 1)]:
+            ix = int(np.flatnonzero((tiles.coords == coords).all(axis=1))[0])
+            tile = tiles[ix]
+            assert tile.coords == tuple(coords)
+            expected = _decoded_tile(
+                read_backend, tuple(int(c) for c in coords), tile_shape
+            )
+            np.testing.assert_allclose(tile.image, expected, atol=2)
+
+
+def test_export_raw_tiles_planned(tmp_path):
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    tile_shape = wsi.slide.get_raw_tile_shape()
+    coords = wsi.plan_tiles(shape=tile_shape, pad=True, n_tiles=5, random_state=0)
+    assert wsi.export_raw_tiles(tmp_path / "tiles.h5", coords=coords) == 5
+    tiles = pickle.loads(pickle.dumps(RawTileFile(tmp_path / "tiles.h5")))
+    np.testing.assert_array_equal(tiles.coords, coords)
+    assert tiles[4].image.shape == tile_shape + (3,)
+    assert tiles.read_raw(0)[:2] == b"\xff\xd8"
+
+
+def test_raw_tiles_unaligned():
+    backend = DICOMBackend("tests/testdata/small_dicom.dcm")
+    with pytest.raises(ValueError):
+        backend.read_raw_tile(location=(10, 0))
+    with pytest.raises(ValueError):
+        list(backend.generate_raw_tiles(coords=np.array([[0, 0], [0, 250]])))
+
+
+def test_raw_tiles_not_supported():
+    # uncompressed, untiled tiff
+    backend = TiffFileBackend("tests/testdata/smalltif.tif")
+    assert backend.get_raw_tile_shape() is None
+    with pytest.raises(NotImplementedError):
+        backend.read_raw_tile(location=(0, 0))
+    with pytest.raises(NotImplementedError):
+        list(backend.generate_raw_tiles())
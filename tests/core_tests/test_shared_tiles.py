@@ -0,0 +1,66 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from pathml.core import Tile, types
+from pathml.core.shared_tiles import SharedTiles
+
+
+def _invert(shared_tiles):
+    tiles = shared_tiles.load()
+    for tile in tiles:
+        tile.image[:] = 255 - tile.image
+    del tiles
+    shared_tiles.close()
+    return shared_tiles
+
+
+@pytest.fixture
+def tiles():
+    rng = np.random.default_rng(0)
+    return [
+        Tile(
+            image=rng.integers(0, 255, size=(32, 32, 3), dtype=np.uint8),
+            coords=(32 * i, 0),
+            slide_type=types.HE,
+            masks={"mask": rng.integers(0, 2, size=(32, 32), dtype=np.uint8)},
+            labels={"label": i},
+        )
+        for i in range(3)
+    ]
+
+
+def test_shared_tiles_roundtrip(tiles):
+    shared = pickle.loads(pickle.dumps(SharedTiles(tiles)))
+    # only the metadata of the tiles is pickled, not their pixels
+    assert len(pickle.dumps(shared)) < sum(tile.image.nbytes for tile in tiles)
+    loaded = shared.load()
+    for tile, loaded_tile in zip(tiles, loaded):
+        np.testing.assert_array_equal(loaded_tile.image, tile.image)
+        np.testing.assert_array_equal(loaded_tile.masks["mask"], tile.masks["mask"])
+        assert loaded_tile.coords == tile.coords
+        assert loaded_tile.labels == tile.labels
+        assert loaded_tile.slide_type == tile.slide_type
+    del loaded, loaded_tile
+    shared.release()
+    with pytest.raises(FileNotFoundError):
+        shared.load()
+
+
+def test_shared_tiles_between_processes(tiles):
+    shared = SharedTiles(tiles)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        shared = pool.submit(_invert, shared).result()
+    # the worker modified the tiles in place in shared memory
+    for tile, loaded_tile in zip(tiles, shared.load()):
+        np.testing.assert_array_equal(loaded_tile.image, 255 - tile.image)
+    # tiles which are still referenced stay valid after the shared memory is released
+    shared.release()
+    np.testing.assert_array_equal(loaded_tile.image, 255 - tiles[-1].image)
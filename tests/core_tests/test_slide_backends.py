@@ -3,10 +3,23 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import asyncio
+import pickle
+import threading
+import time
+
 import pytest
 import numpy as np
+import tifffile
 
-from pathml.core import OpenSlideBackend, DICOMBackend, BioFormatsBackend, Tile
+from pathml.core import (
+    ArrayBackend,
+    OpenSlideBackend,
+    DICOMBackend,
+    BioFormatsBackend,
+    TiffFileBackend,
+    Tile,
+)
 
 
 def openslide_backend():
@@ -26,6 +39,14 @@ def dicom_backend():
     return DICOMBackend("tests/testdata/small_dicom.dcm")
 
 
+def tifffile_backend():
+    return TiffFileBackend("tests/testdata/small_vectra.qptiff")
+
+
+def tifffile_backend_svs():
+    return TiffFileBackend("tests/testdata/small_HE.svs")
+
+
 ## test each method for each backend
 
 
@@ -96,6 +117,31 @@ def test_tile_generator_with_level(backend, shape, tile_shape, pad, level):
     assert all([isinstance(tile, Tile) for tile in tiles])
 
 
+@pytest.mark.parametrize(
+    "backend", [openslide_backend(), dicom_backend(), tifffile_backend()]
+)
+@pytest.mark.parametrize("pad", [True, False])
+@pytest.mark.parametrize("stride", [None, 300])
+def test_generate_tile_coords(backend, pad, stride):
+    coords = backend.generate_tile_coords(shape=500, stride=stride, pad=pad)
+    tiles = list(backend.generate_tiles(shape=500, stride=stride, pad=pad))
+    assert coords.shape == (len(tiles), 2)
+    assert [tuple(c) for c in coords.tolist()] == [tile.coords for tile in tiles]
+
+
+@pytest.mark.parametrize(
+    "backend", [openslide_backend(), dicom_backend(), tifffile_backend()]
+)
+def test_tile_generator_with_coords(backend):
+    coords = np.array([[500, 0], [0, 250], [1000, 1000]])
+    tiles = list(backend.generate_tiles(shape=250, coords=coords))
+    assert [tile.coords for tile in tiles] == [(500, 0), (0, 250), (1000, 1000)]
+    for tile in tiles:
+        np.testing.assert_array_equal(
+            tile.image, backend.extract_region(location=tile.coords, size=(250, 250))
+        )
+
+
 @pytest.mark.parametrize(
     "backend,shape",
     [
@@ -103,6 +149,8 @@ def test_tile_generator_with_level(backend, shape, tile_shape, pad, level):
         (bioformats_backend(), (640, 480)),
         (bioformats_backend_qptiff(), (1920, 1440)),
         (dicom_backend(), (2638, 3236)),
+        (tifffile_backend(), (1440, 1920)),
+        (tifffile_backend_svs(), (2967, 2220)),
     ],
 )
 def test_get_image_shape(backend, shape):
@@ -126,6 +174,7 @@ def test_get_thumbnail(backend):
         bioformats_backend(),
         dicom_backend(),
         bioformats_backend_qptiff(),
+        tifffile_backend(),
     ],
 )
 def test_repr(backend):
@@ -142,3 +191,479 @@ def test_dicom_coords_index_conversion():
     for index, coords in check.items():
         assert backend._index_to_coords(index) == coords
         assert backend._coords_to_index(coords) == index
+
+
+@pytest.mark.parametrize("backend", [bioformats_backend(), bioformats_backend_qptiff()])
+@pytest.mark.parametrize("z", [None, 0, [0]])
+@pytest.mark.parametrize("c", [None, 0, [0]])
+@pytest.mark.parametrize("t", [None, 0])
+def test_extract_region_bioformats_dim_selection(backend, z, c, t):
+    region = backend.extract_region(location=(0, 0), size=50, z=z, c=c, t=t)
+    full_shape = backend.shape
+    for dim, selector in zip([2, 3, 4], [z, c, t]):
+        expected = full_shape[dim] if selector is None else 1
+        assert region.shape[dim] == expected
+    assert region.dtype == np.uint8
+
+
+def test_extract_region_bioformats_dim_selection_invalid():
+    backend = bioformats_backend_qptiff()
+    with pytest.raises(ValueError):
+        backend.extract_region(location=(0, 0), size=50, c=backend.shape[3])
+
+
+@pytest.mark.parametrize("backend", [bioformats_backend(), bioformats_backend_qptiff()])
+def test_bioformats_levels(backend):
+    assert backend.level_count >= 1
+    assert backend.get_image_shape(level=0) == backend.get_image_shape()
+    smallest = backend.level_count - 1
+    region = backend.extract_region(location=(0, 0), size=10, level=smallest)
+    assert region.shape[:2] == (10, 10)
+    with pytest.raises(ValueError):
+        backend.get_image_shape(level=backend.level_count)
+
+
+def test_bioformats_levels_single_channel(tmp_path):
+    # single channel pyramid, whose levels are read from the series of each level
+    path = str(tmp_path / "pyramid.ome.tif")
+    image = np.random.randint(0, 255, size=(256, 384), dtype=np.uint8)
+    with tifffile.TiffWriter(path) as tif:
+        tif.write(image, subifds=1, metadata={"axes": "YX"})
+        tif.write(image[::2, ::2], subfiletype=1)
+    backend = BioFormatsBackend(path)
+    assert backend.level_count == 2
+    assert backend.get_image_shape(level=1) == (192, 128)
+    region = backend.extract_region(location=(0, 0), size=(192, 128), level=1)
+    np.testing.assert_array_equal(region[:, :, 0, 0, 0], image[::2, ::2].T)
+
+
+@pytest.mark.parametrize("backend", [tifffile_backend(), tifffile_backend_svs()])
+@pytest.mark.parametrize("location", [(0, 0), (50, 100)])
+@pytest.mark.parametrize("size", [50, (50, 100)])
+@pytest.mark.parametrize("level", [None, 0])
+def test_extract_region_tifffile(backend, location, size, level):
+    region = backend.extract_region(location=location, size=size, level=level)
+    size = (size, size) if isinstance(size, int) else size
+    assert isinstance(region, np.ndarray)
+    assert region.shape == size + backend.shape[2:]
+    assert region.dtype == np.uint8
+
+
+def test_extract_region_tifffile_matches_full_image():
+    import tifffile
+
+    backend = tifffile_backend_svs()
+    full = tifffile.imread("tests/testdata/small_HE.svs")
+    # region straddles several internal TIFF tiles
+    region = backend.extract_region(location=(230, 470), size=(300, 250))
+    np.testing.assert_array_equal(region[:, :, 0, :, 0], full[230:530, 470:720])
+
+
+def test_extract_region_tifffile_pads_edges():
+    backend = tifffile_backend()
+    i, j = backend.get_image_shape()
+    region = backend.extract_region(location=(i - 10, j - 10), size=20, c=[0, 2])
+    assert region.shape == (20, 20, 1, 2, 1)
+    assert np.all(region[10:, 10:] == 0)
+
+
+@pytest.mark.parametrize("pad", [True, False])
+def test_tile_generator_tifffile(pad):
+    backend = tifffile_backend()
+    shape = backend.get_image_shape()
+    tiles = list(backend.generate_tiles(shape=500, stride=500, pad=pad))
+    if not pad:
+        assert len(tiles) == np.prod([s // 500 for s in shape])
+    else:
+        assert len(tiles) == np.prod([1 + (s // 500) for s in shape])
+    assert all([tile.image.shape[:2] == (500, 500) for tile in tiles])
+
+
+def test_get_thumbnail_tifffile():
+    thumbnail = tifffile_backend_svs().get_thumbnail(size=(500, 500))
+    assert thumbnail.ndim == 3
+    assert max(thumbnail.shape[:2]) <= 500
+
+
+def test_tifffile_close():
+    backend = tifffile_backend()
+    region = backend.extract_region(location=(0, 0), size=50)
+    tif = backend._tif
+    backend.close()
+    assert tif.filehandle.closed
+    # closing twice does nothing, and the file is reopened on next use
+    backend.close()
+    assert backend.__dict__.get("_unopened")
+    np.testing.assert_array_equal(
+        backend.extract_region(location=(0, 0), size=50), region
+    )
+    assert not backend._tif.filehandle.closed
+
+
+@pytest.mark.parametrize("frame_cache_size", [0, 4, 64])
+@pytest.mark.parametrize("decode_threads", [1, 4])
+def test_dicom_frame_cache_and_threads(frame_cache_size, decode_threads):
+    reference = DICOMBackend(
+        "tests/testdata/small_dicom.dcm", frame_cache_size=0, decode_threads=1
+    )
+    backend = DICOMBackend(
+        "tests/testdata/small_dicom.dcm",
+        frame_cache_size=frame_cache_size,
+        decode_threads=decode_threads,
+    )
+    expected = list(reference.generate_tiles(shape=500, stride=None, pad=True))
+    tiles = list(backend.generate_tiles(shape=500, stride=None, pad=True))
+    assert [t.coords for t in tiles] == [t.coords for t in expected]
+    for tile, expected_tile in zip(tiles, expected):
+        np.testing.assert_array_equal(tile.image, expected_tile.image)
+    assert len(backend._frame_cache) == min(frame_cache_size, backend.n_frames)
+    # cached frames are reused, not decoded again
+    if frame_cache_size:
+        last = backend.n_frames - 1
+        assert backend._read_frame(last) is backend._read_frame(last)
+
+
+def test_dicom_extract_region_across_frames():
+    backend = dicom_backend()
+    # stitch a 2x2 block of frames manually, to compare against
+    block = np.concatenate(
+        [
+            np.concatenate([backend.extract_region(location=ix) for ix in row], axis=1)
+            for row in [(0, 1), (backend.n_cols, backend.n_cols + 1)]
+        ],
+        axis=0,
+    )
+    region = backend.extract_region(location=(123, 456), size=(700, 300))
+    assert region.shape == (700, 300, 3)
+    np.testing.assert_array_equal(region, block[123:823, 456:756])
+
+
+def test_dicom_extract_region_pads_edges():
+    backend = dicom_backend()
+    i, j = backend.get_image_shape()
+    region = backend.extract_region(location=(i - 10, j - 10), size=50)
+    assert region.shape == (50, 50, 3)
+    assert np.all(region[10:, :] == 0)
+    assert np.all(region[:, 10:] == 0)
+
+
+@pytest.mark.parametrize("pad", [True, False])
+@pytest.mark.parametrize("tile_shape,stride", [(256, 256), (256, 200), (600, 500)])
+def test_dicom_tile_generator_shape_stride(tile_shape, stride, pad):
+    backend = dicom_backend()
+    i, j = backend.get_image_shape()
+    tiles = list(backend.generate_tiles(shape=tile_shape, stride=stride, pad=pad))
+    if pad:
+        n_expected = (i // stride + 1) * (j // stride + 1)
+    else:
+        n_expected = ((i - tile_shape) // stride + 1) * ((j - tile_shape) // stride + 1)
+    assert len(tiles) == n_expected
+    assert all([tile.image.shape == (tile_shape, tile_shape, 3) for tile in tiles])
+
+
+def _write_downsampled_dicom_instance(path, factor):
+    """Write a lower resolution copy of the test DICOM image, as another instance of the same series"""
+    from io import BytesIO
+    import pydicom
+    from pydicom.encaps import encapsulate
+    from PIL import Image
+
+    backend = dicom_backend()
+    full = backend.extract_region(location=(0, 0), size=backend.get_image_shape())
+    small = full[::factor, ::factor]
+    frame_i, frame_j = backend.frame_shape
+    n_rows = -(-small.shape[0] // frame_i)
+    n_cols = -(-small.shape[1] // frame_j)
+    frames = []
+    for row in range(n_rows):
+        for col in range(n_cols):
+            frame = np.zeros((frame_i, frame_j, 3), dtype=np.uint8)
+            crop = small[
+                row * frame_i : (row + 1) * frame_i, col * frame_j : (col + 1) * frame_j
+            ]
+            frame[: crop.shape[0], : crop.shape[1]] = crop
+            buf = BytesIO()
+            Image.fromarray(frame).save(buf, format="JPEG")
+            frames.append(buf.getvalue())
+    ds = pydicom.dcmread("tests/testdata/small_dicom.dcm")
+    ds.PixelData = encapsulate(frames, has_bot=True)
+    ds.NumberOfFrames = len(frames)
+    ds.TotalPixelMatrixRows, ds.TotalPixelMatrixColumns = small.shape[:2]
+    ds.save_as(path)
+    return small.shape[:2]
+
+
+@pytest.fixture
+def dicom_series_dir(tmp_path):
+    import shutil
+
+    shutil.copy("tests/testdata/small_dicom.dcm", tmp_path / "level0.dcm")
+    shape = _write_downsampled_dicom_instance(str(tmp_path / "level1.dcm"), factor=4)
+    # non-DICOM files in the directory are ignored
+    (tmp_path / "notes.txt").write_text("not a dicom file")
+    return tmp_path, shape
+
+
+def test_dicom_series_levels(dicom_series_dir):
+    path, low_res_shape = dicom_series_dir
+    backend = DICOMBackend(str(path))
+    assert backend.level_count == 2
+    assert backend.get_image_shape(level=0) == (2638, 3236)
+    assert backend.get_image_shape(level=1) == low_res_shape
+    region = backend.extract_region(location=(100, 100), size=200, level=1)
+    assert region.shape == (200, 200, 3)
+    tiles = list(backend.generate_tiles(shape=250, stride=250, pad=False, level=1))
+    assert len(tiles) == np.prod([s // 250 for s in low_res_shape])
+    thumbnail = backend.get_thumbnail(size=(300, 300))
+    assert thumbnail.ndim == 3 and max(thumbnail.shape[:2]) <= 300
+    with pytest.raises(ValueError):
+        backend.extract_region(location=(0, 0), size=10, level=2)
+
+
+def test_dicom_series_from_list(dicom_series_dir):
+    path, _ = dicom_series_dir
+    backend = DICOMBackend([str(path / "level1.dcm"), str(path / "level0.dcm")])
+    # instances are sorted so that level 0 is the highest resolution
+    assert backend.level_count == 2
+    assert backend.filename == str(path / "level0.dcm")
+
+
+def test_dicom_close(dicom_series_dir):
+    import os
+
+    path, _ = dicom_series_dir
+    backend = DICOMBackend(str(path), decode_threads=2)
+    region = backend.extract_region(location=(0, 0), size=600, level=1)
+    levels = backend._levels
+    fds = [level._fd for level in levels]
+    executor = levels[1]._executor
+    assert executor is not None
+    backend.close()
+    for fd in fds:
+        with pytest.raises(OSError):
+            os.fstat(fd)
+    assert executor._shutdown
+    assert all([level.__dict__.get("_unopened") for level in levels])
+    # closing twice does nothing, and the files are reopened on next use
+    backend.close()
+    np.testing.assert_array_equal(
+        backend.extract_region(location=(0, 0), size=600, level=1), region
+    )
+
+
+def test_slide_data_dicom_series_directory(dicom_series_dir):
+    from pathml.core import SlideData
+
+    path, _ = dicom_series_dir
+    wsi = SlideData(str(path))
+    assert wsi.backend == "dicom"
+    assert wsi.slide.level_count == 2
+
+
+def _write_uncompressed_dicom(path, implicit_vr=False):
+    """Write a copy of the test DICOM image with uncompressed pixel data"""
+    import pydicom
+    from pydicom.uid import ExplicitVRLittleEndian, ImplicitVRLittleEndian
+
+    compressed = dicom_backend()
+    frames = [compressed.extract_region(location=i) for i in range(compressed.n_frames)]
+    ds = pydicom.dcmread("tests/testdata/small_dicom.dcm")
+    ds.file_meta.TransferSyntaxUID = (
+        ImplicitVRLittleEndian if implicit_vr else ExplicitVRLittleEndian
+    )
+    ds.is_implicit_VR = implicit_vr
+    ds.is_little_endian = True
+    ds.PixelData = b"".join([frame.tobytes() for frame in frames])
+    ds["PixelData"].VR = "OB"
+    ds.PhotometricInterpretation = "RGB"
+    ds.PlanarConfiguration = 0
+    ds.save_as(path)
+    return compressed, frames
+
+
+@pytest.mark.parametrize("implicit_vr", [True, False])
+def test_dicom_uncompressed_zero_copy(tmp_path, implicit_vr):
+    compressed, frames = _write_uncompressed_dicom(
+        str(tmp_path / "native.dcm"), implicit_vr
+    )
+    backend = DICOMBackend(str(tmp_path / "native.dcm"))
+    # frames are read-only views into the memory-mapped file
+    view = backend._read_frame(13)
+    assert not view.flags.writeable
+    assert not view.flags.owndata
+    frame = backend.extract_region(location=13)
+    np.testing.assert_array_equal(frame, frames[13])
+    np.testing.assert_array_equal(
+        backend.extract_region(location=(123, 456), size=(700, 300)),
+        compressed.extract_region(location=(123, 456), size=(700, 300)),
+    )
+
+
+@pytest.mark.parametrize("native", [True, False])
+def test_dicom_tiles_writable(tmp_path, native):
+    from pathml.core import SlideData
+    from pathml.preprocessing import Pipeline
+    from pathml.preprocessing.transforms import Transform
+
+    class Invert(Transform):
+        def apply(self, tile):
+            np.subtract(255, tile.image, out=tile.image)
+
+    path = "tests/testdata/small_dicom.dcm"
+    if native:
+        path = str(tmp_path / "native.dcm")
+        _write_uncompressed_dicom(path)
+    backend = DICOMBackend(path)
+    expected = 255 - backend.extract_region(location=0)
+    # frames are shared with the frame cache or the memory-mapped file, but tiles get their own copy
+    for tile in backend.generate_tiles(coords=np.array([[0, 0], [0, 0]])):
+        Invert().apply(tile)
+        np.testing.assert_array_equal(tile.image, expected)
+    region = backend.extract_region(location=(0, 0), size=backend.frame_shape)
+    region[:] = 0
+    np.testing.assert_array_equal(backend.extract_region(location=0), 255 - expected)
+
+    wsi = SlideData(path, backend="dicom")
+    wsi.run(Pipeline([Invert()]), distributed=False, tile_size=backend.frame_shape)
+    np.testing.assert_array_equal(wsi.tiles[(0, 0)].image, expected)
+
+
+@pytest.mark.parametrize(
+    "backend", [openslide_backend(), dicom_backend(), tifffile_backend()]
+)
+def test_backend_pickle_roundtrip(backend):
+    region = backend.extract_region(location=(0, 0), size=(50, 50))
+    unpickled = pickle.loads(pickle.dumps(backend))
+    # slide is only reopened on first use
+    assert unpickled.__dict__.get("_unopened")
+    np.testing.assert_array_equal(
+        unpickled.extract_region(location=(0, 0), size=(50, 50)), region
+    )
+    assert not unpickled.__dict__.get("_unopened")
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [openslide_backend(), bioformats_backend(), dicom_backend(), tifffile_backend()],
+)
+def test_aextract_region(backend):
+    async def read():
+        return await asyncio.gather(
+            backend.aextract_region(location=(0, 0), size=(50, 50)),
+            backend.aextract_region(location=(100, 50), size=(50, 50)),
+        )
+
+    regions = asyncio.run(read())
+    np.testing.assert_array_equal(
+        regions[0], backend.extract_region(location=(0, 0), size=(50, 50))
+    )
+    np.testing.assert_array_equal(
+        regions[1], backend.extract_region(location=(100, 50), size=(50, 50))
+    )
+
+
+@pytest.mark.parametrize(
+    "backend", [openslide_backend(), dicom_backend(), tifffile_backend()]
+)
+def test_agenerate_tiles(backend):
+    async def read():
+        return [tile async for tile in backend.agenerate_tiles(shape=500, pad=True)]
+
+    tiles = asyncio.run(read())
+    expected = list(backend.generate_tiles(shape=500, pad=True))
+    assert [tile.coords for tile in tiles] == [tile.coords for tile in expected]
+    for tile, expected_tile in zip(tiles, expected):
+        np.testing.assert_array_equal(tile.image, expected_tile.image)
+
+
+def test_aextract_region_coalesces_and_limits_concurrency(monkeypatch):
+    backend = openslide_backend()
+    backend.async_concurrency = 2
+    extract_region = backend.extract_region
+    lock = threading.Lock()
+    calls = []
+    running = [0, 0]
+
+    def slow_extract_region(**kwargs):
+        with lock:
+            calls.append(kwargs["location"])
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return extract_region(**kwargs)
+
+    monkeypatch.setattr(backend, "extract_region", slow_extract_region)
+
+    async def read():
+        return await asyncio.gather(
+            *[
+                backend.aextract_region(location=(i, 0), size=(50, 50))
+                for i in [0, 0, 0, 10, 20, 30]
+            ]
+        )
+
+    regions = asyncio.run(read())
+    # identical concurrent requests share a single read
+    assert sorted(calls) == [(0, 0), (10, 0), (20, 0), (30, 0)]
+    assert regions[0] is regions[1] is regions[2]
+    # no more than async_concurrency reads at once
+    assert running[1] == 2
+
+
+def test_array_backend_extract_region():
+    image = np.random.default_rng(0).integers(255, size=(300, 200, 3), dtype=np.uint8)
+    backend = ArrayBackend([image, image[::4, ::4]])
+    assert backend.level_count == 2
+    assert backend.get_image_shape() == (300, 200)
+    assert backend.get_image_shape(level=1) == (75, 50)
+    np.testing.assert_array_equal(
+        backend.extract_region(location=(10, 20), size=(50, 60)), image[10:60, 20:80]
+    )
+    np.testing.assert_array_equal(
+        backend.extract_region(location=(0, 0), size=(75, 50), level=1),
+        image[::4, ::4],
+    )
+    # regions extending beyond the image are zero-padded
+    region = backend.extract_region(location=(280, 150), size=100)
+    np.testing.assert_array_equal(region[:20, :50], image[280:, 150:])
+    assert not region[20:].any() and not region[:, 50:].any()
+    with pytest.raises(ValueError):
+        backend.extract_region(location=(0, 0), size=10, level=2)
+
+
+@pytest.mark.parametrize("pad", [True, False])
+def test_array_backend_tile_generator(pad):
+    image = np.random.default_rng(0).integers(
+        2**16, size=(300, 200, 1, 4, 1), dtype=np.uint16
+    )
+    backend = ArrayBackend(image)
+    tiles = list(backend.generate_tiles(shape=128, pad=pad))
+    assert len(tiles) == (6 if pad else 2)
+    for tile in tiles:
+        assert tile.image.shape == (128, 128, 1, 4, 1)
+    i, j = tiles[-1].coords
+    np.testing.assert_array_equal(tiles[0].image, image[:128, :128])
+    np.testing.assert_array_equal(
+        tiles[-1].image[: 300 - i, : 200 - j], image[i : i + 128, j : j + 128]
+    )
+    thumbnail = backend.get_thumbnail(size=(100, 100))
+    assert thumbnail.shape[0] <= 100 and thumbnail.shape[1] <= 100
+
+
+def test_array_backend_pickle_memmap(tmp_path):
+    image = np.random.default_rng(0).integers(255, size=(500, 500, 3), dtype=np.uint8)
+    np.save(tmp_path / "image.npy", image)
+    backend = ArrayBackend(np.load(tmp_path / "image.npy", mmap_mode="r"))
+    pickled = pickle.dumps(backend)
+    # memory-mapped arrays are pickled as a reference to their file
+    assert len(pickled) < image.nbytes // 10
+    unpickled = pickle.loads(pickled)
+    np.testing.assert_array_equal(
+        unpickled.extract_region(location=(100, 100), size=50),
+        image[100:150, 100:150],
+    )
+    # arrays in memory are pickled with their contents
+    unpickled = pickle.loads(pickle.dumps(ArrayBackend(image)))
+    np.testing.assert_array_equal(unpickled.extract_region((0, 0), 500), image)
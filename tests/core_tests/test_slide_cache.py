@@ -0,0 +1,95 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import os
+import shutil
+
+import pytest
+import numpy as np
+
+import pathml.core.slide_cache
+from pathml.core import (
+    OpenSlideBackend,
+    BioFormatsBackend,
+    DICOMBackend,
+    SlideCache,
+    SlideData,
+    enable_slide_cache,
+    disable_slide_cache,
+)
+
+
+@pytest.fixture
+def slide_cache(tmp_path):
+    cache = enable_slide_cache(tmp_path / "cache")
+    yield cache
+    disable_slide_cache()
+
+
+def test_cache_arrays_and_metadata(tmp_path):
+    cache = SlideCache(tmp_path / "cache")
+    path = "tests/testdata/small_HE.svs"
+    assert cache.get_array(path, "thumbnail") is None
+    assert cache.get_metadata(path, "header") is None
+    array = np.random.randint(255, size=(20, 30, 3), dtype=np.uint8)
+    cache.put_array(path, "thumbnail", array)
+    cache.put_metadata(path, "header", {"shape": [2, 3]})
+    np.testing.assert_array_equal(cache.get_array(path, "thumbnail"), array)
+    assert cache.get_metadata(path, "header") == {"shape": [2, 3]}
+
+
+def test_cache_invalidated_when_file_changes(tmp_path):
+    cache = SlideCache(tmp_path / "cache")
+    path = tmp_path / "small_HE.svs"
+    shutil.copy("tests/testdata/small_HE.svs", path)
+    fingerprint = cache.fingerprint(path)
+    cache.put_metadata(path, "header", {"shape": [2, 3]})
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.fingerprint(path) != fingerprint
+    assert cache.get_metadata(path, "header") is None
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [
+        lambda: OpenSlideBackend("tests/testdata/small_HE.svs"),
+        lambda: DICOMBackend("tests/testdata/small_dicom.dcm"),
+    ],
+)
+def test_thumbnail_cached(slide_cache, backend, monkeypatch):
+    thumbnail = backend().get_thumbnail(size=(100, 100))
+    # cached thumbnails are returned without reading from the slide
+    slide = backend()
+    monkeypatch.setattr(slide, "extract_region", None)
+    if isinstance(slide, OpenSlideBackend):
+        monkeypatch.setattr(slide.slide, "get_thumbnail", None)
+    np.testing.assert_array_equal(slide.get_thumbnail(size=(100, 100)), thumbnail)
+
+
+def test_bioformats_header_cached(slide_cache, monkeypatch):
+    slide = BioFormatsBackend("tests/testdata/smalltif.tif")
+
+    def fail():
+        raise AssertionError("header should be read from cache")
+
+    monkeypatch.setattr(BioFormatsBackend, "_read_header", fail)
+    cached_slide = BioFormatsBackend("tests/testdata/smalltif.tif")
+    assert cached_slide.shape == slide.shape
+    assert cached_slide.level_count == slide.level_count
+    assert cached_slide.get_image_shape() == slide.get_image_shape()
+    assert cached_slide.metadata == slide.metadata
+
+
+def test_slide_cache_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHML_SLIDE_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(pathml.core.slide_cache, "_slide_cache", None)
+    monkeypatch.setattr(pathml.core.slide_cache, "_slide_cache_from_env", False)
+    cache = pathml.core.slide_cache.get_slide_cache()
+    assert cache.cache_dir == tmp_path / "cache"
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    wsi.slide.get_thumbnail(size=(100, 100))
+    assert len(list((tmp_path / "cache").rglob("*.npy"))) == 1
+    disable_slide_cache()
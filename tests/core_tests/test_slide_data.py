@@ -3,23 +3,32 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import threading
+import time
 from pathlib import Path
 import pytest
 from dask.distributed import Client
 import numpy as np
 import h5py
+import tifffile
 
 import pathml
 from pathml.core import (
     SlideData,
     HESlide,
     MultiparametricSlide,
+    VectraSlide,
+    CODEXSlide,
     OpenSlideBackend,
     BioFormatsBackend,
     Tile,
+    RunStats,
 )
-from pathml.core.slide_data import get_file_ext
-from pathml.preprocessing import Pipeline, BoxBlur
+from pathml.core.shared_tiles import SharedTiles
+from pathml.core.slide_backends import OpenSlideBackend
+from pathml.core.slide_data import _BatchSizer, _TileWriter, get_file_ext
+from pathml.preprocessing import Pipeline, BoxBlur, TissueDetectionHE
+from pathml.preprocessing.transforms import Transform
 
 
 @pytest.mark.parametrize("slide", [SlideData, HESlide, MultiparametricSlide])
@@ -43,6 +52,33 @@ def test_get_file_ext(path, ext):
     assert result == ext
 
 
+@pytest.mark.parametrize(
+    "path,backend",
+    [
+        ("tests/testdata/small_HE.svs", "openslide"),
+        ("tests/testdata/small_vectra.qptiff", "tifffile"),
+        ("tests/testdata/small_dicom.dcm", "dicom"),
+    ],
+)
+def test_infer_backend(path, backend):
+    wsi = SlideData(path)
+    assert wsi.backend == backend
+
+
+@pytest.mark.parametrize("slide", [MultiparametricSlide, VectraSlide, CODEXSlide])
+def test_multiparametric_default_backend(slide):
+    assert slide("tests/testdata/small_vectra.qptiff").backend == "tifffile"
+
+
+def test_run_closes_backend():
+    wsi = VectraSlide("tests/testdata/small_vectra.qptiff")
+    tif = wsi.slide._tif
+    wsi.run(Pipeline([]), distributed=False, tile_size=500)
+    assert tif.filehandle.closed
+    # the slide is reopened if it is used again
+    assert wsi.slide.extract_region(location=(0, 0), size=50).shape[:2] == (50, 50)
+
+
 def test_write_with_array_labels(tmp_path, example_slide_data):
     example_slide_data.write(tmp_path / "test_array_in_labels.h5path")
     assert Path(tmp_path / "test_array_in_labels.h5path").is_file()
@@ -58,6 +94,486 @@ def test_run_pipeline(example_slide_data):
     client.close()
 
 
+def test_run_pipeline_read_on_workers():
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    slides = [
+        SlideData(
+            "tests/testdata/small_HE.svs",
+            backend="openslide",
+            labels={"test_label": 3},
+        )
+        for _ in range(2)
+    ]
+    client = Client()
+    slides[0].run(pipeline=pipeline, client=client, tile_size=500)
+    slides[1].run(pipeline=pipeline, client=client, tile_size=500, read_on_workers=True)
+    client.close()
+    assert slides[0].tiles.keys == slides[1].tiles.keys
+    np.testing.assert_array_equal(
+        slides[0].tiles.h5manager.h5["array"][:],
+        slides[1].tiles.h5manager.h5["array"][:],
+    )
+
+
+class ConcurrencyProbe(Transform):
+    """Transform which records the maximum number of tiles being processed at the same time"""
+
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def apply(self, tile):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.running -= 1
+
+
+@pytest.mark.parametrize("read_on_workers", [False, True])
+def test_run_pipeline_max_in_flight(read_on_workers):
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    ConcurrencyProbe.max_running = 0
+    client = Client(processes=False, n_workers=1, threads_per_worker=4)
+    wsi.run(
+        pipeline=Pipeline([ConcurrencyProbe()]),
+        client=client,
+        tile_size=500,
+        read_on_workers=read_on_workers,
+        max_in_flight=2,
+    )
+    client.close()
+    assert len(wsi.tiles) == len(wsi.plan_tiles(shape=500))
+    # with 4 worker threads, no more than max_in_flight tiles are processed at once
+    assert 1 <= ConcurrencyProbe.max_running <= 2
+
+
+@pytest.mark.parametrize("read_on_workers", [False, True])
+@pytest.mark.parametrize("batch_size", [3, "auto"])
+def test_run_pipeline_batch_size(read_on_workers, batch_size):
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    slides = [
+        SlideData("tests/testdata/small_HE.svs", backend="openslide") for _ in range(2)
+    ]
+    client = Client(processes=False, n_workers=1, threads_per_worker=2)
+    slides[0].run(pipeline=pipeline, client=client, tile_size=200, tile_pad=True)
+    slides[1].run(
+        pipeline=pipeline,
+        client=client,
+        tile_size=200,
+        tile_pad=True,
+        read_on_workers=read_on_workers,
+        batch_size=batch_size,
+    )
+    client.close()
+    assert sorted(slides[0].tiles.keys) == sorted(slides[1].tiles.keys)
+    np.testing.assert_array_equal(
+        slides[0].tiles.h5manager.h5["array"][:],
+        slides[1].tiles.h5manager.h5["array"][:],
+    )
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+@pytest.mark.parametrize("batch_size", [1, "auto"])
+def test_run_pipeline_local_executor(executor, batch_size):
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    slides = [
+        SlideData("tests/testdata/small_HE.svs", backend="openslide") for _ in range(2)
+    ]
+    slides[0].run(pipeline=pipeline, distributed=False, tile_size=200)
+    slides[1].run(
+        pipeline=pipeline,
+        tile_size=200,
+        executor=executor,
+        n_workers=2,
+        batch_size=batch_size,
+    )
+    # tiles are written in order
+    assert slides[0].tiles.keys == slides[1].tiles.keys
+    np.testing.assert_array_equal(
+        slides[0].tiles.h5manager.h5["array"][:],
+        slides[1].tiles.h5manager.h5["array"][:],
+    )
+
+
+@pytest.mark.parametrize(
+    "executor,read_on_workers",
+    [("process", False), ("dask", False), ("dask", True)],
+)
+def test_run_pipeline_shared_memory(executor, read_on_workers):
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    slides = [
+        SlideData("tests/testdata/small_HE.svs", backend="openslide") for _ in range(2)
+    ]
+    slides[0].run(pipeline=pipeline, distributed=False, tile_size=200)
+    client = Client(n_workers=2, threads_per_worker=1) if executor == "dask" else None
+    slides[1].run(
+        pipeline=pipeline,
+        tile_size=200,
+        executor=executor,
+        client=client,
+        n_workers=2,
+        read_on_workers=read_on_workers,
+        batch_size=4,
+        shared_memory=True,
+    )
+    if client is not None:
+        client.close()
+    assert sorted(slides[0].tiles.keys) == sorted(slides[1].tiles.keys)
+    np.testing.assert_array_equal(
+        slides[0].tiles.h5manager.h5["array"][:],
+        slides[1].tiles.h5manager.h5["array"][:],
+    )
+
+
+def test_run_thread_executor_reads_in_backend_thread(monkeypatch):
+    calls = []
+    run_in_thread = OpenSlideBackend._run_in_thread
+
+    def recording_run_in_thread(self, func, **kwargs):
+        calls.append(threading.current_thread())
+        return run_in_thread(self, func, **kwargs)
+
+    monkeypatch.setattr(OpenSlideBackend, "_run_in_thread", recording_run_in_thread)
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    wsi.run(
+        pipeline=Pipeline([BoxBlur(kernel_size=15)]),
+        tile_size=200,
+        executor="thread",
+        n_workers=2,
+        batch_size=4,
+    )
+    assert calls
+    assert threading.main_thread() not in calls
+
+
+@pytest.mark.parametrize("shared_memory", [None, False])
+def test_run_process_executor_shared_memory_default(monkeypatch, shared_memory):
+    loads = []
+    load = SharedTiles.load
+
+    def recording_load(self):
+        loads.append(self.name)
+        return load(self)
+
+    monkeypatch.setattr(SharedTiles, "load", recording_load)
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    wsi.run(
+        pipeline=Pipeline([BoxBlur(kernel_size=15)]),
+        tile_size=200,
+        executor="process",
+        n_workers=2,
+        batch_size=4,
+        shared_memory=shared_memory,
+    )
+    assert len(wsi.tiles) > 0
+    # processed tiles are received in shared memory unless disabled
+    assert bool(loads) == (shared_memory is None)
+
+
+def test_batch_sizer():
+    assert _BatchSizer(4).size == 4
+    sizer = _BatchSizer("auto", target_seconds=0.2, max_batch_size=100)
+    assert sizer.size == 1
+    sizer.record(n_tiles=2, seconds=0.02)
+    assert sizer.size == 20
+    sizer.record(n_tiles=1000, seconds=0.001)
+    assert sizer.size == 100
+    with pytest.raises(AssertionError):
+        _BatchSizer(0)
+
+
+@pytest.mark.parametrize("executor", [None, "thread"])
+def test_run_stats(executor):
+    slide = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    stats = slide.run(
+        pipeline=Pipeline([BoxBlur(kernel_size=15)]),
+        distributed=False,
+        tile_size=200,
+        executor=executor,
+        batch_size=4,
+    )
+    assert isinstance(stats, RunStats)
+    assert stats.n_tiles == len(slide.tiles)
+    assert stats.n_batches == (
+        len(slide.tiles) if executor is None else -(-len(slide.tiles) // 4)
+    )
+    assert stats.write_seconds > 0
+    assert 0 < stats.max_queue_depth <= 16
+    assert stats.seconds >= stats.queue_wait_seconds
+    assert stats.asdict()["n_tiles"] == stats.n_tiles
+
+
+@pytest.mark.parametrize(
+    "executor,read_on_workers",
+    [(None, False), ("process", False), ("dask", False), ("dask", True)],
+)
+def test_run_profile(executor, read_on_workers):
+    slide = HESlide("tests/testdata/small_HE.svs", backend="openslide")
+    pipeline = Pipeline(
+        [BoxBlur(kernel_size=15), TissueDetectionHE(mask_name="tissue")]
+    )
+    client = Client(n_workers=2, threads_per_worker=1) if executor == "dask" else None
+    stats = slide.run(
+        pipeline=pipeline,
+        distributed=False,
+        client=client,
+        tile_size=200,
+        executor=executor,
+        n_workers=2,
+        read_on_workers=read_on_workers,
+        profile=True,
+    )
+    if client is not None:
+        client.close()
+    # one measurement for each transform on each tile, gathered from all workers
+    assert len(stats.profile) == 2 * len(slide.tiles)
+    summary = stats.profile.summary()
+    assert list(summary.index.get_level_values("transform")) == [
+        "BoxBlur",
+        "TissueDetectionHE",
+    ]
+    assert (summary.n_tiles == len(slide.tiles)).all()
+    assert (summary.wall_seconds > 0).all()
+    assert all(event["peak_bytes"] is not None for event in stats.profile.events)
+    assert "tissue" in slide.masks.keys
+
+
+def test_run_profile_thread_executor():
+    slide = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    # the peak memory of transforms on several threads of a process cannot be told apart
+    with pytest.warns(UserWarning, match="Memory is not profiled"):
+        stats = slide.run(
+            pipeline=Pipeline([BoxBlur(kernel_size=15)]),
+            tile_size=200,
+            executor="thread",
+            n_workers=2,
+            profile=True,
+        )
+    assert len(stats.profile) == len(slide.tiles)
+    assert all(event["peak_bytes"] is None for event in stats.profile.events)
+    assert all(event["wall_seconds"] > 0 for event in stats.profile.events)
+
+
+def test_run_no_profile():
+    slide = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    stats = slide.run(
+        pipeline=Pipeline([BoxBlur(kernel_size=15)]), distributed=False, tile_size=200
+    )
+    assert stats.profile is None
+
+
+class FailingSlide:
+    def _add_processed_tiles(self, tiles, checkpoint=None):
+        raise RuntimeError("failed to write tiles")
+
+
+def test_tile_writer_error():
+    stats = RunStats()
+    with pytest.raises(RuntimeError, match="failed to write tiles"):
+        with _TileWriter(stats) as writer:
+            writer.put(FailingSlide(), [])
+    assert stats.n_batches == 0
+
+
+def test_plan_tiles(he_slide):
+    coords = he_slide.plan_tiles(shape=500, pad=True)
+    assert [tuple(c) for c in coords.tolist()] == [
+        tile.coords for tile in he_slide.generate_tiles(shape=500, pad=True)
+    ]
+
+
+@pytest.mark.parametrize("downsample", [1, 10])
+def test_plan_tiles_mask(he_slide, downsample):
+    # mask covering the left half of the slide, at full or reduced resolution
+    mask = np.zeros((2967 // downsample, 2220 // downsample), dtype=np.uint8)
+    mask[:, : 1000 // downsample] = 1
+    coords = he_slide.plan_tiles(shape=500, mask=mask, min_coverage=0.5)
+    # tiles at j=0 are fully covered, tiles at j=500 are half covered
+    assert set(coords[:, 1]) == {0, 500}
+    coords = he_slide.plan_tiles(shape=500, mask=mask, min_coverage=1.0)
+    assert set(coords[:, 1]) == {0, 500}
+    coords = he_slide.plan_tiles(shape=500, stride=250, mask=mask, min_coverage=1.0)
+    assert set(coords[:, 1]) == {0, 250, 500}
+    coords = he_slide.plan_tiles(shape=500, stride=250, mask=mask, min_coverage=0.5)
+    assert set(coords[:, 1]) == {0, 250, 500, 750}
+
+
+def test_plan_tiles_mask_key():
+    mask = np.zeros((2967, 2220), dtype=np.uint8)
+    mask[:1000, :] = 1
+    wsi = HESlide(
+        "tests/testdata/small_HE.svs", backend="openslide", masks={"tissue": mask}
+    )
+    coords = wsi.plan_tiles(shape=500, mask="tissue", min_coverage=0.9)
+    assert set(coords[:, 0]) == {0, 500}
+
+
+def test_plan_tiles_roi(he_slide):
+    roi = np.array([[0, 0], [0, 1100], [1100, 1100], [1100, 0]])
+    coords = he_slide.plan_tiles(shape=500, roi=roi)
+    assert coords.tolist() == [[0, 0], [0, 500], [500, 0], [500, 500]]
+
+
+def test_plan_tiles_subsample(he_slide):
+    all_coords = he_slide.plan_tiles(shape=100)
+    coords = he_slide.plan_tiles(shape=100, n_tiles=10, random_state=0)
+    assert coords.shape == (10, 2)
+    assert len({tuple(c) for c in coords.tolist()}) == 10
+    assert {tuple(c) for c in coords.tolist()} <= {
+        tuple(c) for c in all_coords.tolist()
+    }
+    np.testing.assert_array_equal(
+        coords, he_slide.plan_tiles(shape=100, n_tiles=10, random_state=0)
+    )
+
+
+def test_run_pipeline_with_plan(he_slide):
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    coords = he_slide.plan_tiles(shape=500, n_tiles=5, random_state=0)
+    he_slide.run(pipeline, distributed=False, tile_size=500, tile_coords=coords)
+    assert sorted(he_slide.tiles.keys) == sorted(str(tuple(c)) for c in coords.tolist())
+
+
+class CountTiles(Transform):
+    """Transform which counts the tiles it is applied to, and fails after a given number of tiles"""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.count = 0
+
+    def apply(self, tile):
+        if self.fail_after is not None and self.count == self.fail_after:
+            raise RuntimeError("interrupted")
+        self.count += 1
+
+
+def test_run_checkpoint_resume(tmp_path):
+    checkpoint = tmp_path / "slide.h5path"
+    n_tiles = len(SlideData("tests/testdata/small_HE.svs").plan_tiles(shape=200))
+    # interrupted run
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    pipeline = Pipeline([BoxBlur(kernel_size=15), CountTiles(fail_after=5)])
+    with pytest.raises(RuntimeError):
+        wsi.run(pipeline, distributed=False, tile_size=200, checkpoint=checkpoint)
+
+    # resumed run only processes the remaining tiles
+    counter = CountTiles()
+    resumed = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    pipeline = Pipeline([BoxBlur(kernel_size=15), counter])
+    resumed.run(pipeline, distributed=False, tile_size=200, checkpoint=checkpoint)
+    assert counter.count == n_tiles - 5
+    assert len(resumed.tiles) == n_tiles
+
+    # running again does nothing
+    counter.count = 0
+    SlideData("tests/testdata/small_HE.svs", backend="openslide").run(
+        pipeline, distributed=False, tile_size=200, checkpoint=checkpoint
+    )
+    assert counter.count == 0
+
+    # result is the same as an uninterrupted run
+    expected = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    expected.run(pipeline, distributed=False, tile_size=200)
+    loaded = SlideData(checkpoint)
+    assert sorted(loaded.tiles.keys) == sorted(expected.tiles.keys)
+    np.testing.assert_array_equal(
+        loaded.tiles.h5manager.h5["array"][:], expected.tiles.h5manager.h5["array"][:]
+    )
+
+
+def test_run_checkpoint_unsaved_tiles(tmp_path):
+    checkpoint = tmp_path / "slide.h5path"
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    pipeline = Pipeline([CountTiles(fail_after=5)])
+    with pytest.raises(RuntimeError):
+        wsi.run(pipeline, distributed=False, tile_size=200, checkpoint=checkpoint)
+    # simulate tiles which were written to the file, but not saved in the manifest before the run was killed
+    manifest = Path(str(checkpoint) + ".progress")
+    lines = manifest.read_text().splitlines()
+    manifest.write_text(lines[0] + "\n" + lines[1][:10])
+
+    counter = CountTiles()
+    resumed = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    resumed.run(
+        Pipeline([counter]), distributed=False, tile_size=200, checkpoint=checkpoint
+    )
+    assert counter.count == len(resumed.plan_tiles(shape=200))
+
+    with pytest.raises(ValueError):
+        SlideData("tests/testdata/small_HE.svs", backend="openslide").run(
+            pipeline, distributed=False, tile_size=100, checkpoint=checkpoint
+        )
+
+
+def test_run_checkpoint_existing_tiles(tmp_path):
+    checkpoint = tmp_path / "slide.h5path"
+    wsi = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    with pytest.raises(RuntimeError):
+        wsi.run(
+            Pipeline([CountTiles(fail_after=5)]),
+            distributed=False,
+            tile_size=200,
+            checkpoint=checkpoint,
+        )
+
+    # tiles of the slide which are not in the checkpoint are not silently dropped
+    other = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    other.run(Pipeline([]), distributed=False, tile_size=300)
+    keys = other.tiles.keys
+    with pytest.raises(ValueError):
+        other.run(Pipeline([]), distributed=False, tile_size=200, checkpoint=checkpoint)
+    assert other.tiles.keys == keys
+
+    # the interrupted slide stays backed by the checkpoint, and can resume the run itself
+    wsi.run(
+        Pipeline([CountTiles()]),
+        distributed=False,
+        tile_size=200,
+        checkpoint=checkpoint,
+    )
+    assert len(wsi.tiles) == len(wsi.plan_tiles(shape=200))
+    wsi.masks.add("mask", np.ones(wsi.slide.get_image_shape(), dtype=np.uint8))
+    wsi.h5manager.h5.flush()
+    assert "mask" in SlideData(checkpoint).masks.keys
+
+
+def test_run_checkpoint_changed_run(tmp_path):
+    checkpoint = tmp_path / "slide.h5path"
+    coords = np.array([[0, 0], [200, 0], [0, 200]])
+    pipeline = Pipeline([BoxBlur(kernel_size=15), CountTiles(fail_after=1)])
+    with pytest.raises(RuntimeError):
+        SlideData("tests/testdata/small_HE.svs", backend="openslide").run(
+            pipeline,
+            distributed=False,
+            tile_size=200,
+            tile_coords=coords,
+            checkpoint=checkpoint,
+        )
+    # resuming with a different pipeline or tile plan would mix differently processed tiles in one file
+    for changed in [
+        {"pipeline": Pipeline([BoxBlur(kernel_size=5), CountTiles()])},
+        {"tile_coords": coords[:2]},
+        {"tile_coords": None},
+    ]:
+        kwargs = {"pipeline": pipeline, "tile_coords": coords, **changed}
+        with pytest.raises(ValueError):
+            SlideData("tests/testdata/small_HE.svs", backend="openslide").run(
+                distributed=False, tile_size=200, checkpoint=checkpoint, **kwargs
+            )
+    resumed = SlideData("tests/testdata/small_HE.svs", backend="openslide")
+    resumed.run(
+        Pipeline([BoxBlur(kernel_size=15), CountTiles()]),
+        distributed=False,
+        tile_size=200,
+        tile_coords=coords,
+        checkpoint=checkpoint,
+    )
+    assert len(resumed.tiles) == 3
+
+
 @pytest.mark.parametrize("overwrite_tiles", [True, False])
 def test_run_existing_tiles(slide_dataset_with_tiles, overwrite_tiles):
     dataset = slide_dataset_with_tiles
@@ -121,6 +637,43 @@ def test_generate_tiles_padding(he_slide, pad):
         assert len(tiles) == 80
 
 
+@pytest.mark.parametrize("chunks", [500, (300, 400)])
+def test_to_dask(he_slide, chunks):
+    array = he_slide.to_dask(chunks=chunks)
+    assert array.shape == (2967, 2220, 3)
+    assert array.dtype == np.uint8
+    full_image = tifffile.imread("tests/testdata/small_HE.svs")
+    np.testing.assert_array_equal(
+        array[700:1200, 100:350], full_image[700:1200, 100:350]
+    )
+    # reductions over the whole slide
+    assert (array > 200).sum().compute() == (full_image > 200).sum()
+
+
+def test_to_dask_level(tmp_path):
+    image = np.random.RandomState(0).randint(0, 255, (1024, 1536, 3), dtype=np.uint8)
+    levels = [image, image[::2, ::2].copy()]
+    path = str(tmp_path / "pyramid.tif")
+    with tifffile.TiffWriter(path) as tif:
+        for i, level in enumerate(levels):
+            tif.write(level, tile=(256, 256), photometric="rgb", subfiletype=int(i > 0))
+    wsi = SlideData(path, backend="openslide")
+    assert wsi.slide.slide.level_count == 2
+    for i, level in enumerate(levels):
+        array = wsi.to_dask(level=i, chunks=(300, 200))
+        assert array.shape == level.shape
+        np.testing.assert_array_equal(array.compute(), level)
+
+
+def test_to_dask_h5path(tmp_path):
+    wsi = HESlide("tests/testdata/small_HE.svs", backend="openslide")
+    wsi.run(Pipeline([BoxBlur(kernel_size=15)]), distributed=False, tile_size=500)
+    wsi.write(tmp_path / "test.h5path")
+    readslidedata = SlideData(tmp_path / "test.h5path")
+    array = readslidedata.to_dask(chunks=500)
+    np.testing.assert_array_equal(array.compute(), wsi.h5manager.h5["array"][:])
+
+
 def test_read_write_heslide(tmp_path, example_slide_data_with_tiles):
     slidedata = example_slide_data_with_tiles
     path = tmp_path / "testhe.h5"
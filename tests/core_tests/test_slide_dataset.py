@@ -3,11 +3,16 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import threading
+import time
+
 from dask.distributed import Client
 from pathlib import Path
+import pytest
 
 from pathml.core import SlideData, Tile
 from pathml.preprocessing import Pipeline, BoxBlur
+from pathml.preprocessing.transforms import Transform
 
 
 def test_dataset_len_getitem(slide_dataset):
@@ -44,3 +49,75 @@ def test_run_pipeline_and_tile_dataset_and_reshape(slide_dataset):
     assert tile_after_reshape.image.shape == (25, 25, 3)
 
     assert labels_after_reshape == labels
+
+
+def test_run_pipeline_with_plan(slide_dataset):
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    plans = [
+        slide.plan_tiles(shape=50, n_tiles=i + 1)
+        for i, slide in enumerate(slide_dataset)
+    ]
+    slide_dataset.run(
+        pipeline=pipeline, distributed=False, tile_size=50, tile_coords=plans
+    )
+    assert [len(slide.tiles) for slide in slide_dataset] == [1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        slide_dataset.run(pipeline=pipeline, distributed=False, tile_coords=plans[:2])
+
+
+def test_run_pipeline_checkpoint(tmp_path, slide_dataset):
+    pipeline = Pipeline([BoxBlur(kernel_size=15)])
+    slide_dataset.run(
+        pipeline,
+        distributed=False,
+        tile_size=200,
+        overwrite_existing_tiles=True,
+        checkpoint_dir=tmp_path,
+    )
+    for slide in slide_dataset:
+        loaded = SlideData(tmp_path / f"{slide.name}.h5path")
+        assert sorted(loaded.tiles.keys) == sorted(slide.tiles.keys)
+    slide_dataset.slides[1].name = slide_dataset.slides[0].name
+    with pytest.raises(ValueError):
+        slide_dataset.run(pipeline, distributed=False, checkpoint_dir=tmp_path)
+
+
+class ConcurrencyProbe(Transform):
+    """Transform which records the maximum number of tiles being processed at the same time"""
+
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def apply(self, tile):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        time.sleep(0.1)
+        with cls.lock:
+            cls.running -= 1
+
+
+@pytest.mark.parametrize("executor", ["dask", "thread"])
+def test_run_slides_concurrently(slide_dataset, executor):
+    # one tile per slide, so tiles are only processed at the same time if slides are
+    plans = [slide.plan_tiles(shape=50, n_tiles=1) for slide in slide_dataset]
+    ConcurrencyProbe.max_running = 0
+    client = (
+        Client(processes=False, n_workers=1, threads_per_worker=4)
+        if executor == "dask"
+        else None
+    )
+    slide_dataset.run(
+        Pipeline([ConcurrencyProbe()]),
+        executor=executor,
+        client=client,
+        n_workers=4,
+        tile_size=50,
+        tile_coords=plans,
+    )
+    if client is not None:
+        client.close()
+    assert [len(slide.tiles) for slide in slide_dataset] == [1, 1, 1, 1]
+    assert ConcurrencyProbe.max_running > 1
@@ -0,0 +1,71 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from pathml.core import ArrayBackend, synthetic_slide, types
+from pathml.preprocessing import BoxBlur, Pipeline
+
+
+def test_synthetic_slide_he():
+    wsi = synthetic_slide(shape=(1000, 700), n_levels=2, block_size=256)
+    assert isinstance(wsi.slide, ArrayBackend)
+    assert wsi.name == "synthetic_HE_0"
+    assert wsi.slide_type == types.HE
+    assert wsi.shape == (1000, 700)
+    assert wsi.slide.get_image_shape(level=1) == (250, 175)
+    image = wsi.slide.extract_region(location=(0, 0), size=(1000, 700))
+    assert image.dtype == np.uint8 and image.shape == (1000, 700, 3)
+    # contains both tissue and background
+    assert image.min() < 150 and image.max() > 220
+
+
+def test_synthetic_slide_fluor():
+    wsi = synthetic_slide(shape=(600, 500), stain="Fluor", n_channels=6)
+    assert wsi.slide_type == types.IF
+    image = wsi.slide.extract_region(location=(0, 0), size=(600, 500))
+    assert image.dtype == np.uint16 and image.shape == (600, 500, 1, 6, 1)
+
+
+def test_synthetic_slide_deterministic():
+    a = synthetic_slide(shape=(512, 512), n_levels=2, block_size=256)
+    b = synthetic_slide(shape=(512, 512), n_levels=2, block_size=256)
+    c = synthetic_slide(shape=(512, 512), n_levels=2, block_size=256, seed=1)
+    for level in range(2):
+        np.testing.assert_array_equal(a.slide._levels[level], b.slide._levels[level])
+    assert not np.array_equal(a.slide._levels[0], c.slide._levels[0])
+
+
+def test_synthetic_slide_on_disk(tmp_path):
+    in_memory = synthetic_slide(shape=(512, 512), n_levels=2, block_size=256)
+    on_disk = synthetic_slide(
+        shape=(512, 512), n_levels=2, block_size=256, path=tmp_path / "slide"
+    )
+    assert (tmp_path / "slide" / "level_1.npy").exists()
+    for level in range(2):
+        assert isinstance(on_disk.slide._levels[level], np.memmap)
+        np.testing.assert_array_equal(
+            in_memory.slide._levels[level], on_disk.slide._levels[level]
+        )
+    # levels are pickled as references to their files
+    assert len(pickle.dumps(on_disk.slide)) < 10000
+
+
+def test_synthetic_slide_invalid():
+    with pytest.raises(AssertionError):
+        synthetic_slide(shape=(512, 512), stain="IHC")
+    with pytest.raises(AssertionError):
+        synthetic_slide(shape=(512, 512), block_size=100)
+
+
+def test_run_pipeline_synthetic_slide():
+    wsi = synthetic_slide(shape=(1024, 1024), block_size=512)
+    pipeline = Pipeline([BoxBlur(kernel_size=5)])
+    wsi.run(pipeline, distributed=False, tile_size=256)
+    assert len(wsi.tiles) == 16
+    assert wsi.tiles[(256, 512)].image.shape == (256, 256, 3)
@@ -3,10 +3,13 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import pickle
+
 import pytest
 import numpy as np
 
 from pathml.core import Tile
+from pathml.utils import RGB_to_OD
 
 
 @pytest.mark.parametrize(
@@ -33,3 +36,20 @@ def test_tile():
     assert (tile.image).all() == (np.ones((224, 224, 3))).all()
     # test repr
     print(tile)
+
+
+def test_tile_derived():
+    image = np.random.RandomState(0).randint(0, 255, (50, 50, 3), dtype=np.uint8)
+    tile = Tile(image, coords=(1, 3))
+    od = tile.derived("OD")
+    np.testing.assert_array_equal(od, RGB_to_OD(image))
+    # computed once, and read-only since it is shared
+    assert tile.derived("OD") is od
+    assert not od.flags.writeable
+    # assigning a new image clears derived representations
+    tile.image = 255 - image
+    np.testing.assert_array_equal(tile.derived("OD"), RGB_to_OD(255 - image))
+    # derived representations are not pickled with the tile
+    assert pickle.loads(pickle.dumps(tile))._derived == {}
+    with pytest.raises(AssertionError):
+        tile.derived("XYZ")
@@ -102,6 +102,24 @@ def test_init(tiles, tilesnonconsecutive, incorrect_input):
     )
 
 
+def test_init_out_of_order(tiles):
+    # tiles may be added in any order, e.g. as they finish processing on a cluster
+    slidedata = HESlide("tests/testdata/small_HE.svs", tiles=tiles[::-1])
+    for tile in tiles:
+        np.testing.assert_array_equal(slidedata.tiles[tile.coords].image, tile.image)
+        for key, mask in tile.masks.items():
+            np.testing.assert_array_equal(slidedata.tiles[tile.coords].masks[key], mask)
+
+
+def test_add_tiles(emptytiles, tiles):
+    emptytiles.add_tiles(tiles[::-1])
+    assert emptytiles.h5manager.h5["array"].shape == (448, 448, 3)
+    for tile in tiles:
+        np.testing.assert_array_equal(emptytiles[tile.coords].image, tile.image)
+    with pytest.raises(ValueError):
+        emptytiles.add_tiles([tiles[0], "string"])
+
+
 def test_repr(tiles):
     slidedata = HESlide("tests/testdata/small_HE.svs", tiles=tiles)
     assert repr(slidedata.tiles)
@@ -3,12 +3,14 @@ Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
 License: GNU GPL 2.0
 """
 
+import json
 import pickle
 import numpy as np
 import pandas as pd
+import pytest
 import copy
 
-from pathml.preprocessing import Pipeline
+from pathml.preprocessing import Pipeline, PipelineProfile
 
 from pathml.preprocessing import (
     MedianBlur,
@@ -103,3 +105,33 @@ def test_pipeline_save(tmp_path):
 
     assert repr(pipeline_loaded) == repr(pipeline)
     assert type(pipeline_loaded) == type(pipeline)
+
+
+def test_pipeline_profile(tileHE, tmp_path):
+    pipe = Pipeline([MedianBlur(), BoxBlur()])
+    profile = PipelineProfile()
+    pipe.apply(tileHE, profile=profile)
+    pipe.apply(tileHE, profile=profile)
+    assert len(profile) == 4
+    event = profile.events[0]
+    assert event["transform"] == "MedianBlur"
+    assert event["tile"] == str(tileHE.coords)
+    assert event["wall_seconds"] > 0 and event["cpu_seconds"] >= 0
+
+    other = PipelineProfile()
+    pipe.apply(tileHE, profile=other)
+    profile.update(other)
+    summary = profile.summary()
+    assert list(summary.n_tiles) == [3, 3]
+    assert summary.wall_fraction.sum() == pytest.approx(1)
+
+    profile.to_json(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f)["events"] == profile.events
+    profile.to_chrome_trace(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as f:
+        trace = json.load(f)["traceEvents"]
+    assert [e["name"] for e in trace if e["ph"] == "X"] == [
+        "MedianBlur",
+        "BoxBlur",
+    ] * 3
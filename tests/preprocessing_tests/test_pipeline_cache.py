@@ -0,0 +1,123 @@
+"""
+Copyright 2021, Dana-Farber Cancer Institute and Weill Cornell Medicine
+License: GNU GPL 2.0
+"""
+
+import copy
+import pickle
+import time
+
+import numpy as np
+import pytest
+
+from pathml.core import Tile, types
+from pathml.preprocessing import (
+    BoxBlur,
+    MedianBlur,
+    Pipeline,
+    PipelineCache,
+    TissueDetectionHE,
+)
+from pathml.preprocessing.transforms import Transform
+
+
+class CountCalls(Transform):
+    """
+    Wraps a transform, counting how many times it is applied.
+    """
+
+    def __init__(self, transform):
+        self.transform = transform
+        self.n_calls = 0
+
+    def __repr__(self):
+        return f"CountCalls({self.transform!r})"
+
+    def apply(self, tile):
+        self.n_calls += 1
+        self.transform.apply(tile)
+
+
+class NoRepr(Transform):
+    def apply(self, tile):
+        tile.image = tile.image[::-1]
+
+
+@pytest.fixture
+def tile():
+    image = np.random.RandomState(0).randint(0, 255, (100, 100, 3), dtype=np.uint8)
+    return Tile(image, coords=(0, 0), slide_type=types.HE)
+
+
+def test_pipeline_cache_prefix(tile, tmp_path):
+    blur = CountCalls(MedianBlur())
+    tissue = CountCalls(TissueDetectionHE(mask_name="tissue"))
+    cache = PipelineCache(tmp_path / "cache")
+    expected = Pipeline([MedianBlur(), TissueDetectionHE(mask_name="tissue")]).apply(
+        copy.deepcopy(tile)
+    )
+
+    for _ in range(2):
+        result = Pipeline([blur, tissue], cache=cache).apply(copy.deepcopy(tile))
+        np.testing.assert_array_equal(result.image, expected.image)
+        np.testing.assert_array_equal(result.masks["tissue"], expected.masks["tissue"])
+    assert blur.n_calls == tissue.n_calls == 1
+
+    # changing the last transform only recomputes the last transform
+    box = CountCalls(BoxBlur())
+    result = Pipeline([blur, box], cache=cache).apply(copy.deepcopy(tile))
+    assert blur.n_calls == 1 and box.n_calls == 1
+    np.testing.assert_array_equal(result.image, BoxBlur().F(MedianBlur().F(tile.image)))
+
+    # changing the parameters of the first transform recomputes everything
+    blur_7 = CountCalls(MedianBlur(kernel_size=7))
+    Pipeline([blur_7, box], cache=cache).apply(copy.deepcopy(tile))
+    assert blur_7.n_calls == 1 and box.n_calls == 2
+
+    # so does changing the content of the tile
+    other = copy.deepcopy(tile)
+    other.image = 255 - other.image
+    Pipeline([blur, box], cache=cache).apply(other)
+    assert blur.n_calls == 2
+
+
+def test_pipeline_cache_no_repr(tile, tmp_path):
+    blur = CountCalls(MedianBlur())
+    box = CountCalls(BoxBlur())
+    pipeline = Pipeline([blur, NoRepr(), box], cache=tmp_path / "cache")
+    assert isinstance(pipeline.cache, PipelineCache)
+    assert len(PipelineCache.prefix_keys(tile, pipeline.transforms)) == 1
+    for _ in range(2):
+        pipeline.apply(copy.deepcopy(tile))
+    # transforms from the first one without a repr onwards are always applied
+    assert blur.n_calls == 1 and box.n_calls == 2
+
+
+def test_pipeline_cache_eviction(tile, tmp_path):
+    cache = PipelineCache(tmp_path / "cache")
+    keys = [f"{i:040x}" for i in range(4)]
+    cache.put(keys[0], tile)
+    entry_bytes = cache._size
+    # when a fourth entry is added, evicting down to 90% of the limit removes one entry
+    cache.max_bytes = int(3.5 * entry_bytes)
+    for key in keys[1:3]:
+        time.sleep(0.01)
+        cache.put(key, tile)
+    time.sleep(0.01)
+    # using an entry makes it the most recently used
+    assert cache.get(keys[0], copy.deepcopy(tile))
+    time.sleep(0.01)
+    cache.put(keys[3], tile)
+    cached = [cache.get(key, copy.deepcopy(tile)) for key in keys]
+    assert cached == [True, False, True, True]
+    assert cache._size <= cache.max_bytes
+
+    cache.clear()
+    assert not any(cache.get(key, copy.deepcopy(tile)) for key in keys)
+
+
+def test_pipeline_cache_pickle(tmp_path):
+    pipeline = Pipeline([MedianBlur()], cache=tmp_path / "cache")
+    loaded = pickle.loads(pickle.dumps(pipeline))
+    assert loaded.cache.cache_dir == pipeline.cache.cache_dir
+    assert loaded.cache.max_bytes == pipeline.cache.max_bytes
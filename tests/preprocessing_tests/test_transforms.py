@@ -6,7 +6,10 @@ License: GNU GPL 2.0
 import numpy as np
 import pytest
 
+import pathml.core.tile
+
 from pathml.preprocessing import (
+    Pipeline,
     MedianBlur,
     GaussianBlur,
     BoxBlur,
@@ -129,6 +132,29 @@ def test_binary_label_transforms(tileHE, transform):
     assert tileHE.labels["test_label"] in [True, False]
 
 
+def test_shared_derived_representations(tileHE, monkeypatch):
+    # each color conversion runs once per tile, however many transforms use it
+    n_calls = {"GREY": 0, "OD": 0}
+    for name in n_calls:
+        convert = pathml.core.tile._derived_representations[name]
+
+        def counted(image, name=name, convert=convert):
+            n_calls[name] += 1
+            return convert(image)
+
+        monkeypatch.setitem(pathml.core.tile._derived_representations, name, counted)
+    Pipeline(
+        [
+            LabelWhiteSpaceHE(label_name="whitespace"),
+            BinaryThreshold(mask_name="threshold"),
+            TissueDetectionHE(mask_name="tissue", use_saturation=False),
+            NucleusDetectionHE(mask_name="nuclei", stain_estimation_method="macenko"),
+            StainNormalizationHE(stain_estimation_method="macenko"),
+        ]
+    ).apply(tileHE)
+    assert n_calls == {"GREY": 1, "OD": 1}
+
+
 def test_segment_mif(tileVectra):
     vectra_collapse = CollapseRunsVectra()
     vectra_collapse.apply(tileVectra)
@@ -15,6 +15,7 @@ from pathml.utils import (
     pad_or_crop,
     _pad_or_crop_1d,
     upsample_array,
+    pil_to_rgb,
     plot_mask,
     RGB_to_HSV,
     RGB_to_OD,
@@ -72,6 +73,19 @@ def test_RGB_to_GREY(random_rgb):
     assert im_converted.shape[0:2] == random_rgb.shape[0:2]
 
 
+def test_pil_to_rgb(random_rgb):
+    from PIL import Image
+
+    rgba = np.dstack([random_rgb, np.full(random_rgb.shape[:2], 7, dtype=np.uint8)])
+    rgb = pil_to_rgb(Image.fromarray(rgba, mode="RGBA"))
+    np.testing.assert_array_equal(rgb, cv2.cvtColor(rgba, cv2.COLOR_RGBA2RGB))
+    assert rgb.flags.c_contiguous
+    np.testing.assert_array_equal(pil_to_rgb(Image.fromarray(random_rgb)), random_rgb)
+    # greyscale images are rejected, rather than slicing the wrong axis
+    with pytest.raises(AssertionError):
+        pil_to_rgb(Image.fromarray(random_rgb[..., 0]))
+
+
 def test_segmentation_lines(simple_mask):
     x, y = segmentation_lines(simple_mask)
     for x, y in zip(x, y):